@@ -1,18 +1,33 @@
 # api/announcements.py
-from fastapi import APIRouter, HTTPException, Header, status
-from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response, status
+from pydantic import BaseModel, HttpUrl, Field, field_validator
+from typing import List, Optional
 from datetime import datetime, timezone
-import os, json, threading
+import os, uuid
+from utils.announcements import AnnouncementIndex, parse_range, parse_version
+from utils.auth import require_roles
+from utils.compression import etag_matches
+from utils.events import publish_event
+from utils.json_store import JsonFileStore
+from utils.metrics import cache_hit, cache_miss
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 # === Конфиг через ENV ===
 NOTICE_PATH = os.getenv("UPDATE_NOTICE_JSON_PATH", "data/update_notice.json")
-ADMIN_KEY = os.getenv("ADMIN_API_KEY", "")  # если пусто — авторизация отключена
+ADMIN_KEY = os.getenv("ADMIN_API_KEY", "")  # если пусто — авторизация /announcements/latest отключена
+# Как часто (мс) сверяться с файлом: так PUT на одном воркере доходит до остальных
+NOTICE_REVALIDATE_MS = int(os.getenv("UPDATE_NOTICE_REVALIDATE_MS", 500))
 
-_lock = threading.RLock()
-_notice_cache: Optional[dict] = None
+_store = JsonFileStore(NOTICE_PATH, NOTICE_REVALIDATE_MS)
+
+# Адресные объявления: {"items": [...]} в отдельном файле, тот же механизм обновления
+ANNOUNCEMENTS_PATH = os.getenv("ANNOUNCEMENTS_JSON_PATH", "data/announcements.json")
+_rules_store = JsonFileStore(ANNOUNCEMENTS_PATH, NOTICE_REVALIDATE_MS)
+_index_cache = (None, AnnouncementIndex([]))  # (etag снапшота, индекс)
+# Адресные объявления правят только админы по токену (X-ADMIN-KEY — лишь у /announcements/latest)
+_announcements_admin = [Depends(require_roles("admin", "developer"))]
 
 class UpdateNotice(BaseModel):
     title: str = Field(min_length=1, max_length=140)
@@ -21,46 +36,29 @@ class UpdateNotice(BaseModel):
     targetVersion: str = Field(min_length=1, max_length=32)
     createdAt: Optional[str] = None  # ISO-8601; если не задано — выставим на сервере
 
-def _ensure_dir(path: str):
-    d = os.path.dirname(path)
-    if d and not os.path.exists(d):
-        os.makedirs(d, exist_ok=True)
+class Announcement(BaseModel):
+    title: str = Field(min_length=1, max_length=140)
+    link: Optional[HttpUrl] = None
+    description: Optional[str] = Field(default=None, max_length=800)
+    versions: str = Field(default="*", max_length=64)   # "^1.2.0", ">=1.4 <2.0", "1.5.x"
+    platforms: List[str] = Field(default_factory=list)  # пусто — все
+    groups: List[str] = Field(default_factory=list)
+    roles: List[str] = Field(default_factory=list)
+    startsAt: Optional[datetime] = None
+    endsAt: Optional[datetime] = None
+    priority: int = 0
 
-def _load_from_file() -> Optional[dict]:
-    if not os.path.exists(NOTICE_PATH):
-        return None
-    try:
-        with open(NOTICE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
-
-def _save_to_file(doc: Optional[dict]):
-    _ensure_dir(NOTICE_PATH)
-    if doc is None:
-        # зачистка файла
-        try:
-            if os.path.exists(NOTICE_PATH):
-                os.remove(NOTICE_PATH)
-        except Exception:
-            pass
-        return
-    with open(NOTICE_PATH, "w", encoding="utf-8") as f:
-        json.dump(doc, f, ensure_ascii=False, indent=2)
+    @field_validator("versions")
+    @classmethod
+    def _check_versions(cls, v: str) -> str:
+        parse_range(v)
+        return v
 
 def _get_notice() -> Optional[dict]:
-    global _notice_cache
-    with _lock:
-        if _notice_cache is not None:
-            return _notice_cache
-        _notice_cache = _load_from_file()
-        return _notice_cache
+    return _store.get()
 
 def _set_notice(doc: Optional[dict]):
-    global _notice_cache
-    with _lock:
-        _notice_cache = doc
-        _save_to_file(doc)
+    _store.set(doc)
 
 def _require_admin(x_admin_key: Optional[str]):
     if not ADMIN_KEY:
@@ -68,15 +66,80 @@ def _require_admin(x_admin_key: Optional[str]):
     if not x_admin_key or x_admin_key != ADMIN_KEY:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin key")
 
+def _rules_index() -> AnnouncementIndex:
+    """Индекс пересобирается, только когда сменился файл с объявлениями."""
+    global _index_cache
+    snap = _rules_store.snapshot()
+    etag, index = _index_cache
+    if etag != snap.etag:
+        cache_miss("announcement_index")
+        index = AnnouncementIndex((snap.doc or {}).get("items", []))
+        _index_cache = (snap.etag, index)
+    else:
+        cache_hit("announcement_index")
+    return index
+
+def _update_rules(change) -> List[dict]:
+    """
+    Чтение-изменение-запись списка объявлений; change(items) -> items.
+    Блокировка межпроцессная, а список читается из файла, а не из кэша:
+    правка с другого воркера не затрётся.
+    """
+    result = []
+
+    def apply(doc):
+        result[:] = change(list((doc or {}).get("items", [])))
+        return {"items": result}
+
+    snap = _rules_store.update(apply)
+    publish_event("announcement", {"version": snap.etag.strip('"')})
+    return result
+
+@router.get("/announcements/for")
+def get_announcements_for(
+    version: str = Query(..., description="Версия приложения, напр. 1.4.2"),
+    platform: Optional[str] = Query(None, description="android | ios | web"),
+    group: Optional[str] = Query(None),
+    role: Optional[str] = Query(None),
+):
+    """
+    Объявления, подходящие клиенту: по диапазону версий, платформе, группе/роли
+    и окну времени. Сначала — с большим priority, затем более новые.
+    """
+    try:
+        v = parse_version(version)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректная версия")
+    return _rules_index().match(v, platform, group, role)
+
+@router.get("/announcements", dependencies=_announcements_admin)
+def list_announcements():
+    """Все адресные объявления (для админки)."""
+    return (_rules_store.get() or {}).get("items", [])
+
+@router.post("/announcements", status_code=201, dependencies=_announcements_admin)
+def create_announcement(payload: Announcement):
+    doc = {
+        "id": uuid.uuid4().hex[:12],
+        **payload.model_dump(mode="json"),
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+    }
+    _update_rules(lambda items: items + [doc])
+    return doc
+
 @router.get("/announcements/latest")
-def get_latest_notice():
+def get_latest_notice(if_none_match: Optional[str] = Header(None)):
     """
     Текущее глобальное уведомление (баннер) или 404 если отсутствует.
+    Отдаём заранее закодированные байты с ETag; If-None-Match -> 304.
     """
-    doc = _get_notice()
-    if not doc:
+    snap = _store.snapshot()
+    if not snap.doc:
         raise HTTPException(status_code=404, detail="No active notice")
-    return doc
+    headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, snap.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snap.body, media_type="application/json", headers=headers)
 
 @router.put("/announcements/latest")
 def put_latest_notice(
@@ -93,6 +156,7 @@ def put_latest_notice(
         doc["createdAt"] = datetime.now(timezone.utc).isoformat()
 
     _set_notice(doc)
+    publish_event("announcement", {"version": doc["createdAt"]})
     return {"ok": True, "notice": doc}
 
 @router.delete("/announcements/latest")
@@ -104,4 +168,31 @@ def delete_latest_notice(
     """
     _require_admin(x_admin_key)
     _set_notice(None)
+    publish_event("announcement", {"version": None})
+    return {"ok": True}
+
+@router.put("/announcements/{announcement_id}", dependencies=_announcements_admin)
+def update_announcement(announcement_id: str, payload: Announcement):
+    updated = {}
+
+    def change(items):
+        for i, item in enumerate(items):
+            if item.get("id") == announcement_id:
+                updated.update({**item, **payload.model_dump(mode="json")})
+                items[i] = updated
+                return items
+        raise HTTPException(status_code=404, detail="Объявление не найдено")
+
+    _update_rules(change)
+    return updated
+
+@router.delete("/announcements/{announcement_id}", dependencies=_announcements_admin)
+def delete_announcement(announcement_id: str):
+    def change(items):
+        rest = [item for item in items if item.get("id") != announcement_id]
+        if len(rest) == len(items):
+            raise HTTPException(status_code=404, detail="Объявление не найдено")
+        return rest
+
+    _update_rules(change)
     return {"ok": True}
@@ -0,0 +1,43 @@
+# api/auth.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from config import SERVER_CONFIG
+from database.connection import get_db_connection
+from utils.auth import Principal, get_current_principal, issue_token, revoke_token
+from utils.logger import logger
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+
+@router.post("/auth/token")
+def exchange_admin_key(user_id: str, x_admin_key: Optional[str] = Header(None)):
+    """
+    Выдача токена по X-ADMIN-KEY для пользователя без логина/пароля (admin, developer).
+    Роль берётся из БД один раз — дальше проверки идут только по токену.
+    """
+    admin_key = SERVER_CONFIG["admin_api_key"]
+    if not admin_key:
+        raise HTTPException(status_code=403, detail="Выдача токенов по ключу отключена")
+    if x_admin_key != admin_key:
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT role FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    logger.info(f"Выдан токен по ключу администратора: {user_id} ({row['role']})")
+    return issue_token(user_id, row["role"] or "user")
+
+
+@router.post("/auth/revoke")
+def revoke_current_token(principal: Principal = Depends(get_current_principal)):
+    """Отзыв текущего токена (выход из аккаунта)."""
+    try:
+        revoke_token(principal)
+        return {"message": "Токен отозван"}
+    except Exception as e:
+        logger.error(f"Ошибка отзыва токена: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка отзыва токена")
@@ -0,0 +1,105 @@
+# api/debug.py
+"""Профилирование работающего сервера. Только для роли developer."""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field
+
+from utils.auth import require_roles
+from utils.logger import logger
+from utils.profiling import (
+    PROFILE_MAX_SECONDS, ProfilerBusy, route_profiler, sample_stacks,
+    tracemalloc_start, tracemalloc_stop, tracemalloc_top,
+)
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(dependencies=[Depends(require_roles("developer"))], route_class=FastJSONRoute)
+
+
+class RouteProfileRequest(BaseModel):
+    path: str = Field(min_length=1)          # шаблон маршрута, напр. /api/schedule/{group_name}
+    method: str = "GET"
+    requests: int = Field(default=10, ge=1, le=1000)
+
+
+@router.get("/debug/profile", response_class=PlainTextResponse)
+async def profile_stacks(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    idle: bool = Query(False, description="Включать простаивающие потоки"),
+):
+    """
+    Сэмплирование стеков всех потоков в течение seconds секунд.
+    Ответ — collapsed stacks для flamegraph.pl / speedscope.
+    """
+    logger.info(f"Сэмплирование стеков на {seconds} с")
+    try:
+        # В отдельном потоке: event loop продолжает обслуживать запросы и попадает в выборку
+        result = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000, idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        result["collapsed"],
+        headers={"X-Profile-Samples": str(result["samples"]), "X-Profile-Stacks": str(result["stacks"])},
+    )
+
+
+@router.post("/debug/profile/route")
+def profile_route(body: RouteProfileRequest, request: Request):
+    """cProfile для следующих N запросов к маршруту; отчёт — GET /debug/profile/route."""
+    method = body.method.upper()
+    for route in request.app.routes:
+        if isinstance(route, APIRoute) and route.path == body.path and method in route.methods:
+            break
+    else:
+        raise HTTPException(status_code=404, detail="Маршрут не найден")
+    try:
+        route_profiler.arm(route, body.requests)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(f"Захват cProfile: {method} {body.path}, запросов: {body.requests}")
+    return route_profiler.status()
+
+
+@router.get("/debug/profile/route", response_class=PlainTextResponse)
+def profile_route_report(
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Отчёт pstats по собранным запросам (заголовки — статус захвата)."""
+    status = route_profiler.status()
+    return PlainTextResponse(
+        route_profiler.report(sort, limit),
+        headers={"X-Profile-Target": status["target"] or "", "X-Profile-Captured": str(status["captured"]),
+                 "X-Profile-Remaining": str(status["remaining"])},
+    )
+
+
+@router.delete("/debug/profile/route")
+def profile_route_cancel():
+    """Отменить захват и вернуть маршруту исходный обработчик."""
+    route_profiler.disarm()
+    return route_profiler.status()
+
+
+@router.post("/debug/tracemalloc")
+def tracemalloc_enable(frames: int = Query(10, ge=1, le=50)):
+    """Включить трассировку выделений памяти; текущее состояние становится базой для сравнения."""
+    tracemalloc_start(frames)
+    logger.info(f"tracemalloc включён (кадров: {frames})")
+    return {"tracing": True}
+
+
+@router.get("/debug/tracemalloc")
+def tracemalloc_snapshot(limit: int = Query(25, ge=1, le=200),
+                         key: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    """Крупнейшие места выделения и рост с момента включения."""
+    return tracemalloc_top(limit, key)
+
+
+@router.delete("/debug/tracemalloc")
+def tracemalloc_disable():
+    tracemalloc_stop()
+    logger.info("tracemalloc выключен")
+    return {"tracing": False}
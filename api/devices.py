@@ -0,0 +1,72 @@
+# api/devices.py
+from fastapi import APIRouter, Depends, HTTPException
+from database.connection import get_db_connection
+from models.device_models import DeviceTokenRegister, PushSendRequest
+from utils.auth import Principal, get_current_principal, require_roles
+from utils.logger import logger
+from utils.push_outbox import enqueue_push, push_dispatcher
+import utils.push_fanout  # noqa: F401 — регистрирует обработчик очереди 'fanout'
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+
+@router.post("/devices")
+def register_device(device: DeviceTokenRegister, principal: Principal = Depends(get_current_principal)):
+    """Регистрация/обновление FCM-токена устройства текущего пользователя (user_id — из токена)"""
+    try:
+        with get_db_connection() as conn:
+            cur = conn.execute("SELECT 1 FROM users WHERE user_id = ?", (principal.user_id,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Пользователь не найден")
+            conn.execute(
+                """INSERT INTO device_tokens (user_id, token, platform) VALUES (?, ?, ?)
+                   ON CONFLICT(token) DO UPDATE SET user_id = excluded.user_id,
+                       platform = excluded.platform, updated_at = CURRENT_TIMESTAMP""",
+                (principal.user_id, device.token, device.platform)
+            )
+            conn.commit()
+        return {"message": "Токен устройства сохранён"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка сохранения токена устройства: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка сохранения токена устройства")
+
+
+@router.delete("/devices/{token}")
+def unregister_device(token: str, principal: Principal = Depends(get_current_principal)):
+    """
+    Удаление токена (выход из аккаунта/отключение пушей на устройстве).
+    Пользователь удаляет только свои токены, admin/developer — любые.
+    """
+    try:
+        with get_db_connection() as conn:
+            if principal.role in ("admin", "developer"):
+                conn.execute("DELETE FROM device_tokens WHERE token = ?", (token,))
+            else:
+                conn.execute(
+                    "DELETE FROM device_tokens WHERE token = ? AND user_id = ?", (token, principal.user_id)
+                )
+            conn.commit()
+        return {"message": "Токен устройства удалён"}
+    except Exception as e:
+        logger.error(f"Ошибка удаления токена устройства: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка удаления токена устройства")
+
+
+@router.post("/push/send", dependencies=[Depends(require_roles("admin", "developer"))])
+def send_push(request: PushSendRequest):
+    """
+    Персональная рассылка по токенам устройств (с учётом notifications_enabled).
+    Получатели выбираются и пуши отправляются в фоне через очередь.
+    """
+    try:
+        with get_db_connection() as conn:
+            enqueue_push(conn, "fanout", request.model_dump(exclude_none=True))
+            conn.commit()
+        push_dispatcher.notify()
+        return {"message": "Рассылка поставлена в очередь"}
+    except Exception as e:
+        logger.error(f"Ошибка постановки рассылки в очередь: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка постановки рассылки в очередь")
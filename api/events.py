@@ -0,0 +1,60 @@
+# api/events.py
+from typing import Optional
+
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+
+from utils.events import event_hub
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+# Комментарий-пинг, чтобы прокси и мобильные сети не закрывали тихое соединение
+SSE_HEARTBEAT_SECONDS = 20
+# Через сколько мс клиенту переподключаться после обрыва
+SSE_RETRY_MS = 5000
+
+
+def _format(seq: int, event_type: str, data: str) -> bytes:
+    return f"id: {event_hub.event_id(seq)}\nevent: {event_type}\ndata: {data}\n\n".encode("utf-8")
+
+
+async def _stream(request: Request, last_event_id: Optional[str]):
+    seq, complete = event_hub.resume_point(last_event_id)
+    event_hub.subscribers += 1
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n".encode("ascii")
+        if not complete:
+            # Пропущенные события уже вытеснены из буфера — пусть клиент перечитает всё
+            yield f"id: {event_hub.event_id(seq)}\nevent: reset\ndata: {{}}\n\n".encode("ascii")
+
+        while event_hub.running:
+            for item_seq, event_type, data in event_hub.since(seq):
+                seq = item_seq
+                yield _format(item_seq, event_type, data)
+            if not await event_hub.wait(SSE_HEARTBEAT_SECONDS):
+                if await request.is_disconnected():
+                    break
+                yield b": ping\n\n"
+    finally:
+        event_hub.subscribers -= 1
+
+
+@router.get("/events")
+async def events(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Лента изменений (Server-Sent Events).
+    event: news         data: {"id": ..., "action": "created"|"deleted"}
+    event: schedule     data: {"group": ..., "version": ...}
+    event: announcement data: {"version": createdAt | null}
+    event: reset        — часть событий потеряна, данные нужно перечитать.
+    Возобновление — стандартным заголовком Last-Event-ID.
+    """
+    return StreamingResponse(
+        _stream(request, last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx: не буферизовать поток
+        },
+    )
@@ -0,0 +1,47 @@
+# api/fake_fcm.py
+"""
+Локальная заглушка FCM HTTP v1 для офлайн-проверки доставки (включается FCM_FAKE=true).
+
+Особые значения для проверки ошибок:
+  token, начинающийся с "invalid" -> 404 UNREGISTERED
+  topic, начинающийся с "fail"    -> 500 (очередь повторит отправку)
+"""
+from collections import deque
+from itertools import count
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+_received = deque(maxlen=1000)
+_ids = count(1)
+
+
+@router.post("/v1/projects/{project_id}/messages:send")
+def fake_send(project_id: str, payload: dict):
+    message = payload.get("message") or {}
+    if str(message.get("token", "")).startswith("invalid"):
+        return JSONResponse(status_code=404, content={
+            "error": {"code": 404, "status": "NOT_FOUND",
+                      "details": [{"errorCode": "UNREGISTERED"}]}
+        })
+    if str(message.get("topic", "")).startswith("fail"):
+        return JSONResponse(status_code=500, content={"error": {"code": 500, "status": "INTERNAL"}})
+
+    message_id = next(_ids)
+    _received.append(message)
+    return {"name": f"projects/{project_id}/messages/{message_id}"}
+
+
+@router.get("/messages")
+def fake_messages():
+    """Что «доставлено» заглушкой (последние 1000 сообщений)."""
+    return list(_received)
+
+
+@router.delete("/messages")
+def fake_clear():
+    _received.clear()
+    return {"ok": True}
@@ -1,42 +1,34 @@
 # api/groups.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from database.connection import get_db_connection
+from utils.auth import require_roles
 from utils.logger import logger
-from models.schedule_models import GroupCreate
-from data.groups import DEFAULT_GROUPS  # список из data/groups.py
+from models.schedule_models import CatalogProgramme, CatalogYear, GroupCreate
+from data.group_catalog import bump_version, group_catalog, sync_schedule_groups
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
-def _ensure_default_groups(conn):
-    """Добавляет дефолтные группы в базу, если их нет."""
-    for group in DEFAULT_GROUPS:
-        conn.execute(
-            "INSERT OR IGNORE INTO schedule_groups (group_name) VALUES (?)",
-            (group,)
-        )
-    conn.commit()
+_catalog_admin = [Depends(require_roles("admin", "developer"))]
 
 @router.get("/groups")
-def get_groups():
-    """Список групп из БД (с предварительной инициализацией дефолтов)."""
+def get_groups(request: Request):
+    """
+    Список групп из каталога в памяти (дефолтные группы добавляются в БД при старте).
+    Ответ — заранее закодированные (и при необходимости сжатые) байты с ETag.
+    """
     try:
-        with get_db_connection() as conn:
-            _ensure_default_groups(conn)
-            cur = conn.execute(
-                "SELECT DISTINCT group_name FROM schedule_groups ORDER BY group_name"
-            )
-            groups = [row["group_name"] for row in cur.fetchall()]
-            return groups
+        return group_catalog.body.response(request)
     except Exception as e:
         logger.error(f"Ошибка получения групп: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения групп")
 
 @router.get("/groups/default")
 def get_default_groups():
-    """Дефолтный список групп без БД (из кода)."""
-    return DEFAULT_GROUPS
+    """Группы, в которые можно регистрироваться (активные направления и годы каталога)."""
+    return group_catalog.valid_names()
 
-@router.post("/groups")
+@router.post("/groups", dependencies=_catalog_admin)
 def create_group(group_data: GroupCreate):
     """Добавить группу."""
     try:
@@ -45,8 +37,10 @@ def create_group(group_data: GroupCreate):
                 "INSERT OR IGNORE INTO schedule_groups (group_name) VALUES (?)",
                 (group_data.group_name,)
             )
+            bump_version(conn)
             conn.commit()
-            return {"message": "Группа добавлена успешно"}
+        group_catalog.load()
+        return {"message": "Группа добавлена успешно"}
     except Exception as e:
         logger.error(f"Ошибка добавления группы: {e}")
         raise HTTPException(status_code=500, detail="Ошибка добавления группы")
@@ -61,8 +55,71 @@ def debug_groups():
             return {
                 "groups": groups,
                 "count": len(groups),
-                "default_groups": DEFAULT_GROUPS
+                "default_groups": group_catalog.valid_names()
             }
     except Exception as e:
         logger.error(f"Ошибка отладки групп: {e}")
         raise HTTPException(status_code=500, detail="Ошибка отладки групп")
+
+def _edit_catalog(sql: str, params: tuple, not_found: str = None):
+    """Изменение каталога: запрос + группы в schedule_groups + новая версия, одной транзакцией."""
+    try:
+        with get_db_connection() as conn:
+            cur = conn.execute(sql, params)
+            if not_found and cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail=not_found)
+            sync_schedule_groups(conn)
+            bump_version(conn)
+            conn.commit()
+        group_catalog.load()
+        return group_catalog.tree()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка изменения каталога групп: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка изменения каталога групп")
+
+@router.get("/groups/catalog")
+def get_catalog():
+    """Иерархия каталога: факультет -> направления (префиксы), годы набора."""
+    return group_catalog.tree()
+
+@router.get("/groups/catalog/year/{year}")
+def get_groups_by_year(year: int):
+    """Группы года набора."""
+    return list(group_catalog.by_year(year))
+
+@router.put("/groups/catalog/programmes/{prefix}", dependencies=_catalog_admin)
+def put_programme(prefix: str, payload: CatalogProgramme):
+    """Добавить/изменить направление. Его группы появляются сразу во всех воркерах."""
+    return _edit_catalog(
+        """INSERT INTO catalog_programmes (prefix, faculty, level, active) VALUES (?, ?, ?, ?)
+           ON CONFLICT(prefix) DO UPDATE SET faculty = excluded.faculty, level = excluded.level,
+               active = excluded.active, updated_at = CURRENT_TIMESTAMP""",
+        (prefix, payload.faculty, payload.level, int(payload.active)),
+    )
+
+@router.delete("/groups/catalog/programmes/{prefix}", dependencies=_catalog_admin)
+def delete_programme(prefix: str):
+    """Убрать направление (группы остаются в расписании, но регистрация в них закрывается)."""
+    return _edit_catalog(
+        "DELETE FROM catalog_programmes WHERE prefix = ?", (prefix,), "Направление не найдено"
+    )
+
+@router.put("/groups/catalog/years/{year}", dependencies=_catalog_admin)
+def put_year(year: int, payload: CatalogYear):
+    """Добавить/изменить год набора."""
+    if not 2000 <= year <= 2099:
+        raise HTTPException(status_code=400, detail="Некорректный год")
+    suffix = payload.suffix or f"{year % 100:02d}"
+    return _edit_catalog(
+        """INSERT INTO catalog_years (year, suffix, active) VALUES (?, ?, ?)
+           ON CONFLICT(year) DO UPDATE SET suffix = excluded.suffix, active = excluded.active,
+               updated_at = CURRENT_TIMESTAMP""",
+        (year, suffix, int(payload.active)),
+    )
+
+@router.delete("/groups/catalog/years/{year}", dependencies=_catalog_admin)
+def delete_year(year: int):
+    """Убрать год набора."""
+    return _edit_catalog("DELETE FROM catalog_years WHERE year = ?", (year,), "Год не найден")
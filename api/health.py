@@ -1,9 +1,78 @@
-from fastapi import APIRouter
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from anyio.to_thread import current_default_thread_limiter
 from datetime import datetime
-from database.connection import get_db_connection
+from database.connection import database_path, get_db_connection, probe_schema_version, wal_status
+from database.migrations import SCHEMA_VERSION
+from utils.auth import require_roles
+from utils.backup import last_backup
 from utils.logger import logger
+from utils.passwords import password_pool
+from utils.ratelimit import rate_limit_stats
+from utils.push_outbox import push_dispatcher
+from utils.fcm import fcm_stats
+from utils.push_fanout import fanout_reports
+from utils.events import event_hub
+from utils.cache_versions import cache_watcher
+from utils.images import image_pipeline
+from api.presence import presence_hub
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
+# Пробы оркестратора — в корне, без префикса /api
+probe_router = APIRouter(route_class=FastJSONRoute)
+# Свой поток для пробы БД: не ждём в очереди общего пула и не блокируем event loop
+_probe_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readyz")
+
+
+@probe_router.get("/livez", include_in_schema=False)
+async def livez():
+    """Процесс жив и event loop отвечает. Без ввода-вывода."""
+    return {"status": "ok"}
+
+
+def _check(ok: bool, **details) -> dict:
+    return {"ok": ok, **details}
+
+
+@probe_router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """
+    Готовность принимать трафик: 200 или 503 со списком проверок.
+    async — чтобы проба не вставала в очередь занятого пула потоков; чтение
+    user_version идёт в отдельном потоке (_probe_executor), не в event loop.
+    """
+    checks = {}
+    try:
+        version = await asyncio.get_running_loop().run_in_executor(_probe_executor, probe_schema_version)
+        checks["database"] = _check(version >= SCHEMA_VERSION, schema_version=version, expected=SCHEMA_VERSION)
+    except Exception as e:
+        logger.error(f"readyz: БД недоступна: {e}")
+        checks["database"] = _check(False, error=str(e))
+
+    limiter = current_default_thread_limiter().statistics()
+    checks["threadpool"] = _check(
+        limiter.tasks_waiting < limiter.total_tokens,
+        busy=limiter.borrowed_tokens, size=limiter.total_tokens, waiting=limiter.tasks_waiting,
+    )
+    passwords = password_pool.stats()
+    checks["bcrypt_pool"] = _check(
+        passwords["in_flight"] < passwords["queue_limit"],
+        in_flight=passwords["in_flight"], limit=passwords["queue_limit"],
+    )
+    checks["push_dispatcher"] = _check(push_dispatcher.is_alive())
+    checks["cache_watcher"] = _check(cache_watcher.is_alive())
+    checks["event_hub"] = _check(event_hub.running)
+    checks["presence"] = _check(presence_hub.running)
+
+    ready = all(c["ok"] for c in checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=200 if ready else 503,
+    )
 
 @router.get("/health")
 def health_check():
@@ -18,9 +87,63 @@ def health_check():
         }
     except Exception as e:
         logger.error(f"Ошибка проверки здоровья сервера: {e}")
-        return {
+        return JSONResponse({
             "status": "error",
             "database": "unavailable",
             "timestamp": datetime.now().isoformat(),
             "error": str(e)
-        }
\ No newline at end of file
+        }, status_code=503)
+
+@router.get("/health/passwords")
+def password_pool_stats():
+    """Метрики пула bcrypt: очередь, отказы (503), время хэширования и ожидания"""
+    return password_pool.stats()
+
+@router.get("/health/rate-limits")
+def rate_limits():
+    """Счётчики ограничителя попыток входа/регистрации по маршрутам"""
+    return rate_limit_stats()
+
+@router.get("/health/push")
+def push_queue_stats():
+    """Состояние очереди пушей: отправлено, повторы, dead-letter"""
+    return {**push_dispatcher.stats(), "fcm": fcm_stats(), "fanout": fanout_reports()}
+
+@router.get("/health/events")
+def events_stats():
+    """SSE-лента: подписчики этого воркера и заполненность буфера событий"""
+    return event_hub.stats()
+
+@router.get("/health/media")
+def media_stats():
+    """Миниатюры: очередь, ошибки, задержка от загрузки до готовых миниатюр"""
+    return image_pipeline.stats()
+
+@router.get("/health/deep", dependencies=[Depends(require_roles("admin", "developer"))])
+def deep_health():
+    """Состояние файла БД: WAL, страницы, freelist, резервные копии. Только чтение."""
+    try:
+        path = database_path()
+        with get_db_connection() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            schema_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        return {
+            "path": path,
+            "journal_mode": journal_mode,
+            "schema_version": schema_version,
+            "expected_schema_version": SCHEMA_VERSION,
+            "db_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+            **(wal_status(path) if journal_mode == "wal" else {}),
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist,
+            "freelist_ratio": round(freelist / page_count, 4) if page_count else 0,
+            "last_backup": last_backup(),
+            "timestamp": datetime.now().isoformat(),
+        }
+    except Exception as e:
+        logger.error(f"Ошибка расширенной проверки БД: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка расширенной проверки БД")
@@ -0,0 +1,60 @@
+# api/media.py
+import os
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+
+from utils.auth import require_roles
+from utils.images import (
+    MEDIA_MAX_BYTES, MEDIA_NAME_RE, describe, image_pipeline, media_path, original_name,
+)
+from utils.logger import logger
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+# Адрес файла зависит от его содержимого, поэтому кэшировать можно «навсегда»
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+@router.post("/media/images", dependencies=[Depends(require_roles("admin", "developer"))])
+def upload_image(file: UploadFile = File(...)):
+    """
+    Загрузка картинки для новости. Возвращает ссылку на оригинал (её кладём в image_url)
+    и ссылки на миниатюры; ready=false — миниатюры ещё готовятся в фоне.
+    """
+    raw = file.file.read(MEDIA_MAX_BYTES + 1)
+    if len(raw) > MEDIA_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Файл слишком большой")
+    try:
+        result = image_pipeline.store(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        logger.error(f"Ошибка сохранения картинки: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка сохранения картинки")
+
+    logger.info(f"Загружена картинка {result['id'][:12]} ({len(raw)} байт)")
+    return result
+
+
+@router.get("/media/images/{digest}")
+def image_info(digest: str):
+    """Ссылки и готовность миниатюр для ранее загруженной картинки."""
+    if not MEDIA_NAME_RE.match(f"{digest}.jpg"):
+        raise HTTPException(status_code=404, detail="Картинка не найдена")
+    for ext in ("jpg", "png", "gif", "webp"):
+        if os.path.exists(media_path(original_name(digest, ext))):
+            return describe(digest, ext)
+    raise HTTPException(status_code=404, detail="Картинка не найдена")
+
+
+@router.get("/media/{kind}/{a}/{b}/{name}")
+def media_file(kind: str, a: str, b: str, name: str):
+    """Оригиналы (o) и миниатюры (t) с долгим неизменяемым кэшем."""
+    if kind not in ("o", "t") or not MEDIA_NAME_RE.match(name) or name[:2] != a or name[2:4] != b:
+        raise HTTPException(status_code=404, detail="Файл не найден")
+    path = media_path(f"{kind}/{a}/{b}/{name}")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Файл не найден")
+    return FileResponse(path, headers={"Cache-Control": IMMUTABLE_CACHE})
@@ -0,0 +1,91 @@
+# api/metrics.py
+"""
+GET /metrics — метрики этого воркера в формате Prometheus.
+
+Гистограммы и счётчики запросов пишутся в utils.metrics из горячих путей;
+здесь регистрируются гауги, которые считаются только при сборке.
+"""
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from api.presence import presence_hub
+from database.connection import database_path, get_db_connection
+from utils.events import event_hub
+from utils.metrics import gauge, render_metrics
+from utils.passwords import password_pool
+from utils.push_outbox import push_dispatcher
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+# charset=utf-8 PlainTextResponse допишет сам
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+@gauge("sqlite_db_bytes", "Размер файла БД")
+def _db_bytes():
+    path = database_path()
+    return None if path == ":memory:" else _file_size(path)
+
+
+@gauge("sqlite_wal_bytes", "Размер WAL-файла (растёт, если checkpoint не успевает)")
+def _wal_bytes():
+    path = database_path()
+    return None if path == ":memory:" else _file_size(path + "-wal")
+
+
+@gauge("push_outbox_queue", "Записи очереди пушей по статусу", ("status",))
+def _push_queue():
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM push_outbox GROUP BY status").fetchall()
+    return {(row["status"],): row["n"] for row in rows}
+
+
+@gauge("push_sent_total", "Отправлено пушей этим воркером", kind="counter")
+def _push_sent():
+    return push_dispatcher.sent
+
+
+@gauge("push_failed_attempts_total", "Неудачные попытки отправки пушей", kind="counter")
+def _push_failed():
+    return push_dispatcher.failed
+
+
+@gauge("push_dead_total", "Пуши, перенесённые в dead-letter", kind="counter")
+def _push_dead():
+    return push_dispatcher.dead
+
+
+@gauge("presence_online_users", "Пользователи онлайн (открытый WebSocket присутствия)")
+def _online_users():
+    return presence_hub.online_count
+
+
+@gauge("presence_connections", "Открытые WebSocket-соединения присутствия")
+def _presence_connections():
+    return presence_hub.connection_count
+
+
+@gauge("sse_subscribers", "Подписчики SSE-ленты /api/events")
+def _sse_subscribers():
+    return event_hub.subscribers
+
+
+@gauge("bcrypt_in_flight", "Хэширования bcrypt в работе и в очереди")
+def _bcrypt_in_flight():
+    return password_pool.stats()["in_flight"]
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -2,44 +2,63 @@
 import json
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Form, Query
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Form, Query, Response
 from database.connection import get_db_connection
+from utils.auth import Principal, require_roles
+from utils.events import publish_event
+from utils.images import thumbnail_url
 from utils.logger import logger
-from utils.fcm import send_news_to_topic
+from utils.push_outbox import enqueue_push, push_dispatcher
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
 
-router = APIRouter()
+NEWS_PAGE_DEFAULT = 20
+NEWS_PAGE_MAX = 100
+
+
+def _parse_image_url(image_url):
+    """image_url может храниться как JSON-список ссылок — отдаём списком."""
+    if image_url and isinstance(image_url, str):
+        try:
+            parsed = json.loads(image_url)
+            if isinstance(parsed, list):
+                return parsed
+        except Exception:
+            pass
+    return image_url
 
 
 @router.post("/news")
-async def add_news(
+def add_news(
     title: str = Form(...),
     text: str = Form(...),
     image_url: str = Form(None),
 ):
     try:
-        with get_db_connection() as conn:
-            conn.execute(
-                "INSERT INTO news (title, text, image_url, created_at) VALUES (?, ?, ?, ?)",
-                (title, text, image_url, datetime.utcnow())
-            )
-            conn.commit()
-
-        # превью для пуша — первая строка, обрезаем до ~120
         # превью для пуша — первая строка, обрезаем до ~120
         preview = (text or "").split("\n", 1)[0]
         if len(preview) > 120:
             preview = preview[:120] + "…"
 
-        # Пытаемся отправить пуш — ЛОГИРУЕМ, но не роняем API
-        try:
-            send_news_to_topic(
-                title=title,
-                body=preview,
-                data={"type": "news", "title": title},
-                topic="news",
+        with get_db_connection() as conn:
+            cur = conn.execute(
+                "INSERT INTO news (title, text, image_url, created_at) VALUES (?, ?, ?, ?)",
+                (title, text, image_url, datetime.utcnow())
             )
-        except Exception as push_err:
-            logger.warning(f"Пуш не отправлен: {push_err}")
+            news_id = cur.lastrowid
+            # Пуш уходит из очереди в фоне — в той же транзакции, что и новость
+            enqueue_push(conn, "topic", {
+                "title": title,
+                "body": preview,
+                "data": {"type": "news", "title": title},
+                "topic": "news",
+            })
+            conn.commit()
+        push_dispatcher.notify()
+        publish_event("news", {"id": news_id, "action": "created"})
 
         logger.info(f"Добавлена новость: {title}")
         return {"message": "Новость добавлена"}
@@ -48,24 +67,57 @@ async def add_news(
         raise HTTPException(status_code=500, detail="Ошибка добавления новости")
 
 @router.get("/news")
-async def get_news():
-    """Получить список новостей"""
+def get_news(
+    response: Response,
+    limit: int = Query(NEWS_PAGE_DEFAULT, ge=1, le=NEWS_PAGE_MAX),
+    before: Optional[int] = Query(None, description="id последней новости предыдущей страницы"),
+    headers_only: bool = Query(False, description="Без поля text (только заголовки для ленты)"),
+):
+    """
+    Лента новостей постранично (keyset по (created_at, id), от новых к старым).
+    Если есть следующая страница — её курсор в заголовке X-Next-Before.
+    """
+    columns = "id, title, image_url, created_at" if headers_only else "id, title, text, image_url, created_at"
     try:
         with get_db_connection() as conn:
-            cur = conn.execute(
-                "SELECT id, title, text, image_url, created_at FROM news ORDER BY created_at DESC"
-            )
+            if before is None:
+                cur = conn.execute(
+                    f"SELECT {columns} FROM news ORDER BY created_at DESC, id DESC LIMIT ?",
+                    (limit + 1,)
+                )
+            else:
+                anchor = conn.execute(
+                    "SELECT CAST(created_at AS TEXT) AS ts FROM news WHERE id = ?", (before,)
+                ).fetchone()
+                if anchor:
+                    cur = conn.execute(
+                        f"""SELECT {columns} FROM news
+                            WHERE (created_at, id) < (?, ?)
+                            ORDER BY created_at DESC, id DESC LIMIT ?""",
+                        (anchor["ts"], before, limit + 1)
+                    )
+                else:
+                    # Новость-курсор удалили — id растут вместе с created_at
+                    cur = conn.execute(
+                        f"SELECT {columns} FROM news WHERE id < ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                        (before, limit + 1)
+                    )
             rows = cur.fetchall()
-            return [
-                {
-                    "id": row["id"],
-                    "title": row["title"],
-                    "text": row["text"],
-                    "image_url": row["image_url"],
-                    "created_at": row["created_at"]
-                }
-                for row in rows
-            ]
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Before"] = str(rows[-1]["id"])
+
+        items = []
+        for row in rows:
+            item = {"id": row["id"], "title": row["title"]}
+            if not headers_only:
+                item["text"] = row["text"]
+            item["image_url"] = _parse_image_url(row["image_url"])
+            item["thumbnail_url"] = thumbnail_url(item["image_url"])
+            item["created_at"] = row["created_at"]
+            items.append(item)
+        return items
     except Exception as e:
         logger.error(f"Ошибка получения новостей: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения новостей")
@@ -79,7 +131,7 @@ def get_latest_news():
                 """
                 SELECT id, title, text, image_url, created_at
                 FROM news
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT 1
                 """
             )
@@ -87,20 +139,13 @@ def get_latest_news():
             if not news:
                 return {}
 
-            image_url = news["image_url"]
-            if image_url and isinstance(image_url, str):
-                try:
-                    parsed = json.loads(image_url)
-                    if isinstance(parsed, list):
-                        image_url = parsed
-                except Exception:
-                    pass
-
+            image_url = _parse_image_url(news["image_url"])
             return {
                 "id": news["id"],
                 "title": news["title"],
                 "text": news["text"],
                 "image_url": image_url,
+                "thumbnail_url": thumbnail_url(image_url),
                 "created_at": news["created_at"]
             }
     except Exception as e:
@@ -108,23 +153,16 @@ def get_latest_news():
         raise HTTPException(status_code=500, detail="Ошибка получения новости")
 
 @router.delete("/news/{news_id}")
-async def delete_news(news_id: int, user_id: str = Query(...)):
+def delete_news(
+    news_id: int,
+    principal: Principal = Depends(require_roles("admin", "developer")),
+):
     """
     Удалить новость по ID (только admin или developer).
-    user_id нужно передавать как параметр запроса (?user_id=XXXXXX).
+    Роль берётся из токена (Authorization: Bearer ...) без запроса к БД.
     """
     try:
         with get_db_connection() as conn:
-            # Проверяем роль пользователя
-            cur = conn.execute("SELECT role FROM users WHERE user_id = ?", (user_id,))
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="Пользователь не найден")
-
-            role = row["role"]
-            if role not in ("admin", "developer"):
-                raise HTTPException(status_code=403, detail="Доступ запрещен")
-
             # Проверяем наличие новости
             cur = conn.execute("SELECT id FROM news WHERE id = ?", (news_id,))
             if not cur.fetchone():
@@ -133,8 +171,9 @@ async def delete_news(news_id: int, user_id: str = Query(...)):
             # Удаляем новость
             conn.execute("DELETE FROM news WHERE id = ?", (news_id,))
             conn.commit()
+        publish_event("news", {"id": news_id, "action": "deleted"})
 
-        logger.info(f"Пользователь {user_id} ({role}) удалил новость ID={news_id}")
+        logger.info(f"Пользователь {principal.user_id} ({principal.role}) удалил новость ID={news_id}")
         return {"message": "Новость удалена успешно"}
     except HTTPException:
         raise
@@ -1,7 +1,28 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import time
+import uuid
+from typing import Dict, Set
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
+from starlette.concurrency import run_in_threadpool
 from database.connection import get_db_connection
+from utils.auth import decode_token
+from utils.logger import logger
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+ws_router = APIRouter()
+
+# Как часто обновляем last_seen у всех, кто держит соединение открытым.
+# Должно быть меньше окна «онлайн» в /api/users (120 сек).
+PRESENCE_TOUCH_INTERVAL = 60
+# Строки presence_sessions, не продлённые так долго, — от упавшего воркера
+PRESENCE_STALE_SECONDS = PRESENCE_TOUCH_INTERVAL * 2.5
+# Как часто воркер сверяет общее число онлайн (изменения на других воркерах)
+PRESENCE_SYNC_SECONDS = 2
+
+ADMIN_ROLES = ("admin", "developer")
 
-router = APIRouter()
 
 @router.post("/presence/ping")
 def presence_ping(payload: dict):
@@ -15,3 +36,210 @@ def presence_ping(payload: dict):
         conn.execute("UPDATE users SET last_seen = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?", (user_id,))
         conn.commit()
     return {"status": "ok"}
+
+
+def _open_presence(user_id: str, worker_id: str) -> bool:
+    """Отмечает пользователя онлайн на этом воркере. False — пользователя нет в БД."""
+    with get_db_connection() as conn:
+        cur = conn.execute(
+            "UPDATE users SET last_seen = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
+            (user_id,)
+        )
+        if cur.rowcount != 1:
+            return False
+        conn.execute(
+            "INSERT OR REPLACE INTO presence_sessions (worker_id, user_id, seen_at) VALUES (?, ?, ?)",
+            (worker_id, user_id, time.time())
+        )
+        conn.commit()
+        return True
+
+
+def _close_presence(user_id: str, worker_id: str):
+    """Закрылось последнее соединение пользователя на этом воркере."""
+    with get_db_connection() as conn:
+        conn.execute("UPDATE users SET last_seen = CURRENT_TIMESTAMP WHERE user_id = ?", (user_id,))
+        conn.execute(
+            "DELETE FROM presence_sessions WHERE worker_id = ? AND user_id = ?", (worker_id, user_id)
+        )
+        conn.commit()
+
+
+def _touch_last_seen(user_ids, worker_id: str):
+    """
+    Одним проходом продлевает last_seen и строки присутствия всем подключённым
+    к этому воркеру и удаляет строки упавших воркеров.
+    """
+    now = time.time()
+    with get_db_connection() as conn:
+        conn.executemany(
+            "UPDATE users SET last_seen = CURRENT_TIMESTAMP WHERE user_id = ?",
+            [(uid,) for uid in user_ids]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO presence_sessions (worker_id, user_id, seen_at) VALUES (?, ?, ?)",
+            [(worker_id, uid, now) for uid in user_ids]
+        )
+        conn.execute("DELETE FROM presence_sessions WHERE seen_at < ?", (now - PRESENCE_STALE_SECONDS,))
+        conn.commit()
+
+
+def _drop_worker_sessions(worker_id: str):
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM presence_sessions WHERE worker_id = ?", (worker_id,))
+        conn.commit()
+
+
+def _count_online() -> int:
+    """Пользователи онлайн по всем воркерам."""
+    with get_db_connection() as conn:
+        return conn.execute(
+            "SELECT COUNT(DISTINCT user_id) FROM presence_sessions WHERE seen_at >= ?",
+            (time.time() - PRESENCE_STALE_SECONDS,)
+        ).fetchone()[0]
+
+
+class PresenceHub:
+    """
+    Открытые WebSocket-соединения присутствия. Открытое соединение = пользователь онлайн.
+    Сокеты — в памяти воркера; кто онлайн — в таблице presence_sessions, общей для
+    всех воркеров, поэтому число онлайн у админов одинаковое на любом воркере.
+    Все методы вызываются из event loop, поэтому блокировки не нужны.
+    """
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._sockets: Dict[str, Set[WebSocket]] = {}
+        self._admins: Set[WebSocket] = set()
+        self._online = 0  # последнее число онлайн по всем воркерам
+        self._changed = asyncio.Event()
+        self._tasks = []
+
+    @property
+    def online_count(self) -> int:
+        return self._online
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(s) for s in self._sockets.values())
+
+    async def connect(self, user_id: str, ws: WebSocket, is_admin: bool):
+        first = user_id not in self._sockets
+        self._sockets.setdefault(user_id, set()).add(ws)
+        if is_admin:
+            self._admins.add(ws)
+            self._online = await run_in_threadpool(_count_online)
+            await self._send_count(ws)
+        if first:
+            self._changed.set()
+
+    async def disconnect(self, user_id: str, ws: WebSocket) -> bool:
+        """Возвращает True, если закрылось последнее соединение пользователя на этом воркере."""
+        self._admins.discard(ws)
+        sockets = self._sockets.get(user_id)
+        if sockets is None:
+            return False
+        sockets.discard(ws)
+        if sockets:
+            return False
+        del self._sockets[user_id]
+        self._changed.set()
+        return True
+
+    async def _send_count(self, ws: WebSocket):
+        await ws.send_json({"type": "online", "online": self._online})
+
+    async def broadcast_online(self):
+        """Рассылает админам актуальное число пользователей онлайн."""
+        for ws in list(self._admins):
+            try:
+                await self._send_count(ws)
+            except Exception:
+                self._admins.discard(ws)
+
+    async def _sync_loop(self):
+        """
+        Пересчёт числа онлайн: сразу после изменений на этом воркере (пачкой)
+        и раз в PRESENCE_SYNC_SECONDS — чтобы увидеть изменения на других.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), PRESENCE_SYNC_SECONDS)
+                await asyncio.sleep(0.1)  # тысяча подключений подряд — один пересчёт
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            try:
+                online = await run_in_threadpool(_count_online)
+            except Exception as e:
+                logger.error(f"Ошибка подсчёта пользователей онлайн: {e}")
+                continue
+            if online != self._online:
+                self._online = online
+                await self.broadcast_online()
+
+    async def _touch_loop(self):
+        while True:
+            await asyncio.sleep(PRESENCE_TOUCH_INTERVAL)
+            try:
+                await run_in_threadpool(_touch_last_seen, list(self._sockets), self.worker_id)
+            except Exception as e:
+                logger.error(f"Ошибка продления last_seen: {e}")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not any(task.done() for task in self._tasks)
+
+    def start(self):
+        if not self._tasks:
+            self._changed = asyncio.Event()  # привязка к event loop сервера
+            self._tasks = [asyncio.create_task(self._touch_loop()), asyncio.create_task(self._sync_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        try:
+            await run_in_threadpool(_drop_worker_sessions, self.worker_id)
+        except Exception as e:
+            logger.error(f"Ошибка очистки присутствия воркера: {e}")
+
+
+presence_hub = PresenceHub()
+
+
+@ws_router.websocket("/ws/presence")
+async def presence_socket(websocket: WebSocket, token: str = Query(..., description="Токен доступа")):
+    """
+    Канал присутствия: пока соединение открыто, пользователь считается онлайн.
+    Авторизация — токен доступа в ?token= (браузерный WebSocket не умеет слать
+    заголовок Authorization); пользователь и роль берутся из токена.
+    Админы (admin/developer) дополнительно получают {"type": "online", "online": N}
+    при подключении и при каждом изменении числа пользователей онлайн (по всем
+    воркерам; изменения на других воркерах — в пределах PRESENCE_SYNC_SECONDS).
+    Клиент может слать "ping" для поддержания соединения — ответим "pong".
+    """
+    principal = decode_token(token)
+    if principal is None:
+        await websocket.close(code=4401)
+        return
+    user_id = principal.user_id
+    if not await run_in_threadpool(_open_presence, user_id, presence_hub.worker_id):
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    await presence_hub.connect(user_id, websocket, principal.role in ADMIN_ROLES)
+    try:
+        while True:
+            message = await websocket.receive_text()
+            if message == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if await presence_hub.disconnect(user_id, websocket):
+            try:
+                await run_in_threadpool(_close_presence, user_id, presence_hub.worker_id)
+            except Exception as e:
+                logger.error(f"Ошибка обновления last_seen при отключении: {e}")
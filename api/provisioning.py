@@ -0,0 +1,37 @@
+# api/provisioning.py
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from models.request_models import BulkOperationResponse
+from utils.auth import require_roles
+from utils.logger import logger
+from utils.provisioning import ROSTER_MODELS, parse_roster, provision
+from utils.fast_json import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+
+@router.post(
+    "/provisioning/{kind}",
+    response_model=BulkOperationResponse,
+    dependencies=[Depends(require_roles("admin", "developer"))],
+)
+def bulk_provision(kind: str, file: UploadFile = File(...)):
+    """
+    Массовая регистрация по списку: kind = students | teachers.
+    Файл — CSV (заголовки: full_name, login, password, group_name | department, position)
+    или JSON-массив с теми же полями.
+    """
+    if kind not in ROSTER_MODELS:
+        raise HTTPException(status_code=404, detail="Неизвестный тип списка")
+
+    try:
+        rows = parse_roster(file.file.read(), file.filename or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Не удалось разобрать файл: {e}")
+
+    try:
+        return provision(kind, rows)
+    except HTTPException:
+        raise  # PasswordPoolBusy -> 503
+    except Exception as e:
+        logger.error(f"Ошибка массовой регистрации: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка массовой регистрации")
@@ -1,15 +1,36 @@
 # api/schedule.py
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Request
+from typing import Callable, List, Dict, Optional, Tuple
 from database.connection import get_db_connection
+from data.group_catalog import bump_version, group_catalog
+from utils import cache_versions
+from utils.compression import CachedBody
+from utils.events import publish_event
 from utils.logger import logger
+from utils.metrics import cache_hit, cache_miss
+from utils.push_outbox import enqueue_push, push_dispatcher
 from models.schedule_models import ScheduleData, LessonItem
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 ALLOWED_DAYS = (
     "Понедельник", "Вторник", "Среда", "Четверг", "Пятница"
 )
+WEEK_TITLES = {"upper": "Верхняя неделя", "lower": "Нижняя неделя"}
+
+# Пуш об изменении уходит через столько секунд после ПОСЛЕДНЕГО сохранения
+# (серия сохранений подряд даёт одно уведомление)
+SCHEDULE_NOTIFY_DEBOUNCE = float(os.getenv("SCHEDULE_NOTIFY_DEBOUNCE", 60))
+# Готовые ответы GET /schedule/...: (группа, неделя или None) -> тело + сжатые варианты
+SCHEDULE_CACHE_SIZE = int(os.getenv("SCHEDULE_CACHE_SIZE", 512))
 
 
 def _normalize_lessons(lessons: List[LessonItem]) -> List[Dict]:
@@ -38,11 +59,166 @@ def _normalize_lessons(lessons: List[LessonItem]) -> List[Dict]:
     return out
 
 
+def group_topic(group: str) -> str:
+    """
+    FCM-топик группы. Имена топиков — только [a-zA-Z0-9-_.~%],
+    поэтому кириллицу кодируем: "ПИ-25" -> "group_%D0%9F%D0%98-25".
+    Клиент подписывается на тот же топик.
+    """
+    return "group_" + quote(group, safe="-_.~")
+
+
+def _day_snapshot(conn: sqlite3.Connection, group: str) -> Dict[Tuple[str, str], list]:
+    """Текущее расписание группы: (неделя, день) -> список пар в виде кортежей."""
+    cur = conn.execute(
+        """SELECT week_type, day_name, lesson_number, subject, teacher, classroom, lesson_type
+           FROM schedule WHERE group_name = ? ORDER BY week_type, day_name, lesson_number""",
+        (group,)
+    )
+    out: Dict[Tuple[str, str], list] = {}
+    for row in cur.fetchall():
+        out.setdefault((row["week_type"], row["day_name"]), []).append(
+            (row["lesson_number"], row["subject"], row["teacher"], row["classroom"], row["lesson_type"])
+        )
+    return out
+
+
+def _changes_text(group: str, changed: List[List[str]]) -> str:
+    parts = []
+    for week in ("upper", "lower"):
+        days = [day for w, day in changed if w == week]
+        days.sort(key=ALLOWED_DAYS.index)
+        if days:
+            parts.append(f"{WEEK_TITLES[week]}: {', '.join(days)}")
+    return f"Группа {group}. " + "; ".join(parts)
+
+
+def _schedule_payload(group: str, changed: List[List[str]]) -> dict:
+    return {
+        "title": "Изменение расписания",
+        "body": _changes_text(group, changed),
+        "data": {
+            "type": "schedule",
+            "group": group,
+            "days": ",".join(f"{w}:{d}" for w, d in changed),
+        },
+        "topic": group_topic(group),
+        "changed": changed,
+    }
+
+
+def _merge_schedule_push(old: dict, new: dict) -> dict:
+    """Склейка с ещё не отправленным пушем: объединяем изменённые дни."""
+    changed = [list(x) for x in old.get("changed", [])]
+    for item in new["changed"]:
+        if item not in changed:
+            changed.append(item)
+    return _schedule_payload(new["data"]["group"], changed)
+
+
+def _enqueue_schedule_push(conn: sqlite3.Connection, group: str, changed: List[List[str]]):
+    """Один отложенный пуш на группу; повторные сохранения сдвигают отправку (debounce)."""
+    enqueue_push(
+        conn, "topic", _schedule_payload(group, changed),
+        delay=SCHEDULE_NOTIFY_DEBOUNCE,
+        dedupe_key=f"schedule:{group}",
+        merge=_merge_schedule_push,
+    )
+
+
+def _fetch_week(conn: sqlite3.Connection, group_name: str, week_type: str) -> Dict[str, List[Dict]]:
+    cur = conn.execute(
+        f"""
+        SELECT day_name, lesson_number, subject, teacher, classroom, lesson_type
+        FROM schedule
+        WHERE group_name = ? AND week_type = ?
+          AND day_name IN ({",".join("?"*len(ALLOWED_DAYS))})
+        ORDER BY
+          CASE day_name
+            WHEN 'Понедельник' THEN 1
+            WHEN 'Вторник' THEN 2
+            WHEN 'Среда' THEN 3
+            WHEN 'Четверг' THEN 4
+            WHEN 'Пятница' THEN 5
+          END,
+          lesson_number
+        """,
+        (group_name, week_type, *ALLOWED_DAYS)
+    )
+    data: Dict[str, List[Dict]] = {}
+    for row in cur.fetchall():
+        data.setdefault(row["day_name"], []).append({
+            "lesson_number": row["lesson_number"],
+            "subject": row["subject"],
+            "teacher": row["teacher"],
+            "classroom": row["classroom"],
+            "type": row["lesson_type"],   # фронт ждёт ключ 'type'
+        })
+    return data
+
+
+class _ScheduleCache:
+    """
+    LRU готовых ответов. Поколение защищает от гонки: ответ, собранный до
+    сохранения расписания, не попадёт в кэш после его сброса.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[tuple, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, key: tuple) -> Optional[CachedBody]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: CachedBody, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, group: Optional[str] = None):
+        with self._lock:
+            self.generation += 1
+            if group is None:
+                self._items.clear()
+            else:
+                for key in [k for k in self._items if k[0] == group]:
+                    del self._items[key]
+
+
+_schedule_cache = _ScheduleCache(SCHEDULE_CACHE_SIZE)
+# Расписание сохранили на другом воркере — сбрасываем кэш целиком (сохранения редкие)
+cache_versions.cache_watcher.register("schedule", lambda version: _schedule_cache.invalidate())
+
+
+def _cached_schedule(key: tuple, build: Callable[[sqlite3.Connection], dict]) -> CachedBody:
+    body = _schedule_cache.get(key)
+    if body is not None:
+        cache_hit("schedule")
+        return body
+    cache_miss("schedule")
+    generation = _schedule_cache.generation
+    with get_db_connection() as conn:
+        body = CachedBody.from_json(build(conn))
+    _schedule_cache.put(key, body, generation)
+    return body
+
+
 @router.post("/schedule")
 def save_schedule(schedule_data: ScheduleData):
     """
     Сохранение расписания (обе недели разом) для группы.
     Полностью пересобираем (DELETE + INSERT), чтобы избежать «зависших» строк.
+    Если какие-то дни реально изменились — в той же транзакции ставим пуш в топик группы.
     """
     try:
         with get_db_connection() as conn:
@@ -56,7 +232,14 @@ def save_schedule(schedule_data: ScheduleData):
                     "INSERT INTO schedule_groups (group_name) VALUES (?)",
                     (schedule_data.group,)
                 )
+                bump_version(conn)
                 logger.info(f"Добавлена новая группа: {schedule_data.group}")
+                new_group = True
+            else:
+                new_group = False
+
+            before = _day_snapshot(conn, schedule_data.group)
+            after: Dict[Tuple[str, str], list] = {}
 
             # полностью пересобираем расписание для группы
             conn.execute(
@@ -75,6 +258,11 @@ def save_schedule(schedule_data: ScheduleData):
                         continue
 
                     norm = _normalize_lessons(lessons)
+                    if norm:
+                        after[(week_type, day)] = [
+                            (l["lesson_number"], l["subject"], l["teacher"], l["classroom"], l["type"])
+                            for l in norm
+                        ]
                     for l in norm:
                         conn.execute(
                             """
@@ -89,12 +277,31 @@ def save_schedule(schedule_data: ScheduleData):
                                 l["classroom"], l["type"]
                             )
                         )
-                    logger.info(
-                        f"Сохранено: group={schedule_data.group} week={week_type} day={day}: {len(norm)} пар"
-                    )
+
+            changed = [
+                [week, day]
+                for week in ("upper", "lower") for day in ALLOWED_DAYS
+                if before.get((week, day)) != after.get((week, day))
+            ]
+            if changed:
+                _enqueue_schedule_push(conn, schedule_data.group, changed)
+                cache_versions.bump_version(conn, "schedule")
 
             conn.commit()
-            logger.info(f"Расписание сохранено для группы: {schedule_data.group}")
+            if changed:
+                _schedule_cache.invalidate(schedule_data.group)
+            logger.info(
+                f"Расписание сохранено для группы: {schedule_data.group}, изменено дней: {len(changed)}"
+            )
+            if new_group:
+                group_catalog.load()
+            if changed:
+                push_dispatcher.notify()
+                publish_event("schedule", {
+                    "group": schedule_data.group,
+                    "version": int(time.time() * 1000),
+                    "days": [f"{w}:{d}" for w, d in changed],
+                })
             return {"message": "Расписание сохранено успешно"}
 
     except Exception as e:
@@ -103,7 +310,7 @@ def save_schedule(schedule_data: ScheduleData):
 
 
 @router.get("/schedule/{group_name}/{week_type}")
-def get_schedule(group_name: str, week_type: str):
+def get_schedule(group_name: str, week_type: str, request: Request):
     """
     Выдача расписания одной недели для группы — для мобильного «быстрого просмотра».
     Формат ответа: { "Понедельник": [{...}, ...], ... }
@@ -112,37 +319,7 @@ def get_schedule(group_name: str, week_type: str):
         if week_type not in ("upper", "lower"):
             raise HTTPException(status_code=400, detail="Неверный тип недели")
 
-        with get_db_connection() as conn:
-            cur = conn.execute(
-                f"""
-                SELECT day_name, lesson_number, subject, teacher, classroom, lesson_type
-                FROM schedule
-                WHERE group_name = ? AND week_type = ?
-                  AND day_name IN ({",".join("?"*len(ALLOWED_DAYS))})
-                ORDER BY
-                  CASE day_name
-                    WHEN 'Понедельник' THEN 1
-                    WHEN 'Вторник' THEN 2
-                    WHEN 'Среда' THEN 3
-                    WHEN 'Четверг' THEN 4
-                    WHEN 'Пятница' THEN 5
-                  END,
-                  lesson_number
-                """,
-                (group_name, week_type, *ALLOWED_DAYS)
-            )
-
-            data: Dict[str, List[Dict]] = {}
-            for row in cur.fetchall():
-                day = row["day_name"]
-                data.setdefault(day, []).append({
-                    "lesson_number": row["lesson_number"],
-                    "subject": row["subject"],
-                    "teacher": row["teacher"],
-                    "classroom": row["classroom"],
-                    "type": row["lesson_type"],   # фронт ждёт ключ 'type'
-                })
-            return data
+        return _cached_schedule((group_name, week_type), lambda conn: _fetch_week(conn, group_name, week_type)).response(request)
 
     except HTTPException:
         raise
@@ -152,7 +329,7 @@ def get_schedule(group_name: str, week_type: str):
 
 
 @router.get("/schedule/{group_name}")
-def get_full_schedule(group_name: str):
+def get_full_schedule(group_name: str, request: Request):
     """
     Полная выдача для редактора (обе недели).
     {
@@ -161,44 +338,14 @@ def get_full_schedule(group_name: str):
     }
     """
     try:
-        with get_db_connection() as conn:
-
-            def fetch_week(week: str) -> Dict[str, List[Dict]]:
-                cur = conn.execute(
-                    f"""
-                    SELECT day_name, lesson_number, subject, teacher, classroom, lesson_type
-                    FROM schedule
-                    WHERE group_name = ? AND week_type = ?
-                      AND day_name IN ({",".join("?"*len(ALLOWED_DAYS))})
-                    ORDER BY
-                      CASE day_name
-                        WHEN 'Понедельник' THEN 1
-                        WHEN 'Вторник' THEN 2
-                        WHEN 'Среда' THEN 3
-                        WHEN 'Четверг' THEN 4
-                        WHEN 'Пятница' THEN 5
-                      END,
-                      lesson_number
-                    """,
-                    (group_name, week, *ALLOWED_DAYS)
-                )
-                out: Dict[str, List[Dict]] = {}
-                for row in cur.fetchall():
-                    day = row["day_name"]
-                    out.setdefault(day, []).append({
-                        "lesson_number": row["lesson_number"],
-                        "subject": row["subject"],
-                        "teacher": row["teacher"],
-                        "classroom": row["classroom"],
-                        "type": row["lesson_type"],
-                    })
-                return out
-
+        def build(conn: sqlite3.Connection) -> dict:
             return {
-                "upper_week": fetch_week("upper"),
-                "lower_week": fetch_week("lower"),
+                "upper_week": _fetch_week(conn, group_name, "upper"),
+                "lower_week": _fetch_week(conn, group_name, "lower"),
             }
 
+        return _cached_schedule((group_name, None), build).response(request)
+
     except Exception as e:
         logger.error(f"Ошибка получения полного расписания: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения расписания")
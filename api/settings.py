@@ -2,8 +2,9 @@
 from fastapi import APIRouter, HTTPException
 from database.connection import get_db_connection
 from utils.logger import logger
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/settings/{key}")
 def get_setting(key: str):
@@ -1,36 +1,26 @@
 # api/students.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 import sqlite3
 from database.connection import get_db_connection
-from utils.logger import logger
+from utils.logger import logger, sampled
+from utils.auth import issue_token
+from utils.ratelimit import enforce_rate_limit
 from models.student_models import StudentCreate, StudentLogin, StudentResponse
-from data.groups import DEFAULT_GROUPS, get_group_info
-import bcrypt
+from data.group_catalog import group_catalog
+from utils.passwords import hash_password_pooled, verify_password_pooled
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
-
-def hash_password(password: str) -> str:
-    """Хэширование пароля"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-
-def is_valid_group(group_name: str) -> bool:
-    """Проверяет, является ли группа допустимой"""
-    return group_name in DEFAULT_GROUPS
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.post("/students/register", response_model=StudentResponse)
-def register_student(student_data: StudentCreate):
+def register_student(student_data: StudentCreate, request: Request):
     """Регистрация нового студента"""
+    enforce_rate_limit(request, "students_register", student_data.login)
     try:
-        if not is_valid_group(student_data.group_name):
+        if not group_catalog.is_valid(student_data.group_name):
             raise HTTPException(
                 status_code=400,
-                detail=f"Группа '{student_data.group_name}' не существует. Доступные группы: {DEFAULT_GROUPS}"
+                detail=f"Группа '{student_data.group_name}' не существует. Доступные группы: {group_catalog.valid_names()}"
             )
 
         with get_db_connection() as conn:
@@ -42,6 +32,9 @@ def register_student(student_data: StudentCreate):
             if cur.fetchone():
                 raise HTTPException(status_code=400, detail="Логин уже занят")
 
+            # Хэш до первой записи: транзакция не должна держать блокировку на время bcrypt
+            hashed_password = hash_password_pooled(student_data.password)
+
             cur = conn.execute("SELECT 1 FROM schedule_groups WHERE group_name = ?", (student_data.group_name,))
             if not cur.fetchone():
                 conn.execute(
@@ -50,8 +43,6 @@ def register_student(student_data: StudentCreate):
                 )
                 logger.info(f"Автоматически создана группа: {student_data.group_name}")
 
-            hashed_password = hash_password(student_data.password)
-
             conn.execute(
                 """INSERT INTO students (user_id, full_name, login, password, group_name)
                    VALUES (?, ?, ?, ?, ?)""",
@@ -66,7 +57,7 @@ def register_student(student_data: StudentCreate):
 
             conn.commit()
 
-            group_info = get_group_info(student_data.group_name)
+            group_info = group_catalog.info(student_data.group_name)
             logger.info(
                 f"Зарегистрирован новый студент: {student_data.login} в группе {student_data.group_name}")
 
@@ -89,8 +80,9 @@ def register_student(student_data: StudentCreate):
         raise HTTPException(status_code=500, detail="Ошибка регистрации")
 
 @router.post("/students/login", response_model=StudentResponse)
-def login_student(login_data: StudentLogin):
+def login_student(login_data: StudentLogin, request: Request):
     """Авторизация студента"""
+    enforce_rate_limit(request, "students_login", login_data.login)
     try:
         with get_db_connection() as conn:
             cur = conn.execute(
@@ -105,7 +97,7 @@ def login_student(login_data: StudentLogin):
             if not student:
                 raise HTTPException(status_code=404, detail="Студент не найден")
 
-            if not verify_password(login_data.password, student["password"]):
+            if not verify_password_pooled(login_data.password, student["password"]):
                 raise HTTPException(status_code=401, detail="Неверный пароль")
 
             conn.execute(
@@ -115,15 +107,19 @@ def login_student(login_data: StudentLogin):
 
             conn.commit()
 
-            group_info = get_group_info(student["group_name"])
-            logger.info(f"Студент авторизовался: {login_data.login} (группа: {student['group_name']})")
+            group_info = group_catalog.info(student["group_name"])
+            logger.info(
+                f"Студент авторизовался: {login_data.login} (группа: {student['group_name']})",
+                extra=sampled("students_login"),
+            )
             return {
                 "user_id": student["user_id"],
                 "full_name": student["full_name"],
                 "login": student["login"],
                 "group_name": student["group_name"],
                 "group_info": group_info,
-                "message": "Успешная авторизация"
+                "message": "Успешная авторизация",
+                **issue_token(student["user_id"], "student"),
             }
 
     except HTTPException:
@@ -148,7 +144,7 @@ def get_student_info(user_id: str):
             if not student:
                 raise HTTPException(status_code=404, detail="Студент не найден")
 
-            group_info = get_group_info(student["group_name"])
+            group_info = group_catalog.info(student["group_name"])
 
             return {
                 "full_name": student["full_name"],
@@ -178,7 +174,6 @@ def get_all_students():
 
             students = []
             for row in cur.fetchall():
-                logger.info(f"DEBUG: Student data: {row}")  # Логирование полученных данных
                 students.append({
                     "user_id": row["user_id"],
                     "full_name": row["full_name"],
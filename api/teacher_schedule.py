@@ -3,8 +3,9 @@ from fastapi import APIRouter, HTTPException
 from database.connection import get_db_connection
 from utils.logger import logger
 from models.schedule_models import TeacherScheduleData, TeacherScheduleResponse
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
 @router.post("/teacher-schedule")
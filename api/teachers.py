@@ -1,26 +1,20 @@
 # api/teachers.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 import sqlite3
 from database.connection import get_db_connection
-from utils.logger import logger
+from utils.logger import logger, sampled
+from utils.auth import issue_token
+from utils.ratelimit import enforce_rate_limit
 from models.teacher_models import TeacherCreate, TeacherLogin, TeacherResponse
-import bcrypt
+from utils.passwords import hash_password_pooled, verify_password_pooled
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
-
-def hash_password(password: str) -> str:
-    """Хэширование пароля"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.post("/teachers/register", response_model=TeacherResponse)
-def register_teacher(teacher_data: TeacherCreate):
+def register_teacher(teacher_data: TeacherCreate, request: Request):
     """Регистрация нового преподавателя"""
+    enforce_rate_limit(request, "teachers_register", teacher_data.login)
     try:
         with get_db_connection() as conn:
             cur = conn.execute("SELECT 1 FROM users WHERE user_id = ?", (teacher_data.user_id,))
@@ -31,7 +25,7 @@ def register_teacher(teacher_data: TeacherCreate):
             if cur.fetchone():
                 raise HTTPException(status_code=400, detail="Логин уже занят")
 
-            hashed_password = hash_password(teacher_data.password)
+            hashed_password = hash_password_pooled(teacher_data.password)
 
             conn.execute(
                 """INSERT INTO teachers (user_id, full_name, login, password, department, position)
@@ -67,8 +61,9 @@ def register_teacher(teacher_data: TeacherCreate):
         raise HTTPException(status_code=500, detail="Ошибка регистрации")
 
 @router.post("/teachers/login", response_model=TeacherResponse)
-def login_teacher(login_data: TeacherLogin):
+def login_teacher(login_data: TeacherLogin, request: Request):
     """Авторизация преподавателя"""
+    enforce_rate_limit(request, "teachers_login", login_data.login)
     try:
         with get_db_connection() as conn:
             cur = conn.execute(
@@ -82,7 +77,7 @@ def login_teacher(login_data: TeacherLogin):
             if not teacher:
                 raise HTTPException(status_code=404, detail="Преподаватель не найден")
 
-            if not verify_password(login_data.password, teacher["password"]):
+            if not verify_password_pooled(login_data.password, teacher["password"]):
                 raise HTTPException(status_code=401, detail="Неверный пароль")
 
             conn.execute(
@@ -92,14 +87,15 @@ def login_teacher(login_data: TeacherLogin):
 
             conn.commit()
 
-            logger.info(f"Преподаватель авторизовался: {login_data.login}")
+            logger.info(f"Преподаватель авторизовался: {login_data.login}", extra=sampled("teachers_login"))
             return {
                 "user_id": teacher["user_id"],
                 "full_name": teacher["full_name"],
                 "login": teacher["login"],
                 "department": teacher["department"],
                 "position": teacher["position"],
-                "message": "Успешная авторизация"
+                "message": "Успешная авторизация",
+                **issue_token(teacher["user_id"], "teacher"),
             }
 
     except HTTPException:
@@ -152,7 +148,6 @@ def get_all_teachers():
 
             teachers = []
             for row in cur.fetchall():
-                logger.info(f"DEBUG: Teacher data: {row}")  # Логирование полученных данных
                 teachers.append({
                     "user_id": row["user_id"],
                     "full_name": row["full_name"],
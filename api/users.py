@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 import sqlite3
 import uuid
 from datetime import datetime
 from database.connection import get_db_connection
+from utils.auth import invalidate_user_tokens, require_roles
 from utils.logger import logger
 from models.user_models import UserCreate, UserResponse, SettingsUpdate, UserRoleUpdate  # UserInfo убрали из response_model
+from utils.fast_json import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
 @router.post("/users", response_model=UserResponse)
@@ -193,9 +195,9 @@ def get_user_role(user_id: str):
         raise HTTPException(status_code=500, detail="Ошибка получения роли пользователя")
 
 
-@router.put("/users/role")
+@router.put("/users/role", dependencies=[Depends(require_roles("admin", "developer"))])
 def update_user_role(role_data: UserRoleUpdate):
-    """Изменение роли пользователя"""
+    """Изменение роли пользователя; выданные ему токены перестают действовать"""
     try:
         if role_data.role not in ["user", "admin", "developer", "teacher", "student"]:
             raise HTTPException(status_code=400, detail="Неверная роль пользователя")
@@ -212,6 +214,7 @@ def update_user_role(role_data: UserRoleUpdate):
                 "UPDATE users SET role = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
                 (role_data.role, role_data.user_id)
             )
+            invalidate_user_tokens(conn, role_data.user_id)
             conn.commit()
             logger.info(f"Роль пользователя {role_data.user_id} изменена на {role_data.role}")
             return {"message": "Роль пользователя успешно обновлена"}
@@ -222,9 +225,9 @@ def update_user_role(role_data: UserRoleUpdate):
         raise HTTPException(status_code=500, detail="Ошибка обновления роли пользователя")
 
 
-@router.delete("/users/{user_id}/admin")
+@router.delete("/users/{user_id}/admin", dependencies=[Depends(require_roles("admin", "developer"))])
 def remove_admin_role(user_id: str):
-    """Снятие прав администратора"""
+    """Снятие прав администратора; выданные ему токены перестают действовать"""
     try:
         with get_db_connection() as conn:
             cur = conn.execute("SELECT role FROM users WHERE user_id = ?", (user_id,))
@@ -240,6 +243,7 @@ def remove_admin_role(user_id: str):
                 "UPDATE users SET role = 'user', updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
                 (user_id,)
             )
+            invalidate_user_tokens(conn, user_id)
             conn.commit()
             logger.info(f"Пользователь {user_id} понижен до user")
             return {"message": "Права администратора успешно сняты"}
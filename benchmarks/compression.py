@@ -0,0 +1,89 @@
+# benchmarks/compression.py
+"""
+Замер сжатия ответов: сколько байт экономит gzip/brotli и сколько это стоит CPU.
+
+Приложение поднимается в процессе через TestClient на временной БД,
+заполняется данными, снимаются реальные тела GET /api/users и
+GET /api/schedule/{group}, и каждое сжимается так, как это делает сервер:
+    python benchmarks/compression.py --users 500
+
+Для каждого тела печатаются размер и время одного сжатия:
+- «на лету» — уровни CompressionMiddleware (GZIP_LEVEL, BROTLI_QUALITY);
+- «кэш» — уровни CachedBody (gzip 9, brotli 11), один раз на изменение тела;
+- выдача уже сжатого варианта из CachedBody (то, что стоит повторный запрос).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_WEEK = {
+    day: [
+        {"lesson_number": i, "subject": f"Математический анализ {i}", "teacher": "Иванов Иван Иванович",
+         "classroom": f"А-{i}0{i}", "type": "Лекция"}
+        for i in range(1, 6)
+    ]
+    for day in ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]
+}
+
+
+def _bodies(users: int) -> list:
+    from fastapi.testclient import TestClient
+    from main import app
+    from utils.auth import issue_token
+
+    with TestClient(app) as client:
+        headers = {
+            "Authorization": "Bearer " + issue_token("000000", "developer")["access_token"],
+            "Accept-Encoding": "identity",
+        }
+        for _ in range(users):
+            client.post("/api/users", json={"device_info": "Устройство"})
+        client.post("/api/schedule", json={"group": "ПИ-25", "upper_week": _WEEK, "lower_week": _WEEK})
+        return [
+            (f"GET /api/users ({users})", client.get("/api/users", headers=headers).content),
+            ("GET /api/schedule/{group}", client.get("/api/schedule/ПИ-25", headers=headers).content),
+        ]
+
+
+def _best_us(fn, number: int, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def run(args):
+    from utils.compression import (
+        BROTLI_QUALITY, CACHED_BROTLI_QUALITY, CACHED_GZIP_LEVEL, GZIP_LEVEL,
+        CachedBody, compress, supported_encodings,
+    )
+
+    levels = {"gzip": (GZIP_LEVEL, CACHED_GZIP_LEVEL), "br": (BROTLI_QUALITY, CACHED_BROTLI_QUALITY)}
+    print(f"Кодировки: {', '.join(supported_encodings())}")
+    for name, body in _bodies(args.users):
+        print(f"{name}: {len(body)} B")
+        for encoding in supported_encodings():
+            live, cached = levels[encoding]
+            for label, level, is_cached in (("на лету", live, False), ("кэш", cached, True)):
+                data = compress(body, encoding, cached=is_cached)
+                number = 3 if encoding == "br" and is_cached else 20
+                us = _best_us(lambda: compress(body, encoding, cached=is_cached), number, args.repeat)
+                print(f"  {encoding:4} {label:8} ур. {level:2}  {len(data):7d} B  "
+                      f"-{100 * (1 - len(data) / len(body)):4.1f}%  {us:9.1f} мкс")
+            cached_body = CachedBody(body)
+            cached_body.variant(encoding)
+            us = _best_us(lambda: cached_body.variant(encoding), 100000, args.repeat)
+            print(f"  {encoding:4} готовый вариант CachedBody          {us:9.3f} мкс на запрос")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер сжатия ответов")
+    parser.add_argument("--users", type=int, default=500, help="сколько пользователей создать")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов замера, берётся лучший")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Своя БД: настройки читаются при импорте приложения
+        os.environ["DATABASE_URL"] = os.path.join(tmp, "bench.db")
+        os.environ.setdefault("UPDATE_NOTICE_JSON_PATH", os.path.join(tmp, "notice.json"))
+        run(args)
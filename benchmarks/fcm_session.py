@@ -0,0 +1,93 @@
+# benchmarks/fcm_session.py
+"""
+Задержка отправки пуша: отдельный requests.post на каждую отправку (как было)
+против общей keep-alive сессии utils.fcm (как стало), на локальной заглушке /fake-fcm.
+
+Сервер запускается отдельно, с заглушкой FCM:
+    FCM_FAKE=true python main.py
+    python benchmarks/fcm_session.py --url http://127.0.0.1:8000 --sends 500 --threads 1,8
+
+Оба варианта шлют одно и то же сообщение HTTP v1 на один токен устройства.
+Печатает задержку одной отправки (среднее, p50, p99) и отправки в секунду
+последовательно и из нескольких потоков (как рассылка push_fanout).
+OAuth-токен в режиме заглушки не запрашивается: замер — только HTTP-часть.
+На loopback без TLS выигрыш сессии мал; к fcm.googleapis.com каждый
+отдельный requests.post платит ещё TCP- и TLS-рукопожатие.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _bare_post(url: str, headers: dict, body: str):
+    import requests
+    return requests.post(url, headers=headers, data=body, timeout=10)
+
+
+def _run(send, sends: int, threads: int) -> dict:
+    latencies: list = []
+    errors: list = []
+    per_thread = [sends // threads + (1 if i < sends % threads else 0) for i in range(threads)]
+
+    def worker(count: int):
+        for _ in range(count):
+            t0 = time.perf_counter()
+            resp = send()
+            latencies.append(time.perf_counter() - t0)
+            if resp.status_code != 200:
+                errors.append(resp.status_code)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in per_thread]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "avg_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        "per_second": len(latencies) / elapsed,
+        "errors": len(errors),
+    }
+
+
+def run(args):
+    # Настройки FCM читаются при импорте: направляем utils.fcm в заглушку сервера
+    os.environ["FCM_FAKE"] = "true"
+    os.environ["FCM_BASE_URL"] = args.url.rstrip("/") + "/fake-fcm"
+    from utils import fcm
+
+    message = fcm._build_message({"token": "bench-device"}, "Расписание изменено", "Пара перенесена", {"type": "bench"})
+    url = f"{fcm._base_url()}/v1/projects/{fcm.PROJECT_ID}/messages:send"
+    headers = {"Content-Type": "application/json; charset=UTF-8", "Authorization": "Bearer fake-token"}
+    body = json.dumps({"message": message})
+    variants = {
+        "requests.post": lambda: _bare_post(url, headers, body),
+        "общая сессия": lambda: fcm._post_message(message),
+    }
+    for name, send in variants.items():
+        send()  # прогрев: импорт requests, первое соединение
+
+    print(f"{'вариант':14} {'потоки':>6} {'сред., мс':>10} {'p50, мс':>8} {'p99, мс':>8} {'отправок/с':>11} {'ошибки':>7}")
+    for threads in (int(n) for n in args.threads.split(",")):
+        for name, send in variants.items():
+            r = _run(send, args.sends, threads)
+            print(f"{name:14} {threads:>6} {r['avg_ms']:>10.2f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+                  f"{r['per_second']:>11.0f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Задержка отправки в FCM: requests.post против общей сессии")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="сервер, запущенный с FCM_FAKE=true")
+    parser.add_argument("--sends", type=int, default=500, help="отправок на каждый замер")
+    parser.add_argument("--threads", default="1,8", help="числа потоков через запятую")
+    run(parser.parse_args())
@@ -0,0 +1,118 @@
+# benchmarks/presence_ws.py
+"""
+Нагрузочный тест /ws/presence: сколько одновременных соединений держит один воркер.
+
+Сервер запускается отдельно (один воркер), нужен ADMIN_API_KEY для выдачи токенов:
+    ADMIN_API_KEY=k python main.py
+    python benchmarks/presence_ws.py --url http://127.0.0.1:8000 --admin-key k \\
+        --connections 2000 --hold 30 --pid <pid воркера>
+
+Скрипт создаёт пользователей, получает им токены, открывает соединения пачками,
+держит их --hold секунд (каждое шлёт "ping" раз в --ping секунд) и печатает:
+время открытия, сколько соединений живо, что видит админ-сокет, задержку
+HTTP-запроса под нагрузкой и память процесса сервера (если задан --pid).
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import websockets
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _tokens(url: str, admin_key: str, count: int) -> list:
+    tokens = []
+    with httpx.Client(base_url=url, timeout=30) as client:
+        for _ in range(count):
+            user_id = client.post("/api/users", json={"device_info": "presence-bench"}).json()["user_id"]
+            r = client.post("/api/auth/token", params={"user_id": user_id}, headers={"X-ADMIN-KEY": admin_key})
+            r.raise_for_status()
+            tokens.append(r.json()["access_token"])
+    return tokens
+
+
+async def _hold(ws_url: str, token: str, stop: asyncio.Event, ping: float, alive: list):
+    async with websockets.connect(f"{ws_url}?token={token}", open_timeout=60, ping_interval=None) as ws:
+        alive[0] += 1
+        try:
+            while not stop.is_set():
+                await ws.send("ping")
+                await ws.recv()
+                try:
+                    await asyncio.wait_for(stop.wait(), ping)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            alive[0] -= 1
+
+
+async def _admin_watch(ws_url: str, token: str, seen: list):
+    async with websockets.connect(f"{ws_url}?token={token}", ping_interval=None) as ws:
+        async for message in ws:
+            if message != "pong":
+                seen.append(json.loads(message)["online"])
+
+
+async def run(args):
+    ws_url = args.url.replace("http", "ws", 1).rstrip("/") + "/ws/presence"
+    t0 = time.perf_counter()
+    tokens = await asyncio.to_thread(_tokens, args.url, args.admin_key, args.connections)
+    print(f"Пользователи и токены: {args.connections} за {time.perf_counter() - t0:.1f} с")
+
+    with httpx.Client(base_url=args.url) as client:
+        admin = client.post("/api/auth/token", params={"user_id": "000000"},
+                            headers={"X-ADMIN-KEY": args.admin_key}).json()["access_token"]
+    seen: list = []
+    watcher = asyncio.create_task(_admin_watch(ws_url, admin, seen))
+    rss_before = _rss_mb(args.pid) if args.pid else None
+
+    stop = asyncio.Event()
+    alive = [0]
+    tasks = []
+    t0 = time.perf_counter()
+    for i in range(0, len(tokens), args.batch):
+        tasks += [asyncio.create_task(_hold(ws_url, t, stop, args.ping, alive)) for t in tokens[i:i + args.batch]]
+        while alive[0] < len(tasks) and not any(t.done() for t in tasks):
+            await asyncio.sleep(0.01)
+    opened = time.perf_counter() - t0
+    errors = [t.exception() for t in tasks if t.done() and t.exception()]
+    print(f"Открыто {alive[0]}/{len(tokens)} соединений за {opened:.1f} с, ошибок: {len(errors)}")
+    if errors:
+        print(f"  первая ошибка: {errors[0]!r}")
+
+    await asyncio.sleep(args.hold)
+    async with httpx.AsyncClient(base_url=args.url) as client:
+        t1 = time.perf_counter()
+        await client.get("/livez")
+        livez_ms = (time.perf_counter() - t1) * 1000
+    print(f"Через {args.hold} с живо: {alive[0]}, админ видит онлайн: {seen[-1] if seen else None}, "
+          f"GET /livez под нагрузкой: {livez_ms:.1f} мс")
+    if args.pid:
+        rss = _rss_mb(args.pid)
+        per_conn = (rss - rss_before) * 1024 / max(1, alive[0])
+        print(f"Память сервера: {rss_before:.0f} -> {rss:.0f} МБ (~{per_conn:.0f} КБ на соединение)")
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    watcher.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест /ws/presence")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--admin-key", required=True)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=200, help="сколько соединений открывать за раз")
+    parser.add_argument("--hold", type=float, default=30, help="сколько секунд держать соединения")
+    parser.add_argument("--ping", type=float, default=10, help="интервал ping от клиента, с")
+    parser.add_argument("--pid", type=int, default=None, help="pid процесса сервера для замера памяти")
+    asyncio.run(run(parser.parse_args()))
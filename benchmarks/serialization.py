@@ -0,0 +1,97 @@
+# benchmarks/serialization.py
+"""
+Замер сериализации JSON-ответов: как было (jsonable_encoder + json.dumps)
+и как стало (utils.fast_json.dumps — orjson, если установлен).
+
+Приложение поднимается в процессе через TestClient на временной БД,
+заполняется данными, снимаются реальные ответы эндпоинтов, и каждый
+payload кодируется обоими способами:
+    python benchmarks/serialization.py --users 500 --news 20
+
+Печатает размер тела и время одного кодирования (лучшее из --repeat).
+GET /api/news остаётся на обычном пути FastAPI (заголовок через
+`response: Response`), поэтому «после» для него — jsonable_encoder + dumps.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_WEEK = {
+    day: [
+        {"lesson_number": i, "subject": f"Математический анализ {i}", "teacher": "Иванов Иван Иванович",
+         "classroom": f"А-{i}0{i}", "type": "Лекция"}
+        for i in range(1, 6)
+    ]
+    for day in ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]
+}
+
+
+def _before(content) -> bytes:
+    # Путь FastAPI до FastJSONRoute: jsonable_encoder, затем JSONResponse.render
+    from fastapi.encoders import jsonable_encoder
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _payloads(users: int, news: int) -> list:
+    from fastapi.testclient import TestClient
+    from main import app
+    from utils.auth import issue_token
+
+    with TestClient(app) as client:
+        headers = {"Authorization": "Bearer " + issue_token("000000", "developer")["access_token"]}
+        for _ in range(users):
+            client.post("/api/users", json={"device_info": "Устройство"})
+        for i in range(news):
+            client.post("/api/news", data={"title": f"Новость номер {i}", "text": "Текст новости " * 40},
+                        headers=headers)
+        client.post("/api/schedule", json={"group": "ПИ-25", "upper_week": _WEEK, "lower_week": _WEEK})
+        # (название, тело ответа, идёт ли маршрут быстрым путём FastJSONRoute)
+        return [
+            (f"GET /api/users ({users})", client.get("/api/users", headers=headers).json(), True),
+            ("GET /api/schedule/{group}", client.get("/api/schedule/ПИ-25").json(), True),
+            (f"GET /api/news ({news})", client.get(f"/api/news?limit={news}").json(), False),
+            ("GET /api/health", client.get("/api/health").json(), True),
+        ]
+
+
+def _best_us(fn, number: int, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def run(args):
+    from fastapi.encoders import jsonable_encoder
+    from utils.fast_json import dumps
+
+    try:
+        import orjson
+        print(f"dumps: orjson {orjson.__version__}")
+    except ImportError:
+        print("dumps: stdlib json")
+    for name, payload, fast in _payloads(args.users, args.news):
+        after = (lambda: dumps(payload)) if fast else (lambda: dumps(jsonable_encoder(payload)))
+        before = _before(payload)
+        assert json.loads(before) == json.loads(after()), name
+        number = 2000 if len(before) < 20000 else 100
+        a = _best_us(lambda: _before(payload), number, args.repeat)
+        b = _best_us(after, number, args.repeat)
+        print(f"{name:28} {len(before):7d} B  до {a:8.1f} мкс  после {b:7.1f} мкс  x{a / b:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер сериализации JSON-ответов")
+    parser.add_argument("--users", type=int, default=500, help="сколько пользователей создать")
+    parser.add_argument("--news", type=int, default=20, help="сколько новостей создать")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов замера, берётся лучший")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Своя БД: настройки читаются при импорте приложения
+        os.environ["DATABASE_URL"] = os.path.join(tmp, "bench.db")
+        os.environ.setdefault("UPDATE_NOTICE_JSON_PATH", os.path.join(tmp, "notice.json"))
+        run(args)
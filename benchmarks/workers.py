@@ -0,0 +1,173 @@
+# benchmarks/workers.py
+"""
+Пропускная способность сервера в зависимости от числа воркеров (--workers N).
+
+Для каждого N скрипт запускает `python main.py --workers N` на временной БД,
+наполняет её, затем несколько процессов-генераторов нагрузки держат по
+--clients keep-alive соединений и по кругу запрашивают --paths в течение
+--duration секунд. Печатает req/s, задержки и ускорение относительно первого N:
+    python benchmarks/workers.py --workers 1,2,4 --clients 32 --duration 10
+
+Рост с N виден только на машине с несколькими ядрами. Генератор нагрузки
+делит ядра с сервером, поэтому --load-procs лучше держать меньше числа ядер
+(по умолчанию половина). Сервер останавливается сигналом группе процессов — Linux/macOS.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import httpx
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_WEEK = {
+    day: [
+        {"lesson_number": i, "subject": f"Математический анализ {i}", "teacher": "Иванов Иван Иванович",
+         "classroom": f"А-{i}0{i}", "type": "Лекция"}
+        for i in range(1, 6)
+    ]
+    for day in ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]
+}
+
+
+def _start_server(workers: int, port: int, tmp: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": os.path.join(tmp, "bench.db"),
+        "UPDATE_NOTICE_JSON_PATH": os.path.join(tmp, "notice.json"),
+        "ANNOUNCEMENTS_JSON_PATH": os.path.join(tmp, "announcements.json"),
+        "LOG_FILE": os.path.join(tmp, "server.log"),
+        "ACCESS_LOG_FILE": "",
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "--workers", str(workers)],
+        cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    _stop_server(server)
+    raise RuntimeError(f"Сервер с {workers} воркерами не поднялся за 60 с")
+
+
+def _stop_server(server: subprocess.Popen):
+    os.killpg(server.pid, signal.SIGINT)
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def _seed(port: int):
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+        client.post("/api/schedule", json={"group": "ПИ-25", "upper_week": _WEEK, "lower_week": _WEEK}).raise_for_status()
+
+
+def _client(port: int, paths: list, stop_at: float, latencies: list, errors: list):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    i = 0
+    while time.perf_counter() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def _load_process(port: int, paths: list, clients: int, start_at: float, duration: float):
+    """Один процесс генератора: clients потоков, у каждого своё keep-alive соединение."""
+    latencies: list = []
+    errors: list = []
+    time.sleep(max(0.0, start_at - time.time()))
+    stop_at = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_client, args=(port, paths, stop_at, latencies, errors))
+        for _ in range(clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors
+
+
+def measure(port: int, paths: list, clients: int, procs: int, duration: float) -> dict:
+    per_proc = [clients // procs + (1 if i < clients % procs else 0) for i in range(procs)]
+    start_at = time.time() + 1  # все процессы стартуют одновременно
+    with multiprocessing.Pool(procs) as pool:
+        results = pool.starmap(
+            _load_process, [(port, paths, n, start_at, duration) for n in per_proc if n]
+        )
+    latencies = sorted(x for lat, _ in results for x in lat)
+    errors = [e for _, err in results for e in err]
+    if not latencies:
+        raise RuntimeError(f"Ни одного успешного запроса, ошибки: {errors[:5]}")
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": len(errors),
+    }
+
+
+def run(args):
+    paths = [quote(p) for p in args.paths.split(",")]
+    counts = [int(n) for n in args.workers.split(",")]
+    print(f"Ядер: {os.cpu_count()}, клиентов: {args.clients} в {args.load_procs} процессах, "
+          f"{args.duration:.0f} с на замер, пути: {args.paths}")
+    print(f"{'воркеры':>8} {'req/s':>9} {'p50, мс':>8} {'p99, мс':>8} {'ошибки':>7} {'ускорение':>10}")
+    base = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, workers in enumerate(counts):
+            server = _start_server(workers, args.port, tmp)
+            try:
+                if i == 0:
+                    _seed(args.port)
+                measure(args.port, paths, args.clients, args.load_procs, min(2.0, args.duration))  # прогрев
+                result = measure(args.port, paths, args.clients, args.load_procs, args.duration)
+            finally:
+                _stop_server(server)
+            base = base or result["rps"]
+            print(f"{workers:>8} {result['rps']:>9.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                  f"{result['errors']:>7} {result['rps'] / base:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пропускная способность при разном числе воркеров")
+    parser.add_argument("--workers", default="1,2,4", help="числа воркеров через запятую")
+    parser.add_argument("--clients", type=int, default=32, help="одновременных keep-alive соединений")
+    parser.add_argument("--load-procs", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="процессов генератора нагрузки")
+    parser.add_argument("--duration", type=float, default=10, help="секунд на замер")
+    parser.add_argument("--paths", default="/api/groups,/api/schedule/ПИ-25", help="GET-пути через запятую")
+    parser.add_argument("--port", type=int, default=8790)
+    run(parser.parse_args())
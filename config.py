@@ -7,11 +7,50 @@ load_dotenv()
 SERVER_CONFIG = {
     "host": os.getenv("SERVER_HOST", "192.168.0.105"),
     "port": int(os.getenv("SERVER_PORT", 8000)),
+    # Печатать таблицу маршрутов при старте
+    "debug_routes": os.getenv("DEBUG_ROUTES", "false").lower() in ("1", "true"),
+    # Число процессов uvicorn (можно переопределить: python main.py --workers N)
+    "workers": int(os.getenv("SERVER_WORKERS", 1)),
     "database_url": os.getenv("DATABASE_URL", "decanat_app.db"),
     "backup_enabled": os.getenv("BACKUP_ENABLED", "true").lower() == "true",
+    # Логи: файл с ротацией по размеру и времени ('midnight' | 'hourly' | ''), старые файлы сжимаются
+    "log_file": os.getenv("LOG_FILE", "server.log"),
+    "log_level": os.getenv("LOG_LEVEL", "INFO"),
+    "log_max_bytes": int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+    "log_backup_count": int(os.getenv("LOG_BACKUP_COUNT", 10)),
+    "log_rotate_when": os.getenv("LOG_ROTATE_WHEN", "midnight"),
+    # Access-лог: JSON-строка на запрос с разбивкой времени (пусто — отключён)
+    "access_log_file": os.getenv("ACCESS_LOG_FILE", "access.log"),
+    # Уровни по модулям, напр.: "students=WARNING,schedule=DEBUG"
+    "log_module_levels": os.getenv("LOG_MODULE_LEVELS", ""),
+    # Частые сообщения (вход, подключения) пишем одно из N
+    "log_sample_every": int(os.getenv("LOG_SAMPLE_EVERY", 20)),
+    # Сколько секунд при остановке ждать открытые соединения (SSE-ленты сами не закрываются)
+    "shutdown_timeout": int(os.getenv("SHUTDOWN_TIMEOUT", 10)),
+    # Ключ для обмена X-ADMIN-KEY -> токен доступа (пусто — обмен отключён)
+    "admin_api_key": os.getenv("ADMIN_API_KEY", ""),
+
+    # Лимиты попыток входа/регистрации: "ёмкость/период_сек" по IP и по логину
+    "rate_limits": {
+        "students_login": {"ip": "60/60", "login": "5/60"},
+        "teachers_login": {"ip": "60/60", "login": "5/60"},
+        "students_register": {"ip": "20/60", "login": "3/60"},
+        "teachers_register": {"ip": "20/60", "login": "3/60"},
+    },
+    # Переопределение, напр.: "students_login.login=10/60,teachers_login.ip=120/60"
+    "rate_limits_override": os.getenv("RATE_LIMITS", ""),
+    # Корзины в БД, общие для всех воркеров (иначе каждый воркер пропускал бы полный лимит).
+    # По умолчанию — при нескольких воркерах; RATE_LIMITS_SHARED=true — для внешнего менеджера процессов
+    "rate_limits_shared": (
+        os.getenv("RATE_LIMITS_SHARED", "").lower() in ("1", "true")
+        or int(os.getenv("SERVER_WORKERS", 1)) > 1
+    ),
 
     # ❗️НЕ даём дефолта. Только из переменной окружения!
     #"fcm_service_account": os.getenv("FCM_SERVICE_ACCOUNT", "").strip(),
     "fcm_service_account": os.getenv("FCM_SERVICE_ACCOUNT", "/root/server_decan/keys/service-account.json"),
+    # FCM_FAKE=true — пуши уходят в локальный /fake-fcm этого же сервера (офлайн-тесты)
+    "fcm_fake": os.getenv("FCM_FAKE", "false").lower() == "true",
+    "fcm_base_url": os.getenv("FCM_BASE_URL", ""),
 
 }
@@ -0,0 +1,184 @@
+# data/group_catalog.py
+"""
+Каталог групп в памяти.
+
+Источник — таблицы catalog_programmes (факультет -> направление/префикс, уровень)
+и catalog_years (годы набора): допустимые группы — все сочетания
+"<префикс>-<суффикс года>" активных направлений и лет. При первом запуске
+таблицы заполняются из data/groups.py. Дополнительно в каталог попадают все
+группы из schedule_groups (например, созданные через POST /groups).
+
+Снимок неизменяемый и подменяется целиком. Любое изменение увеличивает
+версию cache_versions['group_catalog'] в той же транзакции; остальные
+воркеры узнают об этом через utils.cache_versions и перечитывают каталог
+без перезапуска.
+"""
+import sqlite3
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from data.groups import BACHELOR_PREFIXES, MASTER_PREFIXES, YEAR_SUFFIX, YEARS, build_group_info
+from database.connection import get_db_connection
+from utils import cache_versions
+from utils.compression import CachedBody
+from utils.logger import logger
+from utils.metrics import cache_hit, cache_miss
+
+_CACHE_NAME = "group_catalog"
+
+_GENERATED_SQL = """
+    SELECT p.prefix || '-' || y.suffix AS group_name, p.prefix, p.faculty, p.level, y.year
+    FROM catalog_programmes p CROSS JOIN catalog_years y
+    WHERE p.active = 1 AND y.active = 1
+"""
+
+
+def seed_catalog(conn: sqlite3.Connection):
+    """Первичное заполнение каталога из data/groups.py и создание его групп."""
+    if conn.execute("SELECT 1 FROM catalog_programmes LIMIT 1").fetchone() is None:
+        conn.executemany(
+            "INSERT INTO catalog_programmes (prefix, faculty, level) VALUES (?, ?, ?)",
+            [(p, "ИСП", "bachelor") for p in BACHELOR_PREFIXES]
+            + [(p, "ИСП", "master") for p in MASTER_PREFIXES]
+        )
+    if conn.execute("SELECT 1 FROM catalog_years LIMIT 1").fetchone() is None:
+        conn.executemany(
+            "INSERT INTO catalog_years (year, suffix) VALUES (?, ?)",
+            [(year, YEAR_SUFFIX[year]) for year in YEARS]
+        )
+    sync_schedule_groups(conn)
+
+
+def sync_schedule_groups(conn: sqlite3.Connection):
+    """Все допустимые группы каталога должны быть в schedule_groups."""
+    conn.execute(f"INSERT OR IGNORE INTO schedule_groups (group_name) SELECT group_name FROM ({_GENERATED_SQL})")
+
+
+def bump_version(conn: sqlite3.Connection):
+    """Вызывать в транзакции изменения каталога, до commit."""
+    cache_versions.bump_version(conn, _CACHE_NAME)
+
+
+class _CatalogState(NamedTuple):
+    version: int
+    names: Tuple[str, ...]                     # отсортировано, как ORDER BY group_name
+    valid: frozenset                           # допустимые для регистрации
+    by_name: Dict[str, dict]
+    by_year: Dict[int, Tuple[str, ...]]
+    by_faculty: Dict[str, Tuple[str, ...]]
+    tree: dict                                 # иерархия для админки
+    body: CachedBody                           # готовый ответ /api/groups
+
+
+def _build(version: int, generated: list, programmes: list, years: list, stored: List[str]) -> _CatalogState:
+    by_name: Dict[str, dict] = {}
+    for row in generated:
+        by_name[row["group_name"]] = {"name": row["group_name"], "year": row["year"], "faculty": row["faculty"]}
+    valid = frozenset(by_name)
+    for name in stored:
+        if name not in by_name:
+            info = build_group_info(name)
+            info["faculty"] = "Другие"
+            by_name[name] = info
+
+    names = tuple(sorted(by_name))
+    by_year: Dict[int, List[str]] = {}
+    by_faculty: Dict[str, List[str]] = {}
+    for name in names:
+        info = by_name[name]
+        if info["year"] is not None:
+            by_year.setdefault(info["year"], []).append(name)
+        by_faculty.setdefault(info["faculty"], []).append(name)
+
+    faculties: Dict[str, list] = {}
+    for p in programmes:
+        faculties.setdefault(p["faculty"], []).append(
+            {"prefix": p["prefix"], "level": p["level"], "active": bool(p["active"])}
+        )
+    tree = {
+        "version": version,
+        "faculties": faculties,
+        "years": [{"year": y["year"], "suffix": y["suffix"], "active": bool(y["active"])} for y in years],
+    }
+    return _CatalogState(
+        version=version,
+        names=names,
+        valid=valid,
+        by_name=by_name,
+        by_year={year: tuple(v) for year, v in by_year.items()},
+        by_faculty={faculty: tuple(v) for faculty, v in by_faculty.items()},
+        tree=tree,
+        body=CachedBody.from_json(names),
+    )
+
+
+class GroupCatalog:
+    def __init__(self):
+        self._state: Optional[_CatalogState] = None
+        self._lock = threading.Lock()
+        cache_versions.cache_watcher.register(_CACHE_NAME, self._on_version)
+
+    def load(self):
+        """Перечитать каталог из БД и атомарно подменить снимок."""
+        with get_db_connection() as conn:
+            version = cache_versions.read_version(conn, _CACHE_NAME)
+            generated = conn.execute(_GENERATED_SQL).fetchall()
+            programmes = conn.execute(
+                "SELECT prefix, faculty, level, active FROM catalog_programmes ORDER BY faculty, level, prefix"
+            ).fetchall()
+            years = conn.execute("SELECT year, suffix, active FROM catalog_years ORDER BY year DESC").fetchall()
+            stored = [row["group_name"] for row in conn.execute("SELECT group_name FROM schedule_groups")]
+        cache_miss("group_catalog")
+        state = _build(version, generated, programmes, years, stored)
+        with self._lock:
+            self._state = state
+        logger.info(f"Каталог групп загружен: {len(state.names)} (версия {version})")
+
+    def _on_version(self, version: int):
+        """Каталог изменён (возможно, другим воркером) — перечитываем, если ещё не."""
+        if self._state is not None and self._state.version != version:
+            self.load()
+
+    @property
+    def state(self) -> _CatalogState:
+        if self._state is None:
+            self.load()
+        else:
+            cache_hit("group_catalog")
+        return self._state
+
+    def names(self) -> Tuple[str, ...]:
+        return self.state.names
+
+    def valid_names(self) -> List[str]:
+        return sorted(self.state.valid)
+
+    def contains(self, name: str) -> bool:
+        return name in self.state.by_name
+
+    def is_valid(self, name: str) -> bool:
+        """Группа из каталога (направление и год активны) — можно регистрироваться."""
+        return name in self.state.valid
+
+    def info(self, name: str) -> Optional[dict]:
+        """Как data.groups.get_group_info: только для допустимых групп, иначе None."""
+        state = self.state
+        if name not in state.valid:
+            return None
+        return dict(state.by_name[name])
+
+    def by_year(self, year: int) -> Tuple[str, ...]:
+        return self.state.by_year.get(year, ())
+
+    def by_faculty(self, faculty: str) -> Tuple[str, ...]:
+        return self.state.by_faculty.get(faculty, ())
+
+    def tree(self) -> dict:
+        return self.state.tree
+
+    @property
+    def body(self) -> CachedBody:
+        return self.state.body
+
+
+group_catalog = GroupCatalog()
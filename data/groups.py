@@ -1,5 +1,9 @@
 # data/groups.py
-"""Файл с данными о группах для всего приложения"""
+"""Файл с данными о группах для всего приложения.
+
+Рабочий список групп — в каталоге (data/group_catalog.py, таблицы catalog_*);
+значения ниже — его начальное наполнение при первом запуске.
+"""
 
 # Бакалавриат и магистратура
 BACHELOR_PREFIXES = ['ПМК', 'ИВТ', 'ИНФ', 'ПИ', 'САУ']
@@ -55,6 +59,28 @@ def _base_prefix(name: str) -> str:
     """
     return name[:-1] if name.endswith('м') else name
 
+def build_group_info(group_name):
+    """Разбор имени группы: {'name', 'year', 'faculty'} (без проверки существования)."""
+    parts = group_name.split('-')
+    if len(parts) == 2 and parts[1].isdigit():
+        yy = int(parts[1])         # 25 -> 2025
+        year_full = 2000 + yy
+    else:
+        # На случай нестандартного имени
+        year_full = None
+
+    prefix = _base_prefix(parts[0])
+    faculty = 'ИСП' if prefix in BACHELOR_PREFIXES else 'Другие'
+
+    return {
+        'name': group_name,
+        'year': year_full,
+        'faculty': faculty
+    }
+
+# Информация по дефолтным группам считается один раз при импорте
+_GROUP_INFO = {g: build_group_info(g) for g in DEFAULT_GROUPS}
+
 def get_group_info(group_name):
     """Возвращает информацию о группе:
        {
@@ -63,21 +89,6 @@ def get_group_info(group_name):
          'faculty': 'ИСП' | 'Другие'
        }
     """
-    if group_name in DEFAULT_GROUPS:
-        parts = group_name.split('-')
-        if len(parts) == 2 and parts[1].isdigit():
-            yy = int(parts[1])         # 25 -> 2025
-            year_full = 2000 + yy
-        else:
-            # На случай нестандартного имени
-            year_full = None
-
-        prefix = _base_prefix(parts[0])
-        faculty = 'ИСП' if prefix in BACHELOR_PREFIXES else 'Другие'
-
-        return {
-            'name': group_name,
-            'year': year_full,
-            'faculty': faculty
-        }
-    return None
+    info = _GROUP_INFO.get(group_name)
+    # копия — вызывающий код может дописывать в словарь свои поля
+    return dict(info) if info is not None else None
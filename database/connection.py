@@ -1,10 +1,14 @@
 # database/connection.py
 import sqlite3
 import os
+import threading
+import time
 from contextlib import contextmanager
+import struct
 from config import SERVER_CONFIG
+from utils.access_log import add_db_time
+from utils.metrics import db_connect_time, db_query_time
 from utils.logger import logger
-from data.groups import DEFAULT_GROUPS  # Импортируем из нового файла
 
 def _resolve_db_path(raw_path: str) -> str:
     """
@@ -23,16 +27,89 @@ def _resolve_db_path(raw_path: str) -> str:
 
 _DB_PATH = _resolve_db_path(SERVER_CONFIG["database_url"])
 
+
+def database_path() -> str:
+    """Абсолютный путь к файлу БД (или ':memory:')"""
+    return _DB_PATH
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Курсор, который добавляет время запросов в замеры текущего HTTP-запроса."""
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - t0
+            add_db_time(elapsed, 1)
+            db_query_time.observe(elapsed)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - t0
+            add_db_time(elapsed, 1)
+            db_query_time.observe(elapsed)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            add_db_time(time.perf_counter() - t0)
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            add_db_time(time.perf_counter() - t0)
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            add_db_time(time.perf_counter() - t0)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection.execute идёт через TimedCursor; commit тоже считается временем БД."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        t0 = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            add_db_time(time.perf_counter() - t0)
+
+
 @contextmanager
 def get_db_connection():
     conn = None
     try:
+        opened = time.perf_counter()
         # detect_types полезен для DATETIME, если вы их используете
         conn = sqlite3.connect(
             _DB_PATH,
             timeout=30,
-            detect_types=sqlite3.PARSE_DECLTYPES
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            factory=TimedConnection,
         )
+        # открытие файла — тоже время БД (PRAGMA ниже учтёт сам курсор)
+        add_db_time(time.perf_counter() - opened)
         conn.row_factory = sqlite3.Row
 
         # Базовые PRAGMA
@@ -45,6 +122,7 @@ def get_db_connection():
             logger.debug(f"SQLite journal_mode={jm}, path={_DB_PATH}")
         else:
             conn.execute("PRAGMA busy_timeout = 5000")
+        db_connect_time.observe(time.perf_counter() - opened)
 
         yield conn
     except sqlite3.Error as e:
@@ -54,6 +132,63 @@ def get_db_connection():
         if conn:
             conn.close()
 
+_probe_conn = None
+_probe_lock = threading.Lock()
+
+
+def probe_schema_version() -> int:
+    """
+    Дешёвая проверка доступности БД для /readyz: одно постоянное соединение
+    без PRAGMA-настройки и чтение user_version (заголовок файла).
+    """
+    global _probe_conn
+    with _probe_lock:
+        try:
+            if _probe_conn is None:
+                _probe_conn = sqlite3.connect(_DB_PATH, timeout=1, check_same_thread=False)
+            return _probe_conn.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.Error:
+            if _probe_conn is not None:
+                _probe_conn.close()
+                _probe_conn = None
+            raise
+
+
+_WAL_HEADER = 32
+_WAL_FRAME_HEADER = 24
+
+
+def wal_status(db_path: str) -> dict:
+    """
+    Состояние WAL только чтением файла, без checkpoint и без записи в БД.
+    После перезапуска WAL файл не усекается, поэтому кадры считаются по
+    заголовкам: действителен кадр с теми же salt, что в заголовке WAL.
+    """
+    wal_path = db_path + "-wal"
+    try:
+        with open(wal_path, "rb") as f:
+            header = f.read(_WAL_HEADER)
+            if len(header) < _WAL_HEADER:
+                return {"wal_bytes": len(header), "wal_frames": 0, "wal_committed_frames": 0}
+            page_size = struct.unpack(">I", header[8:12])[0]
+            if page_size == 1:  # так в заголовке записывается 65536
+                page_size = 65536
+            salt = header[16:24]
+            frames = committed = 0
+            while True:
+                f.seek(_WAL_HEADER + frames * (_WAL_FRAME_HEADER + page_size))
+                frame = f.read(_WAL_FRAME_HEADER)
+                if len(frame) < _WAL_FRAME_HEADER or frame[8:16] != salt:
+                    break
+                frames += 1
+                if struct.unpack(">I", frame[4:8])[0]:  # кадр с размером БД — конец транзакции
+                    committed = frames
+            size = f.seek(0, os.SEEK_END)
+    except FileNotFoundError:
+        return {"wal_bytes": 0, "wal_frames": 0, "wal_committed_frames": 0}
+    return {"wal_bytes": size, "wal_frames": frames, "wal_committed_frames": committed}
+
+
 def check_database_integrity():
     try:
         with get_db_connection() as conn:
@@ -96,12 +231,9 @@ def _ensure_news_table(conn: sqlite3.Connection) -> None:
     logger.info("Таблица news проверена/создана")
 
 def _ensure_default_groups(conn: sqlite3.Connection) -> None:
-    """Создаем дефолтные группы при инициализации базы"""
-    for group in DEFAULT_GROUPS:
-        conn.execute(
-            "INSERT OR IGNORE INTO schedule_groups (group_name) VALUES (?)",
-            (group,)
-        )
+    """Заполняем каталог групп (при первом запуске) и создаем его группы"""
+    from data.group_catalog import seed_catalog
+    seed_catalog(conn)
     logger.info("Дефолтные группы созданы/проверены")
 
 def init_database():
@@ -131,3 +263,27 @@ def init_database():
     except Exception as e:
         logger.error(f"Ошибка инициализации базы данных: {e}")
         raise
+
+
+# Родитель ставит переменную после инициализации; воркеры (дочерние процессы) её наследуют
+_INIT_DONE_ENV = "DECANAT_DB_INITIALIZED"
+
+
+def init_database_once():
+    """
+    Инициализация БД под межпроцессной блокировкой.
+    В режиме --workers её выполняет главный процесс до запуска воркеров,
+    воркеры видят метку в окружении и пропускают. Если воркеры запущены
+    внешним менеджером процессов, они инициализируют БД по очереди, а не одновременно.
+    """
+    from utils.file_lock import file_lock
+
+    if os.environ.get(_INIT_DONE_ENV) == _DB_PATH:
+        logger.info("База данных уже инициализирована главным процессом")
+        return
+    if _DB_PATH == ":memory:":
+        init_database()
+        return
+    with file_lock(_DB_PATH + ".init.lock"):
+        init_database()
+    os.environ[_INIT_DONE_ENV] = _DB_PATH
@@ -2,6 +2,9 @@
 from utils.logger import logger
 import sqlite3
 
+# Версия схемы после всех миграций; пишется в PRAGMA user_version (её проверяет /readyz)
+SCHEMA_VERSION = 2
+
 
 def _has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
     cur = conn.execute(f"PRAGMA table_info({table})")
@@ -28,12 +31,27 @@ def run_migrations(conn: sqlite3.Connection):
             logger.info("Миграция: добавлена колонка users.updated_at")
         conn.execute("UPDATE users SET updated_at = COALESCE(updated_at, datetime('now'))")
 
+        # users.token_epoch (смена роли отзывает выданные токены)
+        if not _has_column(conn, "users", "token_epoch"):
+            conn.execute("ALTER TABLE users ADD COLUMN token_epoch INTEGER NOT NULL DEFAULT 0")
+            logger.info("Миграция: добавлена колонка users.token_epoch")
+
         # user_settings.updated_at
         if not _has_column(conn, "user_settings", "updated_at"):
             conn.execute("ALTER TABLE user_settings ADD COLUMN updated_at DATETIME")
             logger.info("Миграция: добавлена колонка user_settings.updated_at")
         conn.execute("UPDATE user_settings SET updated_at = COALESCE(updated_at, datetime('now'))")
 
+        # push_outbox.dedupe_key (склейка уведомлений об изменении расписания)
+        if _table_exists(conn, "push_outbox"):
+            if not _has_column(conn, "push_outbox", "dedupe_key"):
+                conn.execute("ALTER TABLE push_outbox ADD COLUMN dedupe_key TEXT")
+                logger.info("Миграция: добавлена колонка push_outbox.dedupe_key")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_push_outbox_dedupe
+                ON push_outbox (dedupe_key, status)
+            """)
+
         # МИГРАЦИЯ: Исправление таблицы teachers - добавление UNIQUE для full_name
         if _table_exists(conn, "teachers"):
             # Создаем временную таблицу с правильной структурой
@@ -65,6 +83,7 @@ def run_migrations(conn: sqlite3.Connection):
             conn.execute("ALTER TABLE teachers_new RENAME TO teachers")
             logger.info("Миграция: исправлена таблица teachers - добавлен UNIQUE для full_name")
 
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
 
     except Exception as e:
@@ -14,7 +14,8 @@ def create_tables(conn: sqlite3.Connection):
                 device_info TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_seen DATETIME  -- NEW: время последней активности
+                last_seen DATETIME,  -- NEW: время последней активности
+                token_epoch INTEGER NOT NULL DEFAULT 0  -- +1 при смене роли: старые токены недействительны
             )
         """)
 
@@ -88,6 +89,60 @@ def create_tables(conn: sqlite3.Connection):
             )
         ''')
 
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_news_created_id
+            ON news (created_at DESC, id DESC)
+        """)
+
+        # DEVICE TOKENS — FCM-токены устройств пользователей
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS device_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                token TEXT UNIQUE NOT NULL,
+                platform TEXT,                        -- 'android' | 'ios' | ...
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_device_tokens_user_id
+            ON device_tokens (user_id)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_role
+            ON users (role)
+        """)
+
+        # PUSH OUTBOX — очередь пушей, пишется в одной транзакции с данными
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS push_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,                    -- 'topic' | ...
+                payload TEXT NOT NULL,                 -- JSON
+                status TEXT NOT NULL DEFAULT 'pending', -- 'pending' | 'sending' | 'sent' | 'dead'
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,         -- unix time
+                dedupe_key TEXT,                       -- склейка повторных событий (debounce)
+                last_error TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                sent_at DATETIME
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_push_outbox_due
+            ON push_outbox (status, next_attempt_at)
+        """)
+
+        # REVOKED TOKENS — отозванные токены доступа (до истечения срока)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                jti TEXT PRIMARY KEY,
+                expires_at INTEGER NOT NULL
+            )
+        """)
+
         # USER SETTINGS
         conn.execute("""
             CREATE TABLE IF NOT EXISTS user_settings (
@@ -114,6 +169,65 @@ def create_tables(conn: sqlite3.Connection):
             )
         """)
 
+        # КАТАЛОГ ГРУПП: направления (префиксы) x годы набора -> группы "<префикс>-<суффикс>"
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS catalog_programmes (
+                prefix TEXT PRIMARY KEY,                   -- 'ПИ', 'ПИм'
+                faculty TEXT NOT NULL,
+                level TEXT NOT NULL DEFAULT 'bachelor',    -- 'bachelor' | 'master'
+                active INTEGER NOT NULL DEFAULT 1,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS catalog_years (
+                year INTEGER PRIMARY KEY,                  -- 2025
+                suffix TEXT NOT NULL,                      -- '25'
+                active INTEGER NOT NULL DEFAULT 1,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Версии кэшей в памяти: изменение данных -> version + 1, воркеры перечитывают кэш
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                name TEXT PRIMARY KEY,                     -- 'group_catalog', 'revoked_tokens'
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Корзины ограничителя попыток входа/регистрации при нескольких воркерах (utils/ratelimit.py)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                name TEXT NOT NULL,                        -- 'students_login.login'
+                key TEXT NOT NULL,                         -- IP или логин
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,                  -- unix time
+                PRIMARY KEY (name, key)
+            )
+        """)
+
+        # Открытые WebSocket присутствия по воркерам: онлайн = есть живая строка хоть у одного воркера
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS presence_sessions (
+                worker_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                seen_at REAL NOT NULL,                     -- unix time, продлевается воркером
+                PRIMARY KEY (worker_id, user_id)
+            )
+        """)
+
+        # События SSE-ленты: общий канал воркеров, id строки — id события у клиента
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,                        -- 'news' | 'schedule' | 'announcement'
+                data TEXT NOT NULL,                        -- JSON
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
         # SCHEDULE
         conn.execute("""
             CREATE TABLE IF NOT EXISTS schedule (
@@ -4,29 +4,52 @@ from contextlib import asynccontextmanager
 from api.teacher_schedule import router as teacher_schedule_router
 from config import SERVER_CONFIG
 from utils.logger import setup_logging, logger
-from database.connection import init_database
-from api import users, schedule, groups, health, news, settings, students, teachers
+from database.connection import init_database_once
+from utils.passwords import password_pool
+from utils.auth import load_auth_state
+from utils.push_outbox import push_dispatcher
+from utils.events import event_hub
+from utils.cache_versions import cache_watcher
+from utils.images import image_pipeline
+from data.group_catalog import group_catalog
+from utils.access_log import AccessLogMiddleware
+from utils.fast_json import FastJSONResponse
+from utils.compression import CompressionMiddleware
+from utils.startup import log_startup_phases, startup_phase
+from api import users, schedule, groups, health, news, settings, students, teachers, provisioning, auth, devices, events, media
+from api import metrics, debug
 from api import announcements_router
-from api.presence import router as presence_router
-
-import sys
-import io
-
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+from api.presence import router as presence_router, ws_router as presence_ws_router, presence_hub
 
 setup_logging()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        init_database()
+        with startup_phase("init_database"):
+            init_database_once()
+        with startup_phase("group_catalog"):
+            group_catalog.load()
+        with startup_phase("auth_state"):
+            load_auth_state()
+        with startup_phase("background_workers"):
+            cache_watcher.start()
+            presence_hub.start()
+            push_dispatcher.start()
+            event_hub.start()
+        log_startup_phases()
         logger.info("Сервер успешно запущен")
     except Exception as e:
         logger.error(f"Ошибка запуска сервера: {e}")
         raise
     yield
     try:
+        event_hub.stop()
+        cache_watcher.stop()
+        await presence_hub.stop()
+        password_pool.shutdown()
+        image_pipeline.shutdown()
+        push_dispatcher.stop()
         logger.info("Сервер завершает работу")
     except Exception as e:
         logger.error(f"Ошибка при завершении работы: {e}")
@@ -36,6 +59,7 @@ app = FastAPI(
     description="API для мобильного приложения кафедры ПМИИ",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS
@@ -45,7 +69,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Без этого браузерный клиент не видит курсор пагинации новостей и ETag для If-None-Match
+    expose_headers=["X-Next-Before", "ETag"],
 )
+# gzip/brotli для крупных ответов; внутри access-лога, чтобы он видел сжатый размер и время сжатия
+app.add_middleware(CompressionMiddleware)
+# Снаружи всех: JSON-строка на запрос с разбивкой времени (ACCESS_LOG_FILE)
+app.add_middleware(AccessLogMiddleware)
 
 # Подключение роутеров
 app.include_router(users.router, prefix="/api", tags=["Users"])
@@ -56,9 +86,23 @@ app.include_router(news.router, prefix="/api", tags=["News"])
 app.include_router(settings.router, prefix="/api", tags=["Settings"])
 app.include_router(students.router, prefix="/api", tags=["Students"])
 app.include_router(teachers.router, prefix="/api", tags=["Teachers"])
+app.include_router(provisioning.router, prefix="/api", tags=["Provisioning"])
+app.include_router(auth.router, prefix="/api", tags=["Auth"])
+app.include_router(devices.router, prefix="/api", tags=["Devices"])
+app.include_router(events.router, prefix="/api", tags=["Events"])
+app.include_router(media.router, prefix="/api", tags=["Media"])
+app.include_router(debug.router, prefix="/api", tags=["Debug"])
 app.include_router(teacher_schedule_router, prefix="/api")
 app.include_router(announcements_router, prefix="/api", tags=["Announcements"])
 app.include_router(presence_router, prefix="/api", tags=["Presence"])
+app.include_router(presence_ws_router, tags=["Presence"])
+# Prometheus по умолчанию опрашивает /metrics в корне, пробы оркестратора — /livez и /readyz
+app.include_router(metrics.router, tags=["Metrics"])
+app.include_router(health.probe_router, tags=["Health"])
+
+if SERVER_CONFIG["fcm_fake"]:
+    from api import fake_fcm
+    app.include_router(fake_fcm.router, prefix="/fake-fcm", tags=["Fake FCM"])
 
 
 @app.get("/")
@@ -69,20 +113,73 @@ async def root():
         "status": "running"
     }
 
-for r in app.routes:
-    try:
-        methods = ",".join(sorted(r.methods)) if hasattr(r, "methods") else ""
-        print("ROUTE:", r.path, methods)
-    except Exception:
-        pass
+if SERVER_CONFIG["debug_routes"]:
+    for r in app.routes:
+        try:
+            methods = ",".join(sorted(r.methods)) if hasattr(r, "methods") else ""
+            print("ROUTE:", r.path, methods)
+        except Exception:
+            pass
 
 
 
 if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import os
+    import sys
     import uvicorn
-    uvicorn.run(
-        app,
+
+    # Кириллица в консоли Windows; воркеры (дочерние процессы) получат кодировку через окружение
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+    os.environ.setdefault("PYTHONIOENCODING", "utf-8")
+
+    parser = argparse.ArgumentParser(description="Decanat Project API Server")
+    parser.add_argument("--workers", type=int, default=SERVER_CONFIG["workers"],
+                        help="число процессов-воркеров (по умолчанию SERVER_WORKERS или 1)")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="замерить импорт и инициализацию, не запуская сервер; код 1 — бюджет превышен")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="бюджет холодного старта для --startup-report (по умолчанию STARTUP_BUDGET_MS)")
+    args = parser.parse_args()
+
+    if args.startup_report:
+        from utils.startup import STARTUP_BUDGET_MS, print_startup_report
+
+        async def _run_lifespan():
+            async with lifespan(app):
+                pass
+
+        asyncio.run(_run_lifespan())
+        ok = print_startup_report(args.budget_ms if args.budget_ms is not None else STARTUP_BUDGET_MS)
+        sys.exit(0 if ok else 1)
+
+    options = dict(
         host=SERVER_CONFIG["host"],
         port=SERVER_CONFIG["port"],
-        log_level="info"
+        log_level="info",
+        timeout_graceful_shutdown=SERVER_CONFIG["shutdown_timeout"],
     )
+    if args.workers > 1:
+        import socket
+        from uvicorn.supervisors import Multiprocess
+
+        # Воркеры читают число воркеров из окружения: по нему, например, лимиты попыток
+        # входа переходят на общие корзины в БД
+        os.environ["SERVER_WORKERS"] = str(args.workers)
+        # Схема и миграции — один раз здесь, до запуска воркеров; воркеры это пропустят
+        init_database_once()
+        # Логи воркеров пишет в файлы (и ротирует) только этот процесс
+        from utils.logger import start_log_receiver
+        start_log_receiver()
+        logger.info(f"Запуск {args.workers} воркеров")
+        # Воркеры импортируют "main:app" заново; sys.path (с каталогом проекта) они наследуют
+        config = uvicorn.Config("main:app", workers=args.workers, **options)
+        sock = config.bind_socket()
+        # uvicorn создаёт общий сокет с proto=0, и asyncio не включает TCP_NODELAY на принятых
+        # соединениях: каждый ответ ждёт delayed ACK (~40 мс). Пересоздаём объект с IPPROTO_TCP.
+        sock = socket.socket(sock.family, sock.type, socket.IPPROTO_TCP, fileno=sock.detach())
+        Multiprocess(config, target=uvicorn.Server(config).run, sockets=[sock]).run()
+    else:
+        uvicorn.run(app, **options)
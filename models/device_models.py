@@ -0,0 +1,15 @@
+# models/device_models.py
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+class DeviceTokenRegister(BaseModel):
+    # user_id берётся из токена доступа, а не из тела запроса
+    token: str = Field(..., min_length=10, max_length=4096)
+    platform: Optional[str] = Field(None, max_length=20)
+
+class PushSendRequest(BaseModel):
+    title: str = Field(..., min_length=1, max_length=140)
+    body: str = Field("", max_length=1000)
+    group: Optional[str] = None   # только студенты группы
+    role: Optional[str] = None    # только пользователи с ролью
+    data: Optional[Dict[str, str]] = None
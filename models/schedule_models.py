@@ -1,12 +1,25 @@
 # models/schedule_models.py
 from pydantic import BaseModel, Field, validator
-from typing import Dict, List
+from typing import Dict, List, Literal, Optional
 
 
 class GroupCreate(BaseModel):
     group_name: str
 
 
+class CatalogProgramme(BaseModel):
+    """Направление в каталоге групп (префикс имени группы)."""
+    faculty: str = Field(..., min_length=1, max_length=64)
+    level: Literal["bachelor", "master"] = "bachelor"
+    active: bool = True
+
+
+class CatalogYear(BaseModel):
+    """Год набора; suffix по умолчанию — две последние цифры года."""
+    suffix: Optional[str] = Field(default=None, pattern=r"^\d{2}$")
+    active: bool = True
+
+
 class LessonItem(BaseModel):
     """
     Один элемент расписания.
@@ -9,6 +9,13 @@ class StudentCreate(BaseModel):
     password: str = Field(..., min_length=6, max_length=100)
     group_name: str
 
+class StudentRosterItem(BaseModel):
+    """Строка списка для массовой регистрации (user_id генерируется сервером)"""
+    full_name: str = Field(..., min_length=3, max_length=100)
+    login: str = Field(..., min_length=3, max_length=50)
+    password: str = Field(..., min_length=6, max_length=100)
+    group_name: str
+
 class StudentLogin(BaseModel):
     login: str
     password: str
@@ -19,6 +26,9 @@ class StudentResponse(BaseModel):
     login: str
     group_name: str
     message: str
+    access_token: Optional[str] = None
+    token_type: Optional[str] = None
+    expires_in: Optional[int] = None
 
 class StudentInfo(BaseModel):
     full_name: str
@@ -10,6 +10,14 @@ class TeacherCreate(BaseModel):
     department: Optional[str] = Field(None, max_length=100)
     position: Optional[str] = Field(None, max_length=100)
 
+class TeacherRosterItem(BaseModel):
+    """Строка списка для массовой регистрации (user_id генерируется сервером)"""
+    full_name: str = Field(..., min_length=3, max_length=100)
+    login: str = Field(..., min_length=3, max_length=50)
+    password: str = Field(..., min_length=6, max_length=100)
+    department: Optional[str] = Field(None, max_length=100)
+    position: Optional[str] = Field(None, max_length=100)
+
 class TeacherLogin(BaseModel):
     login: str
     password: str
@@ -21,6 +29,9 @@ class TeacherResponse(BaseModel):
     department: Optional[str] = None
     position: Optional[str] = None
     message: str
+    access_token: Optional[str] = None
+    token_type: Optional[str] = None
+    expires_in: Optional[int] = None
 
 class TeacherInfo(BaseModel):
     full_name: str
@@ -0,0 +1,127 @@
+# tests/test_announcements.py
+"""
+Подбор объявлений: разбор диапазонов версий (parse_range) и фильтры
+AnnouncementIndex — границы версий, платформа, группа/роль, окно времени.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.announcements import AnnouncementIndex, parse_range, parse_version
+
+
+def _ts(value: str) -> float:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+NOW = _ts("2025-03-01T12:00:00")
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("1.2.3", (1, 2, 3)),
+    ("1.2", (1, 2, 0)),
+    ("v2", (2, 0, 0)),
+    ("1.2.3-beta+5", (1, 2, 3)),
+])
+def test_parse_version(raw, expected):
+    assert parse_version(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["", "1.2.3.4", "abc", "1.x"])
+def test_parse_version_rejects_garbage(raw):
+    with pytest.raises(ValueError):
+        parse_version(raw)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("*", (None, None)),
+    ("", (None, None)),
+    ("1.4.x", ((1, 4, 0), (1, 5, 0))),
+    ("1.x", ((1, 0, 0), (2, 0, 0))),
+    ("1.*", ((1, 0, 0), (2, 0, 0))),
+    ("x.x", (None, None)),
+    ("^1.2.3", ((1, 2, 3), (2, 0, 0))),
+    ("~1.2.3", ((1, 2, 3), (1, 3, 0))),
+    (">=1.2", ((1, 2, 0), None)),
+    (">1.2.3", ((1, 2, 4), None)),
+    ("<2.0", (None, (2, 0, 0))),
+    ("<=1.4.2", (None, (1, 4, 3))),
+    ("=1.4.2", ((1, 4, 2), (1, 4, 3))),
+    ("1.4.2", ((1, 4, 2), (1, 4, 3))),
+    (">=1.2 <2.0", ((1, 2, 0), (2, 0, 0))),
+    ("^1.2.0 <1.5 >=1.3", ((1, 3, 0), (1, 5, 0))),
+])
+def test_parse_range(spec, expected):
+    assert parse_range(spec) == expected
+
+
+@pytest.mark.parametrize("spec, expected", [
+    # ^0.x — совместимы только версии с тем же минорным номером
+    ("^0.3.1", ((0, 3, 1), (0, 4, 0))),
+    ("^0.0.5", ((0, 0, 5), (0, 1, 0))),
+    ("^1.0.0", ((1, 0, 0), (2, 0, 0))),
+])
+def test_parse_range_caret_zero_major(spec, expected):
+    assert parse_range(spec) == expected
+
+
+@pytest.mark.parametrize("spec", [">=2.0 <1.0", "<1.0 >=1.0", ">1.2.3 <=1.2.3"])
+def test_parse_range_rejects_empty(spec):
+    with pytest.raises(ValueError):
+        parse_range(spec)
+
+
+def _index(*items) -> AnnouncementIndex:
+    return AnnouncementIndex([{"id": str(i), **item} for i, item in enumerate(items)])
+
+
+def _ids(index: AnnouncementIndex, version: str, **kwargs) -> list:
+    kwargs.setdefault("now", NOW)
+    return [doc["id"] for doc in index.match(parse_version(version), **kwargs)]
+
+
+def test_version_boundaries_are_half_open():
+    index = _index({"versions": ">=1.2.0 <1.4.0"}, {"versions": "<=1.4.0"}, {"versions": "*"})
+    assert _ids(index, "1.1.9") == ["1", "2"]
+    assert _ids(index, "1.2.0") == ["0", "1", "2"]
+    assert _ids(index, "1.3.99") == ["0", "1", "2"]
+    assert _ids(index, "1.4.0") == ["1", "2"]  # <=1.4.0 включает саму 1.4.0
+    assert _ids(index, "1.4.1") == ["2"]
+
+
+def test_overlapping_ranges_and_priority():
+    index = _index(
+        {"versions": "^1.0.0", "priority": 1, "createdAt": "2025-01-01T00:00:00"},
+        {"versions": "~1.2.0", "priority": 5},
+        {"versions": "^1.0.0", "priority": 1, "createdAt": "2025-02-01T00:00:00"},
+    )
+    assert _ids(index, "1.2.7") == ["1", "2", "0"]  # выше приоритет, затем новее
+    assert _ids(index, "1.3.0") == ["2", "0"]
+    assert _ids(index, "2.0.0") == []
+
+
+def test_platform_filter():
+    index = _index({"platforms": ["Android"]}, {"platforms": ["ios"]}, {})
+    assert sorted(_ids(index, "1.0.0", platform="android")) == ["0", "2"]
+    assert sorted(_ids(index, "1.0.0", platform="iOS")) == ["1", "2"]
+    assert _ids(index, "1.0.0", platform="web") == ["2"]
+    assert _ids(index, "1.0.0") == ["2"]  # без платформы — только общие
+
+
+def test_group_and_role_filter():
+    index = _index({"groups": ["ПИ-25"]}, {"roles": ["teacher"]}, {"groups": ["ПИ-25"], "roles": ["student"]})
+    assert _ids(index, "1.0.0", group="ПИ-25") == ["0"]
+    assert _ids(index, "1.0.0", group="ПИ-25", role="student") == ["0", "2"]
+    assert _ids(index, "1.0.0", group="ИВТ-24", role="teacher") == ["1"]
+    assert _ids(index, "1.0.0") == []
+
+
+def test_time_window():
+    index = _index(
+        {"startsAt": "2025-03-01T12:00:00"},
+        {"endsAt": "2025-03-01T12:00:00Z"},
+        {"startsAt": "2025-02-01T00:00:00", "endsAt": "2025-04-01T00:00:00+00:00"},
+    )
+    assert _ids(index, "1.0.0") == ["0", "2"]  # startsAt включительно, endsAt — нет
+    assert _ids(index, "1.0.0", now=NOW - 1) == ["1", "2"]
+    assert _ids(index, "1.0.0", now=_ts("2025-05-01T00:00:00")) == ["0"]
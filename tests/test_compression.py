@@ -0,0 +1,64 @@
+# tests/test_compression.py
+"""
+Выбор кодировки по Accept-Encoding (negotiate) и сравнение If-None-Match с ETag (etag_matches).
+"""
+import pytest
+
+import utils.compression as compression
+from utils.compression import etag_matches, negotiate
+
+needs_brotli = pytest.mark.skipif(compression.brotli is None, reason="пакет brotli не установлен")
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP", "gzip"),
+    ("deflate, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=abc", None),
+    ("*", "br" if compression.brotli else "gzip"),
+    ("*;q=0", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+@needs_brotli
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "br"),           # при равном q — br
+    ("br, gzip", "br"),
+    ("gzip, br;q=0.8", "gzip"),
+    ("gzip;q=0.5, br;q=0.9", "br"),
+    ("gzip ; q=0.9, br ; q=0.1", "gzip"),
+    ("br;q=0, *", "gzip"),        # явный отказ важнее «*»
+    ("gzip;q=0.3, *;q=0.5", "br"),
+    ("br", "br"),
+])
+def test_negotiate_brotli(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_negotiate_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate("br") is None
+    assert negotiate("br, gzip;q=0.1") == "gzip"
+    assert negotiate("*") == "gzip"
+
+
+@pytest.mark.parametrize("if_none_match, etag, expected", [
+    (None, '"abc"', False),
+    ("", '"abc"', False),
+    ('"abc"', '"abc"', True),
+    ('"abd"', '"abc"', False),
+    ('"x", "abc" ,"y"', '"abc"', True),
+    ("*", '"abc"', True),
+    ('W/"abc"', '"abc"', True),       # слабое сравнение: W/ не учитывается
+    ('"abc"', 'W/"abc"', True),
+    ('"abc-br"', '"abc-gzip"', False),  # у каждого сжатого варианта свой тег
+    ('abc', '"abc"', False),
+])
+def test_etag_matches(if_none_match, etag, expected):
+    assert etag_matches(if_none_match, etag) is expected
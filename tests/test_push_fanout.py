@@ -0,0 +1,119 @@
+# tests/test_push_fanout.py
+"""
+Персональная рассылка целиком: POST /api/push/send -> очередь -> fan_out ->
+локальная заглушка /fake-fcm. Сервер поднимается отдельным процессом с
+FCM_FAKE=true — отправка идёт настоящими HTTP-запросами через сессию utils.fcm.
+
+Проверяется, что недействительные токены удаляются из device_tokens,
+пользователи с notifications_enabled = 0 пуш не получают, а отчёт рассылки
+(fanout_reports, /api/health/push) содержит скорость отправки.
+"""
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_KEY = "test-admin-key"
+
+VALID = [f"device-on-{i:04d}" for i in range(150)]
+INVALID = [f"invalid-on-{i:04d}" for i in range(30)]
+DISABLED = [f"device-off-{i:04d}" for i in range(20)]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = _free_port()
+    db_path = str(tmp_path / "fanout.db")
+    env = {
+        **os.environ,
+        "DATABASE_URL": db_path,
+        "UPDATE_NOTICE_JSON_PATH": str(tmp_path / "notice.json"),
+        "ANNOUNCEMENTS_JSON_PATH": str(tmp_path / "announcements.json"),
+        "LOG_FILE": str(tmp_path / "server.log"),
+        "ACCESS_LOG_FILE": "",
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "ADMIN_API_KEY": ADMIN_KEY,
+        "FCM_FAKE": "true",
+        "FCM_BASE_URL": "",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=PROJECT_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                if httpx.get(base_url + "/readyz", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            assert proc.poll() is None and time.time() < deadline, "Сервер не поднялся"
+            time.sleep(0.2)
+        yield base_url, db_path
+    finally:
+        os.killpg(proc.pid, signal.SIGINT)
+        try:
+            proc.wait(30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+
+def _seed(db_path: str):
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO users (user_id, role) VALUES (?, ?)",
+            [("dev001", "developer"), ("on0001", "user"), ("off001", "user")],
+        )
+        conn.execute("INSERT INTO user_settings (user_id, notifications_enabled) VALUES ('off001', 0)")
+        conn.executemany(
+            "INSERT INTO device_tokens (user_id, token, platform) VALUES (?, ?, 'android')",
+            [("on0001", t) for t in VALID + INVALID] + [("off001", t) for t in DISABLED],
+        )
+
+
+def test_fanout_prunes_invalid_and_skips_disabled(server):
+    base_url, db_path = server
+    _seed(db_path)
+
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        token = client.post("/api/auth/token", params={"user_id": "dev001"},
+                            headers={"X-ADMIN-KEY": ADMIN_KEY}).json()["access_token"]
+        resp = client.post("/api/push/send", json={"title": "Пара перенесена"},
+                           headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 200, resp.text
+
+        deadline = time.time() + 60
+        while not (reports := client.get("/api/health/push").json()["fanout"]):
+            assert time.time() < deadline, "Рассылка не завершилась"
+            time.sleep(0.2)
+        delivered = {m["token"] for m in client.get("/fake-fcm/messages").json()}
+
+    report = reports[-1]
+    assert report["recipients"] == len(VALID) + len(INVALID)
+    assert report["sent"] == len(VALID)
+    assert report["pruned"] == len(INVALID)
+    assert report["failed"] == 0
+    assert report["seconds"] > 0 and report["per_second"] > 0
+    print(f"\nРассылка: {report['recipients']} токенов за {report['seconds']} с ({report['per_second']}/с)")
+
+    assert delivered == set(VALID)
+    with sqlite3.connect(db_path) as conn:
+        left = {row[0] for row in conn.execute("SELECT token FROM device_tokens")}
+    assert left == set(VALID) | set(DISABLED)
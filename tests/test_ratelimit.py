@@ -0,0 +1,109 @@
+# tests/test_ratelimit.py
+"""
+TokenBucketLimiter: пропуск пачки в пределах ёмкости, пополнение со временем,
+время до повтора, независимые ключи, очистка полных корзин.
+Часы подменяются — тесты не спят.
+"""
+import threading
+
+import pytest
+
+import utils.ratelimit as ratelimit
+from utils.ratelimit import SWEEP_INTERVAL, TokenBucketLimiter, _parse_limit
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+@pytest.mark.parametrize("spec, expected", [("5/60", (5.0, 60.0)), ("10", (10.0, 60.0)), ("0.5/1", (0.5, 1.0))])
+def test_parse_limit(spec, expected):
+    assert _parse_limit(spec) == expected
+
+
+def test_burst_up_to_capacity(clock):
+    limiter = TokenBucketLimiter(5, 60)
+    assert [limiter.hit("ip") for _ in range(5)] == [0.0] * 5
+    assert limiter.hit("ip") == pytest.approx(12.0)  # один токен в 60/5 секунд
+    assert limiter.stats()["allowed"] == 5
+    assert limiter.stats()["limited"] == 1
+
+
+def test_refill_over_time(clock):
+    limiter = TokenBucketLimiter(5, 60)
+    for _ in range(5):
+        limiter.hit("ip")
+    clock.advance(6)
+    assert limiter.hit("ip") == pytest.approx(6.0)  # полтокена накоплено, ждать ещё 6 с
+    clock.advance(6)
+    assert limiter.hit("ip") == 0.0
+    assert limiter.hit("ip") > 0
+
+
+def test_rejections_do_not_consume_tokens(clock):
+    limiter = TokenBucketLimiter(2, 10)
+    limiter.hit("ip")
+    limiter.hit("ip")
+    for _ in range(10):
+        assert limiter.hit("ip") > 0
+    clock.advance(5)
+    assert limiter.hit("ip") == 0.0
+
+
+def test_idle_refill_is_capped(clock):
+    limiter = TokenBucketLimiter(3, 30)
+    limiter.hit("ip")
+    clock.advance(3600)
+    assert [limiter.hit("ip") for _ in range(4)][-1] > 0
+
+
+def test_keys_are_independent(clock):
+    limiter = TokenBucketLimiter(1, 60)
+    assert limiter.hit("a") == 0.0
+    assert limiter.hit("a") > 0
+    assert limiter.hit("b") == 0.0
+
+
+def test_sweep_drops_full_buckets(clock):
+    limiter = TokenBucketLimiter(2, 10)
+    limiter.hit("idle")
+    clock.advance(SWEEP_INTERVAL - 1)
+    limiter.hit("busy")
+    limiter.hit("busy")
+    assert limiter.stats()["buckets"] == 2
+    clock.advance(1)
+    limiter.hit("new")  # запускает очистку: "idle" уже полная, "busy" — нет
+    assert limiter.stats()["buckets"] == 2
+    assert limiter.hit("idle") == 0.0 and limiter.hit("idle") == 0.0 and limiter.hit("idle") > 0
+
+
+def test_concurrent_hits_never_exceed_capacity(clock):
+    limiter = TokenBucketLimiter(50, 60)
+    allowed = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        allowed.append(sum(1 for _ in range(100) if limiter.hit("login") == 0.0))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(allowed) == 50
+    assert limiter.stats()["limited"] == 8 * 100 - 50
@@ -0,0 +1,77 @@
+# tests/test_startup.py
+"""
+Холодный старт: тяжёлые зависимости не должны подгружаться при импорте
+приложения, а `python main.py --startup-report` должен укладываться в бюджет
+(STARTUP_BUDGET_MS). Всё запускается в отдельных процессах — в процессе
+pytest модули уже могут быть импортированы.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Нужны только при отправке пуша, хэшировании пароля, обработке картинки или кодировании ответа
+HEAVY_MODULES = ("PIL", "requests", "google.auth", "bcrypt", "orjson")
+
+# Какие модули проекта импортируют тяжёлые зависимости во время `import main`.
+# orjson при наличии импортирует сам fastapi.responses, поэтому для него
+# проверяется только то, что его не тянет код проекта.
+_PROBE = """
+import builtins, json, os, sys
+heavy = {heavy!r}
+project = {project!r}
+importers = set()
+_import = builtins.__import__
+
+def _tracking_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0 and name.startswith(heavy) and globals:
+        path = globals.get("__file__") or ""
+        if path.startswith(project) and "site-packages" not in path:
+            importers.add(globals["__name__"] + " -> " + name)
+    return _import(name, globals, locals, fromlist, level)
+
+builtins.__import__ = _tracking_import
+import main
+builtins.__import__ = _import
+print(json.dumps({{
+    "loaded": [m for m in heavy if m in sys.modules],
+    "importers": sorted(importers),
+}}))
+"""
+
+
+@pytest.fixture
+def env(tmp_path):
+    return {
+        **os.environ,
+        "DATABASE_URL": str(tmp_path / "startup.db"),
+        "UPDATE_NOTICE_JSON_PATH": str(tmp_path / "notice.json"),
+        "LOG_FILE": str(tmp_path / "server.log"),
+        "ACCESS_LOG_FILE": str(tmp_path / "access.log"),
+        "DEBUG_ROUTES": "0",
+    }
+
+
+def _run(env, *args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=PROJECT_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+
+def test_import_main_skips_heavy_modules(env):
+    result = _run(env, "-c", _PROBE.format(heavy=HEAVY_MODULES, project=PROJECT_DIR))
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["importers"] == []
+    assert set(report["loaded"]) <= {"orjson"}
+
+
+def test_startup_report_within_budget(env):
+    result = _run(env, "main.py", "--startup-report")
+    assert "Итого:" in result.stdout, result.stderr
+    assert result.returncode == 0, result.stdout
@@ -0,0 +1,112 @@
+# utils/access_log.py
+"""
+Структурированный access-лог: одна JSON-строка на запрос.
+
+Время по подсистемам (SQLite, bcrypt, сериализация) накапливается в объекте
+RequestTimings, который лежит в ContextVar. Starlette копирует контекст в поток
+пула для sync-эндпоинтов, поэтому объект общий для middleware и обработчика.
+Запись идёт через очередь логгера: в очередь кладётся словарь, в JSON его
+кодирует фоновый поток (utils.logger.JsonLineFormatter), запрос этого не ждёт.
+Те же замеры попадают в гистограммы /metrics (utils.metrics).
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from utils.metrics import observe_request
+
+access_logger = logging.getLogger("access")
+
+
+class RequestTimings:
+    __slots__ = ("db", "db_queries", "bcrypt", "serialize", "user_id")
+
+    def __init__(self):
+        self.db = 0.0
+        self.db_queries = 0
+        self.bcrypt = 0.0
+        self.serialize = 0.0
+        self.user_id: Optional[str] = None
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Замеры текущего запроса (None — вне запроса: фоновые потоки, старт)."""
+    return _current.get()
+
+
+def add_db_time(seconds: float, queries: int = 0):
+    timings = _current.get()
+    if timings is not None:
+        timings.db += seconds
+        timings.db_queries += queries
+
+
+def add_bcrypt_time(seconds: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.bcrypt += seconds
+
+
+def set_request_user(user_id: str):
+    timings = _current.get()
+    if timings is not None:
+        timings.user_id = user_id
+
+
+def add_serialize_time(seconds: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.serialize += seconds
+
+
+class AccessLogMiddleware:
+    """ASGI-middleware (не BaseHTTPMiddleware — тот ломает стриминг и ContextVar)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            observe_request(scope["method"], route, status, elapsed, timings.db)
+            if access_logger.isEnabledFor(logging.INFO):
+                access_logger.info({
+                    "ts": round(time.time(), 3),
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status,
+                    "ms": round(elapsed * 1000, 2),
+                    "db_ms": round(timings.db * 1000, 2),
+                    "db_queries": timings.db_queries,
+                    "bcrypt_ms": round(timings.bcrypt * 1000, 2),
+                    "serialize_ms": round(timings.serialize * 1000, 3),
+                    "bytes": sent,
+                    "user_id": timings.user_id,
+                    "client": scope["client"][0] if scope.get("client") else None,
+                })
@@ -0,0 +1,163 @@
+# utils/announcements.py
+"""
+Подбор объявлений под клиента: диапазон версий, платформа, группа/роль, окно времени.
+
+Диапазоны версий компилируются в отсортированный список границ; между
+соседними границами набор подходящих объявлений один и тот же, он
+посчитан заранее. Запрос — bisect по границам (O(log n)) и проверка
+остальных условий только у объявлений найденного отрезка.
+
+Синтаксис диапазона (условия через пробел пересекаются):
+    *            — любая версия
+    1.4.x / 1.x  — 1.4.0 <= v < 1.5.0
+    ^1.2.3       — 1.2.3 <= v < 2.0.0
+    ~1.2.3       — 1.2.3 <= v < 1.3.0
+    >=1.2 <2.0   — операторы >=, >, <=, <, =
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+Version = Tuple[int, int, int]
+
+
+def parse_version(raw: str) -> Version:
+    """'1.2.3', '1.2', 'v1.2.3-beta+5' -> (1, 2, 3). ValueError — не версия."""
+    core = raw.strip().lstrip("vV").split("-", 1)[0].split("+", 1)[0]
+    parts = core.split(".")
+    if not core or len(parts) > 3:
+        raise ValueError(f"Некорректная версия: {raw!r}")
+    nums = [int(p) for p in parts]  # ValueError для нечисловых частей
+    while len(nums) < 3:
+        nums.append(0)
+    return nums[0], nums[1], nums[2]
+
+
+def _bump(v: Version, index: int) -> Version:
+    return tuple(v[:index]) + (v[index] + 1,) + (0,) * (2 - index)
+
+
+def parse_range(spec: str) -> Tuple[Optional[Version], Optional[Version]]:
+    """Диапазон -> полуинтервал [lo, hi); None — нет ограничения."""
+    lo: Optional[Version] = None
+    hi: Optional[Version] = None
+
+    def narrow(new_lo: Optional[Version], new_hi: Optional[Version]):
+        nonlocal lo, hi
+        if new_lo is not None and (lo is None or new_lo > lo):
+            lo = new_lo
+        if new_hi is not None and (hi is None or new_hi < hi):
+            hi = new_hi
+
+    for term in (spec or "*").split():
+        if term in ("*", "x", "X"):
+            continue
+        if term[0] == "^":
+            v = parse_version(term[1:])
+            narrow(v, _bump(v, 0) if v[0] else _bump(v, 1))
+        elif term[0] == "~":
+            v = parse_version(term[1:])
+            narrow(v, _bump(v, 1))
+        elif term[:2] in (">=", "<="):
+            v = parse_version(term[2:])
+            if term[0] == ">":
+                narrow(v, None)
+            else:
+                narrow(None, _bump(v, 2))
+        elif term[0] in "<>=":
+            v = parse_version(term[1:])
+            if term[0] == ">":
+                narrow(_bump(v, 2), None)
+            elif term[0] == "<":
+                narrow(None, v)
+            else:
+                narrow(v, _bump(v, 2))
+        else:
+            parts = term.split(".")
+            wild = [i for i, p in enumerate(parts) if p in ("x", "X", "*")]
+            if wild:
+                fixed = parts[:wild[0]]
+                if not fixed:
+                    continue
+                v = parse_version(".".join(fixed))
+                narrow(v, _bump(v, len(fixed) - 1))
+            else:
+                v = parse_version(term)
+                narrow(v, _bump(v, 2))
+    if lo is not None and hi is not None and lo >= hi:
+        raise ValueError(f"Пустой диапазон версий: {spec!r}")
+    return lo, hi
+
+
+def _parse_time(value) -> Optional[float]:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class _Rule(NamedTuple):
+    doc: dict
+    platforms: frozenset
+    groups: frozenset
+    roles: frozenset
+    starts: Optional[float]
+    ends: Optional[float]
+    order: tuple
+
+
+class AnnouncementIndex:
+    """Скомпилированный набор объявлений (неизменяемый, пересобирается целиком)."""
+
+    def __init__(self, items: List[dict]):
+        rules: List[_Rule] = []
+        ranges = []
+        for doc in items:
+            lo, hi = parse_range(doc.get("versions", "*"))
+            rules.append(_Rule(
+                doc,
+                frozenset(p.lower() for p in doc.get("platforms") or ()),
+                frozenset(doc.get("groups") or ()),
+                frozenset(doc.get("roles") or ()),
+                _parse_time(doc.get("startsAt")),
+                _parse_time(doc.get("endsAt")),
+                # выше приоритет, затем новее — раньше
+                (-int(doc.get("priority", 0)), -(_parse_time(doc.get("createdAt")) or 0)),
+            ))
+            ranges.append((lo, hi))
+
+        self.size = len(rules)
+        self._bounds: List[Version] = sorted({b for r in ranges for b in r if b is not None})
+        # отрезок i = [bounds[i-1], bounds[i]); для каждого — платформа -> правила
+        segments: List[Dict[str, List[_Rule]]] = [{} for _ in range(len(self._bounds) + 1)]
+        for rule, (lo, hi) in zip(rules, ranges):
+            first = 0 if lo is None else bisect_left(self._bounds, lo) + 1
+            last = len(self._bounds) if hi is None else bisect_left(self._bounds, hi)
+            keys = rule.platforms or ("*",)
+            for seg in segments[first:last + 1]:
+                for key in keys:
+                    seg.setdefault(key, []).append(rule)
+        # Сортировку по приоритету делаем один раз при сборке
+        self._segments = [
+            {key: tuple(sorted(rs, key=lambda r: r.order)) for key, rs in seg.items()}
+            for seg in segments
+        ]
+
+    def match(self, version: Version, platform: Optional[str] = None, group: Optional[str] = None,
+              role: Optional[str] = None, now: Optional[float] = None) -> List[dict]:
+        seg = self._segments[bisect_right(self._bounds, version)]
+        candidates = seg.get("*", ())
+        if platform:
+            extra = seg.get(platform.lower())
+            if extra:
+                candidates = sorted(candidates + extra, key=lambda r: r.order)
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        return [
+            r.doc for r in candidates
+            if (not r.groups or group in r.groups)
+            and (not r.roles or role in r.roles)
+            and (r.starts is None or r.starts <= now)
+            and (r.ends is None or now < r.ends)
+        ]
@@ -0,0 +1,261 @@
+# utils/auth.py
+"""
+Подписанные токены доступа (HMAC-SHA256) и зависимости FastAPI для проверки ролей.
+
+Формат: base64url(payload JSON) + "." + base64url(подпись).
+payload: {"sub": user_id, "role": роль, "iat": ..., "exp": ..., "jti": ..., "kid": ..., "ep": эпоха}
+
+Проверка токена — только CPU, без обращения к БД. Смена роли увеличивает
+users.token_epoch; эпохи держим в памяти (обновляются через cache_versions),
+и токены со старой эпохой больше не принимаются. Ключи:
+  ACCESS_TOKEN_KEYS="k2:секрет2,k1:секрет1" — первым подписываем, остальными только проверяем
+  (ротация: добавить новый ключ первым, старый убрать после истечения выданных им токенов).
+Если переменная не задана — секрет генерируется один раз и хранится в таблице settings.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Depends, Header, HTTPException
+
+from database.connection import get_db_connection
+from utils.access_log import set_request_user
+from utils.cache_versions import bump_version, cache_watcher
+from utils.logger import logger
+
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", 7 * 24 * 3600))
+_DB_KEY_SETTING = "token_signing_key"
+
+
+class Principal(NamedTuple):
+    user_id: str
+    role: str
+    jti: str
+    exp: int
+
+
+_keys: Dict[str, bytes] = {}
+_active_kid: Optional[str] = None
+_revoked: Dict[str, int] = {}  # jti -> exp
+_epochs: Dict[str, int] = {}   # user_id -> token_epoch (только ненулевые)
+_lock = threading.Lock()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _parse_env_keys(raw: str) -> Dict[str, bytes]:
+    keys: Dict[str, bytes] = {}
+    for part in raw.split(","):
+        kid, sep, secret = part.strip().partition(":")
+        if sep and kid and secret:
+            keys[kid] = secret.encode("utf-8")
+    return keys
+
+
+def load_auth_state():
+    """Загрузка ключей подписи и списка отозванных токенов (при старте)."""
+    global _keys, _active_kid
+    keys = _parse_env_keys(os.getenv("ACCESS_TOKEN_KEYS", ""))
+    now = int(time.time())
+
+    with get_db_connection() as conn:
+        if not keys:
+            row = conn.execute("SELECT value FROM settings WHERE key = ?", (_DB_KEY_SETTING,)).fetchone()
+            if row:
+                secret = row["value"]
+            else:
+                secret = secrets.token_urlsafe(32)
+                conn.execute(
+                    "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+                    (_DB_KEY_SETTING, secret)
+                )
+                conn.commit()
+                # Другой воркер мог успеть раньше — берём то, что реально лежит в БД
+                secret = conn.execute(
+                    "SELECT value FROM settings WHERE key = ?", (_DB_KEY_SETTING,)
+                ).fetchone()["value"]
+            keys = {"db": secret.encode("utf-8")}
+
+        conn.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (now,))
+        conn.commit()
+        revoked = {row["jti"]: row["expires_at"] for row in conn.execute("SELECT jti, expires_at FROM revoked_tokens")}
+        epochs = _select_epochs(conn)
+
+    with _lock:
+        _keys = keys
+        _active_kid = next(iter(keys))
+        _revoked.clear()
+        _revoked.update(revoked)
+        _epochs.clear()
+        _epochs.update(epochs)
+    logger.info(f"Ключей подписи токенов: {len(keys)}, отозванных токенов: {len(revoked)}")
+
+
+def _reload_revoked(version: int):
+    """Токен отозван на другом воркере — перечитываем список отозванных."""
+    now = int(time.time())
+    with get_db_connection() as conn:
+        revoked = {
+            row["jti"]: row["expires_at"]
+            for row in conn.execute("SELECT jti, expires_at FROM revoked_tokens WHERE expires_at >= ?", (now,))
+        }
+    # Объединяем, а не заменяем: отзыв не отменяется, а свежий локальный мог не попасть в выборку
+    with _lock:
+        for jti in [j for j, exp in _revoked.items() if exp < now]:
+            del _revoked[jti]
+        _revoked.update(revoked)
+
+
+cache_watcher.register("revoked_tokens", _reload_revoked)
+
+
+def _select_epochs(conn) -> Dict[str, int]:
+    return {
+        row["user_id"]: row["token_epoch"]
+        for row in conn.execute("SELECT user_id, token_epoch FROM users WHERE token_epoch > 0")
+    }
+
+
+def _reload_epochs(version: int):
+    """Роль сменили на другом воркере — перечитываем эпохи токенов."""
+    with get_db_connection() as conn:
+        epochs = _select_epochs(conn)
+    with _lock:
+        # Эпоха только растёт: локально увеличенную не откатываем устаревшим чтением
+        for user_id, epoch in epochs.items():
+            if epoch > _epochs.get(user_id, 0):
+                _epochs[user_id] = epoch
+
+
+cache_watcher.register("token_epochs", _reload_epochs)
+
+
+def invalidate_user_tokens(conn, user_id: str):
+    """
+    Все выданные пользователю токены перестают действовать (смена роли).
+    Вызывается в транзакции изменения; коммит — на стороне вызывающего.
+    """
+    conn.execute("UPDATE users SET token_epoch = token_epoch + 1 WHERE user_id = ?", (user_id,))
+    bump_version(conn, "token_epochs")
+    row = conn.execute("SELECT token_epoch FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    if row:
+        with _lock:
+            _epochs[user_id] = max(_epochs.get(user_id, 0), row["token_epoch"])
+
+
+def _current_epoch(user_id: str) -> int:
+    # Из БД, а не из памяти: вход на другом воркере сразу после смены роли получит новую эпоху
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT token_epoch FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    return row["token_epoch"] if row else 0
+
+
+def _sign(kid: str, body: str) -> str:
+    return _b64encode(hmac.new(_keys[kid], body.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(user_id: str, role: str, ttl: int = ACCESS_TOKEN_TTL) -> Dict:
+    """Выдача токена. Возвращает поля для ответа клиенту."""
+    if _active_kid is None:
+        raise RuntimeError("Ключи подписи токенов не загружены")
+    now = int(time.time())
+    payload = {
+        "sub": user_id,
+        "role": role,
+        "iat": now,
+        "exp": now + ttl,
+        "jti": secrets.token_hex(8),
+        "kid": _active_kid,
+        "ep": _current_epoch(user_id),
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    set_request_user(user_id)
+    return {
+        "access_token": f"{body}.{_sign(_active_kid, body)}",
+        "token_type": "bearer",
+        "expires_in": ttl,
+    }
+
+
+def decode_token(token: str) -> Optional[Principal]:
+    """Проверка подписи, срока и отзыва. None — токен недействителен."""
+    body, sep, signature = token.partition(".")
+    if not sep:
+        return None
+    try:
+        payload = json.loads(_b64decode(body))
+        kid = payload["kid"]
+    except Exception:
+        return None
+    if not isinstance(kid, str):
+        return None
+    # bytes: compare_digest со str падает на не-ASCII символах (подделанная подпись)
+    if kid not in _keys or not hmac.compare_digest(_sign(kid, body).encode("ascii"), signature.encode("utf-8")):
+        return None
+    if payload.get("exp", 0) < time.time() or payload.get("jti") in _revoked:
+        return None
+    if payload.get("ep", 0) != _epochs.get(payload.get("sub"), 0):
+        return None  # роль сменилась после выдачи токена
+    return Principal(payload["sub"], payload["role"], payload["jti"], payload["exp"])
+
+
+def revoke_token(principal: Principal):
+    """Отзыв токена (до истечения его срока)."""
+    with get_db_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+            (principal.jti, principal.exp)
+        )
+        bump_version(conn, "revoked_tokens")
+        conn.commit()
+    with _lock:
+        now = time.time()
+        for jti in [j for j, exp in _revoked.items() if exp < now]:
+            del _revoked[jti]
+        _revoked[principal.jti] = principal.exp
+
+
+def get_optional_principal(authorization: Optional[str] = Header(None)) -> Optional[Principal]:
+    """Зависимость: Principal из 'Authorization: Bearer ...' или None, если заголовка нет."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Неверный заголовок авторизации")
+    principal = decode_token(token.strip())
+    if principal is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Токен недействителен или истёк",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    set_request_user(principal.user_id)
+    return principal
+
+
+def get_current_principal(principal: Optional[Principal] = Depends(get_optional_principal)) -> Principal:
+    """Зависимость: обязательный токен."""
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Требуется авторизация", headers={"WWW-Authenticate": "Bearer"})
+    return principal
+
+
+def require_roles(*roles: str):
+    """Фабрика зависимостей: токен с одной из перечисленных ролей, иначе 403."""
+    def dependency(principal: Principal = Depends(get_current_principal)) -> Principal:
+        if principal.role not in roles:
+            raise HTTPException(status_code=403, detail="Доступ запрещен")
+        return principal
+    return dependency
@@ -1,3 +1,4 @@
+import glob
 import os
 import shutil
 from datetime import datetime
@@ -5,6 +6,22 @@ from config import SERVER_CONFIG
 from utils.logger import logger
 
 
+BACKUP_PATTERN = "decanat_app_backup_*.db"
+
+
+def last_backup():
+    """Самая свежая резервная копия: имя, время и размер (None — копий нет)"""
+    files = glob.glob(BACKUP_PATTERN)
+    if not files:
+        return None
+    latest = max(files, key=os.path.getmtime)
+    return {
+        "file": latest,
+        "created_at": datetime.fromtimestamp(os.path.getmtime(latest)).isoformat(),
+        "size_bytes": os.path.getsize(latest),
+    }
+
+
 def backup_database():
     """Создание резервной копии базы данных"""
     if not SERVER_CONFIG["backup_enabled"]:
@@ -0,0 +1,92 @@
+# utils/cache_versions.py
+"""
+Сброс кэшей в памяти между воркерами.
+
+Каждый кэш (каталог групп, отозванные токены, ...) имеет строку в таблице
+cache_versions. Тот, кто меняет данные, увеличивает версию в той же
+транзакции (bump_version). Фоновый поток каждого воркера раз в
+CACHE_VERSION_POLL_SECONDS читает всю таблицу одним запросом и вызывает
+обработчик кэша, версия которого изменилась. Горячий путь запросов
+в БД за версиями не ходит.
+"""
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict
+
+from database.connection import get_db_connection
+from utils.logger import logger
+
+CACHE_VERSION_POLL_SECONDS = float(os.getenv("CACHE_VERSION_POLL_SECONDS", 2))
+
+
+def bump_version(conn: sqlite3.Connection, name: str):
+    """Вызывать в транзакции изменения данных кэша, до commit."""
+    conn.execute(
+        """INSERT INTO cache_versions (name, version) VALUES (?, 1)
+           ON CONFLICT(name) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP""",
+        (name,)
+    )
+
+
+def read_version(conn: sqlite3.Connection, name: str) -> int:
+    row = conn.execute("SELECT version FROM cache_versions WHERE name = ?", (name,)).fetchone()
+    return row["version"] if row else 0
+
+
+class CacheVersionWatcher:
+    def __init__(self, interval: float = CACHE_VERSION_POLL_SECONDS):
+        self.interval = interval
+        self._handlers: Dict[str, Callable[[int], None]] = {}
+        self._seen: Dict[str, int] = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self.reloads = 0
+
+    def register(self, name: str, handler: Callable[[int], None]):
+        """handler(version) вызывается из фонового потока при смене версии кэша name."""
+        self._handlers[name] = handler
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            try:
+                self.poll(notify=False)  # текущие версии — отправная точка
+            except Exception as e:
+                logger.error(f"Не удалось прочитать версии кэшей: {e}")
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-versions", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Ошибка проверки версий кэшей: {e}")
+
+    def poll(self, notify: bool = True):
+        with get_db_connection() as conn:
+            versions = {row["name"]: row["version"] for row in conn.execute("SELECT name, version FROM cache_versions")}
+        for name, version in versions.items():
+            if self._seen.get(name) == version:
+                continue
+            self._seen[name] = version
+            handler = self._handlers.get(name)
+            if notify and handler is not None:
+                self.reloads += 1
+                try:
+                    handler(version)
+                except Exception as e:
+                    logger.error(f"Ошибка обновления кэша {name}: {e}")
+
+
+cache_watcher = CacheVersionWatcher()
@@ -0,0 +1,191 @@
+# utils/compression.py
+"""
+Сжатие ответов: gzip и brotli (если установлен пакет brotli).
+
+CompressionMiddleware сжимает готовые ответы (не стриминг) с текстовым
+типом и телом от COMPRESS_MIN_BYTES; кодировка выбирается по
+Accept-Encoding (br предпочтительнее gzip при равном q).
+
+Ответы из кэшей в памяти отдаются через CachedBody: сжатые варианты
+считаются один раз на тело (с максимальной степенью) и переиспользуются;
+middleware такие ответы (уже с Content-Encoding) не трогает. У каждого
+варианта свой ETag ("<хэш>-br", "<хэш>-gzip", "<хэш>"). Если middleware
+сжимает ответ со строгим ETag, ETag становится слабым (W/"...").
+"""
+import gzip
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from utils.fast_json import dumps
+
+try:
+    import brotli
+except ImportError:  # без brotli отдаём только gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+# Для сжатия «на лету» — быстрые уровни; кэшированные тела сжимаются один раз и сильнее
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 11
+
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """'gzip, br;q=0.8' -> 'gzip'. None — сжимать нельзя или не нужно."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match: список тегов, слабое сравнение (W/ игнорируется), '*'."""
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    # mtime=0 — одинаковое тело даёт одинаковые байты
+    return gzip.compress(body, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+
+class CachedBody:
+    """Готовое JSON-тело ответа из кэша: байты, хэш для ETag и лениво посчитанные сжатые варианты."""
+
+    __slots__ = ("body", "digest", "_variants", "_lock")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.digest = hashlib.sha1(body).hexdigest()[:20]
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_json(cls, data) -> "CachedBody":
+        return cls(dumps(data))
+
+    def variant(self, encoding: Optional[str]) -> Optional[bytes]:
+        """Сжатое тело (один раз на кэшированное тело) или None — отдавать как есть."""
+        if encoding is None or len(self.body) < COMPRESS_MIN_BYTES:
+            return None
+        data = self._variants.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._variants.get(encoding)
+                if data is None:
+                    data = compress(self.body, encoding, cached=True)
+                    self._variants[encoding] = data
+        return data
+
+    def etag(self, encoding: Optional[str]) -> str:
+        """Строгий ETag варианта: байты br, gzip и несжатого тела различаются."""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def response(self, request: Request, headers: Optional[dict] = None) -> Response:
+        """Ответ с учётом If-None-Match и Accept-Encoding."""
+        encoding = None
+        if len(self.body) >= COMPRESS_MIN_BYTES:
+            encoding = negotiate(request.headers.get("accept-encoding", ""))
+        headers = {"ETag": self.etag(encoding), "Vary": "Accept-Encoding", **(headers or {})}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return Response(content=self.body, media_type="application/json", headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(content=self.variant(encoding), media_type="application/json", headers=headers)
+
+
+class CompressionMiddleware:
+    """Чистое ASGI-middleware: буферизует только одно-сообщенческие ответы, стриминг (SSE) не трогает."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._should_compress(start, body):
+                await send(start)
+                await send(message)
+                return
+            compressed = compress(body, encoding)
+            headers = [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"vary", b"etag")]
+            for k, v in start["headers"]:
+                if k == b"etag":  # строгий ETag несжатого тела к сжатому не подходит
+                    headers.append((k, v if v.startswith(b"W/") else b"W/" + v))
+            vary = [v for k, v in start["headers"] if k == b"vary"]
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"]) if vary else b"Accept-Encoding"))
+            headers.append((b"content-encoding", encoding.encode("ascii")))
+            headers.append((b"content-length", str(len(compressed)).encode("ascii")))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+        if start_message is not None:  # ответ без тела
+            await send(start_message)
+
+    def _should_compress(self, start, body: bytes) -> bool:
+        if len(body) < self.minimum_size or start["status"] in (204, 304):
+            return False
+        content_type = b""
+        for name, value in start["headers"]:
+            if name == b"content-encoding":
+                return False  # уже сжато (CachedBody) или отдаём как есть
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(_COMPRESSIBLE)
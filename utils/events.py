@@ -0,0 +1,191 @@
+# utils/events.py
+"""
+Шина изменений для SSE-ленты /api/events, общая для всех воркеров.
+
+Обработчики записи (новости, расписание, объявления) вызывают publish()
+после commit, из пула потоков. Событие пишется строкой в таблицу events —
+так его видят все воркеры. Фоновый поток каждого воркера забирает новые
+строки (WHERE id > последний) раз в EVENTS_POLL_SECONDS, а в воркере-издателе
+сразу после публикации, и складывает их в кольцевой буфер. По буферу клиент
+догоняет пропущенное после переподключения (Last-Event-ID) — в том числе
+если переподключился к другому воркеру: id события — id строки в БД.
+
+Подписчик не держит собственной очереди: все ждут одну общую future,
+которая завершается при каждой новой порции событий, и дочитывают буфер по номеру события.
+Поэтому тысячи простаивающих соединений стоят по одной корутине.
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+from database.connection import get_db_connection
+from utils.logger import logger
+
+EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", 1000))
+# Задержка доставки события подписчикам других воркеров
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", 0.5))
+# Таблица events чистится раз в столько публикаций; хранится EVENTS_BUFFER_SIZE последних
+_PRUNE_EVERY = 100
+
+
+class EventHub:
+    def __init__(self, buffer_size: int = EVENTS_BUFFER_SIZE, interval: float = EVENTS_POLL_SECONDS):
+        self.interval = interval
+        self._seq = 0  # id последнего события в буфере
+        self._buffer: deque = deque(maxlen=buffer_size)  # (seq, type, data_json)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Future] = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._poll_now = threading.Event()
+        self.subscribers = 0
+        self.published = 0  # опубликовано этим воркером
+        self.received = 0   # получено из таблицы (от всех воркеров)
+
+    def start(self):
+        """Привязка к event loop сервера и запуск опроса таблицы (вызывается в lifespan)."""
+        self._loop = asyncio.get_running_loop()
+        self._changed = self._loop.create_future()
+        try:
+            self._load_recent()
+        except Exception as e:
+            logger.error(f"Не удалось прочитать последние события: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливаем опрос и будим всех подписчиков, чтобы они завершились."""
+        self._stop.set()
+        self._poll_now.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._loop is not None:
+            self._wake()
+            self._loop = None
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def event_id(self, seq: int) -> str:
+        return str(seq)
+
+    def publish(self, event_type: str, data: dict):
+        """Публикация события для всех воркеров. Вызывать после commit изменения, не из event loop."""
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with get_db_connection() as conn:
+            cur = conn.execute("INSERT INTO events (type, data) VALUES (?, ?)", (event_type, payload))
+            if cur.lastrowid % _PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM events WHERE id <= ?", (cur.lastrowid - self._buffer.maxlen,))
+            conn.commit()
+        self.published += 1
+        self._poll_now.set()  # свои подписчики получают событие сразу, без ожидания интервала
+
+    def _load_recent(self):
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, type, data FROM events ORDER BY id DESC LIMIT ?", (self._buffer.maxlen,)
+            ).fetchall()
+        with self._lock:
+            self._buffer.clear()
+            self._buffer.extend((row["id"], row["type"], row["data"]) for row in reversed(rows))
+            self._seq = rows[0]["id"] if rows else 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._poll_now.wait(self.interval)
+            self._poll_now.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Ошибка чтения событий: {e}")
+
+    def poll(self):
+        """Новые события из таблицы в буфер. Id растут в порядке commit — писатель в SQLite один."""
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, type, data FROM events WHERE id > ? ORDER BY id", (self._seq,)
+            ).fetchall()
+        if not rows:
+            return
+        with self._lock:
+            self._buffer.extend((row["id"], row["type"], row["data"]) for row in rows)
+            self._seq = rows[-1]["id"]
+        self.received += len(rows)
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass  # loop уже закрыт (остановка сервера)
+
+    def _wake(self):
+        changed, self._changed = self._changed, (self._loop.create_future() if self._loop else None)
+        if changed is not None and not changed.done():
+            changed.set_result(None)
+
+    def resume_point(self, last_event_id: Optional[str]) -> Tuple[int, bool]:
+        """
+        С какого номера отдавать события по Last-Event-ID.
+        Второе значение — False, если часть событий уже вытеснена из буфера
+        (или id неизвестен этому воркеру) и клиенту надо перечитать данные целиком.
+        """
+        if not last_event_id:
+            return self._seq, True
+        if not last_event_id.isdigit() or int(last_event_id) > self._seq:
+            return self._seq, False
+        seq = int(last_event_id)
+        with self._lock:
+            oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+        return seq, seq + 1 >= oldest
+
+    def since(self, seq: int) -> List[Tuple[int, str, str]]:
+        """События с номером больше seq (из буфера)."""
+        with self._lock:
+            if not self._buffer or self._buffer[-1][0] <= seq:
+                return []
+            return [item for item in self._buffer if item[0] > seq]
+
+    async def wait(self, timeout: float) -> bool:
+        """Ждать следующей порции событий не дольше timeout. True — что-то пришло."""
+        changed = self._changed
+        if changed is None:
+            await asyncio.sleep(timeout)
+            return False
+        try:
+            await asyncio.wait_for(asyncio.shield(changed), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "received": self.received,
+            "last_id": self.event_id(self._seq),
+            "buffered": len(self._buffer),
+        }
+
+
+event_hub = EventHub()
+
+
+def publish_event(event_type: str, data: dict):
+    """Публикация без риска уронить запрос: ошибка шины только логируется."""
+    try:
+        event_hub.publish(event_type, data)
+    except Exception as e:
+        logger.error(f"Ошибка публикации события {event_type}: {e}")
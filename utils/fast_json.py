@@ -0,0 +1,113 @@
+# utils/fast_json.py
+"""
+Быстрая сериализация JSON-ответов.
+
+dumps() — orjson (если установлен) или json из stdlib с теми же настройками,
+что у Starlette JSONResponse: компактно, UTF-8 без \\u-экранирования.
+orjson импортируется при первом вызове, а не при импорте приложения.
+
+FastJSONResponse — класс ответа по умолчанию: кодирует через dumps() и пишет
+время кодирования в замеры запроса (serialize_ms в access-логе).
+
+FastJSONRoute — route_class роутеров. Если у маршрута нет response_model,
+ответ JSON и нет параметра `response: Response` (в обработчике или его
+зависимостях), обработчик оборачивается так, что dict/list сразу уходит
+в FastJSONResponse без jsonable_encoder. Для sync-обработчиков кодирование
+при этом идёт в потоке пула, а не в event loop. Маршруты с response_model
+(UserResponse и т.п.) идут обычным путём FastAPI — фильтрация полей
+сохраняется.
+"""
+import json
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Any, Callable
+
+from fastapi.dependencies.models import Dependant
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from fastapi.datastructures import DefaultPlaceholder
+from starlette.responses import JSONResponse, Response
+
+from utils.access_log import add_serialize_time
+
+_dumps = None
+
+
+def _load_dumps() -> Callable[[Any], bytes]:
+    try:
+        import orjson
+    except ImportError:  # без orjson — stdlib json с теми же настройками
+        def stdlib_dumps(content: Any) -> bytes:
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        return stdlib_dumps
+    options = orjson.OPT_NON_STR_KEYS
+
+    def orjson_dumps(content: Any) -> bytes:
+        return orjson.dumps(content, option=options)
+    return orjson_dumps
+
+
+def dumps(content: Any) -> bytes:
+    global _dumps
+    if _dumps is None:
+        _dumps = _load_dumps()
+    return _dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ через dumps(); время кодирования пишется в замеры запроса."""
+
+    def render(self, content: Any) -> bytes:
+        t0 = time.perf_counter()
+        try:
+            body = dumps(content)
+        except TypeError:
+            # pydantic-модели, bytes, Decimal и т.п. — сначала в простые типы, как делает FastAPI
+            body = dumps(jsonable_encoder(content))
+        add_serialize_time(time.perf_counter() - t0)
+        return body
+
+
+def _uses_sub_response(dependant: Dependant) -> bool:
+    """Обработчик или зависимость принимает `response: Response` — заголовки из него нужны FastAPI."""
+    if dependant.response_param_name:
+        return True
+    return any(_uses_sub_response(sub) for sub in dependant.dependencies)
+
+
+def _fast_path(call: Callable, status_code: int) -> Callable:
+    # FastAPI по обработчику решает, звать его в пуле или await, — обёртка должна совпадать
+    if iscoroutinefunction(call):
+        @wraps(call)
+        async def endpoint(*args, **kwargs):
+            content = await call(*args, **kwargs)
+            if isinstance(content, Response):
+                return content
+            return FastJSONResponse(content, status_code=status_code)
+    else:
+        @wraps(call)
+        def endpoint(*args, **kwargs):
+            content = call(*args, **kwargs)
+            if isinstance(content, Response):
+                return content
+            return FastJSONResponse(content, status_code=status_code)
+    return endpoint
+
+
+class FastJSONRoute(APIRoute):
+    """Маршрут, отдающий dict/list без jsonable_encoder (см. описание модуля)."""
+
+    def get_route_handler(self) -> Callable:
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if (
+            self.response_field is None
+            and isinstance(response_class, type)
+            and issubclass(response_class, FastJSONResponse)
+            and (self.status_code is None or self.status_code not in (204, 304))
+            and not _uses_sub_response(self.dependant)
+        ):
+            self.dependant.call = _fast_path(self.dependant.call, self.status_code or 200)
+        return super().get_route_handler()
@@ -1,13 +1,46 @@
 # utils/fcm.py
 import os
 import json
-import requests
-import google.auth.transport.requests
-import google.oauth2.service_account
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
 from config import SERVER_CONFIG
 
+# requests и google-auth (~100 мс импорта) подгружаются при первой отправке, а не при старте
+if TYPE_CHECKING:
+    import requests
+
 SCOPES = ["https://www.googleapis.com/auth/firebase.messaging"]
 PROJECT_ID = "decanprogeck"  # ваш project_id (из service account JSON)
+FCM_TIMEOUT = 10
+# Keep-alive соединений к FCM; столько же запросов одновременно держит рассылка (push_fanout)
+FCM_POOL_SIZE = int(os.getenv("FCM_POOL_SIZE", 32))
+# Обновляем OAuth-токен заранее, за столько до истечения
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+class FcmError(Exception):
+    """Неуспешный ответ FCM (пуш будет повторён очередью)."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"FCM v1 error {status_code}: {text[:300]}")
+        self.status_code = status_code
+        self.text = text
+
+    @property
+    def unregistered(self) -> bool:
+        """Токен устройства больше не действителен (приложение удалено/токен сменился)."""
+        return self.status_code == 404 or (
+            self.status_code == 400 and ("UNREGISTERED" in self.text or "registration token" in self.text)
+        )
+
+def _base_url() -> str:
+    if SERVER_CONFIG["fcm_base_url"]:
+        return SERVER_CONFIG["fcm_base_url"].rstrip("/")
+    if SERVER_CONFIG["fcm_fake"]:
+        return f"http://127.0.0.1:{SERVER_CONFIG['port']}/fake-fcm"
+    return "https://fcm.googleapis.com"
 
 def _get_sa_path() -> str:
     # Путь берём из FCM_SERVICE_ACCOUNT или GOOGLE_APPLICATION_CREDENTIALS
@@ -16,25 +49,124 @@ def _get_sa_path() -> str:
         raise FileNotFoundError(f"Service account JSON not found: '{p or 'EMPTY'}'")
     return p
 
-def get_access_token() -> str:
-    creds_path = _get_sa_path()
-    creds = google.oauth2.service_account.Credentials.from_service_account_file(
-        creds_path, scopes=SCOPES
-    )
-    request = google.auth.transport.requests.Request()
-    creds.refresh(request)
-    return creds.token
+_session = None
+_session_lock = threading.Lock()
 
-def send_news_to_topic(title: str, body: str, data: dict | None = None, topic: str = "news") -> None:
+def _get_session() -> "requests.Session":
+    """Общая keep-alive сессия: TCP+TLS к FCM переиспользуются между отправками."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=FCM_POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+class _AccessTokenProvider:
     """
-    Отправка пуша через FCM HTTP v1. Payload ДОЛЖЕН быть вида {"message": {...}}.
+    Долгоживущие credentials сервис-аккаунта. Токен обновляется незадолго до истечения,
+    одновременные запросы ждут одно обновление (single-flight), а не делают каждый своё.
     """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._creds = None
+        self.refreshes = 0
+
+    @staticmethod
+    def _fresh(creds) -> bool:
+        if not creds or not creds.token:
+            return False
+        # expiry у google-auth — naive UTC
+        return creds.expiry is None or creds.expiry - datetime.utcnow() > TOKEN_REFRESH_MARGIN
+
+    def get(self) -> str:
+        creds = self._creds
+        if self._fresh(creds):
+            return creds.token
+        with self._lock:
+            creds = self._creds
+            if self._fresh(creds):
+                return creds.token
+            import google.auth.transport.requests
+            import google.oauth2.service_account
+
+            if creds is None:
+                creds = google.oauth2.service_account.Credentials.from_service_account_file(
+                    _get_sa_path(), scopes=SCOPES
+                )
+            creds.refresh(google.auth.transport.requests.Request(session=_get_session()))
+            self.refreshes += 1
+            self._creds = creds
+            return creds.token
+
+    def invalidate(self):
+        """Токен отвергнут FCM (401) — следующий get() обновит его."""
+        with self._lock:
+            if self._creds is not None:
+                self._creds.token = None
+
+_token_provider = _AccessTokenProvider()
+
+_stats_lock = threading.Lock()
+_send_stats = {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+def get_access_token() -> str:
+    if SERVER_CONFIG["fcm_fake"]:
+        return "fake-token"
+    return _token_provider.get()
+
+def _post_message(message: dict) -> "requests.Response":
+    """POST messages:send через общую сессию, с учётом задержки отправки."""
     access_token = get_access_token()
-    url = f"https://fcm.googleapis.com/v1/projects/{PROJECT_ID}/messages:send"
+    url = f"{_base_url()}/v1/projects/{PROJECT_ID}/messages:send"
+    headers = {
+        "Content-Type": "application/json; charset=UTF-8",
+        "Authorization": f"Bearer {access_token}",
+    }
+
+    started = time.perf_counter()
+    try:
+        resp = _get_session().post(url, headers=headers, data=json.dumps({"message": message}), timeout=FCM_TIMEOUT)
+    except Exception:
+        with _stats_lock:
+            _send_stats["errors"] += 1
+        raise
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _stats_lock:
+        _send_stats["count"] += 1
+        _send_stats["total_ms"] += elapsed_ms
+        _send_stats["max_ms"] = max(_send_stats["max_ms"], elapsed_ms)
+        if resp.status_code != 200:
+            _send_stats["errors"] += 1
+
+    if resp.status_code == 401:
+        _token_provider.invalidate()
+    return resp
+
+def fcm_stats() -> dict:
+    """Задержка отправки в FCM и число обновлений OAuth-токена."""
+    with _stats_lock:
+        count = _send_stats["count"]
+        return {
+            "sends": count,
+            "errors": _send_stats["errors"],
+            "send_ms_avg": round(_send_stats["total_ms"] / count, 2) if count else 0.0,
+            "send_ms_max": round(_send_stats["max_ms"], 2),
+            "token_refreshes": _token_provider.refreshes,
+        }
 
+def _build_message(target: dict, title: str, body: str, data: dict | None) -> dict:
+    """Сообщение HTTP v1; target — {"topic": ...} или {"token": ...}."""
     # HTTP v1 ожидает корень "message", а не legacy "to"/"priority" на верхнем уровне
-    message = {
-        "topic": topic,
+    return {
+        **target,
         "notification": {
             "title": title or "Новости",
             "body": (body or "")[:180],
@@ -54,14 +186,17 @@ def send_news_to_topic(title: str, body: str, data: dict | None = None, topic: s
         },
     }
 
-    payload = {"message": message}
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "Authorization": f"Bearer {access_token}",
-    }
+def send_news_to_topic(title: str, body: str, data: dict | None = None, topic: str = "news") -> None:
+    """
+    Отправка пуша через FCM HTTP v1. Payload ДОЛЖЕН быть вида {"message": {...}}.
+    """
+    resp = _post_message(_build_message({"topic": topic}, title, body, data))
+    if resp.status_code != 200:
+        # повтор и dead-letter — забота очереди (utils/push_outbox.py)
+        raise FcmError(resp.status_code, resp.text)
 
-    resp = requests.post(url, headers=headers, data=json.dumps(payload), timeout=10)
+def send_to_token(token: str, title: str, body: str, data: dict | None = None) -> None:
+    """Пуш на одно устройство. FcmError.unregistered — токен пора удалить."""
+    resp = _post_message(_build_message({"token": token}, title, body, data))
     if resp.status_code != 200:
-        # логируем для дебага, но не валим сервер
-        from utils.logger import logger
-        logger.error(f"FCM v1 error {resp.status_code}: {resp.text}")
+        raise FcmError(resp.status_code, resp.text)
@@ -0,0 +1,243 @@
+# utils/images.py
+"""
+Картинки для новостей: оригиналы и миниатюры на диске.
+
+Пути адресуются содержимым (sha256), поэтому файл по одному адресу никогда
+не меняется — его можно отдавать с Cache-Control: immutable.
+    MEDIA_ROOT/o/ab/cd/<sha256>.<ext>         — оригинал
+    MEDIA_ROOT/t/ab/cd/<sha256>_<w>.<fmt>     — миниатюра шириной w (webp и jpg)
+
+Миниатюры считаются в отдельном пуле процессов (Pillow держит GIL на
+декодировании), запрос загрузки их не ждёт.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from utils.logger import logger
+
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "media")
+MEDIA_URL_PREFIX = "/api/media"
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", 10 * 1024 * 1024))
+IMAGE_POOL_SIZE = int(os.getenv("IMAGE_POOL_SIZE", max(1, min(2, (os.cpu_count() or 1) // 2))))
+
+THUMB_WIDTHS = (320, 960)
+# расширение файла -> (формат Pillow, параметры сохранения)
+THUMB_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+MEDIA_NAME_RE = re.compile(r"^[0-9a-f]{64}(_\d+)?\.(jpg|png|gif|webp)$")
+_LOCAL_ORIGINAL_RE = re.compile(re.escape(MEDIA_URL_PREFIX) + r"/o/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$")
+
+
+def detect_image_type(raw: bytes) -> Optional[str]:
+    """Тип по сигнатуре файла (заголовку Content-Type клиента не доверяем)."""
+    for magic, ext in _SIGNATURES:
+        if raw.startswith(magic):
+            return ext
+    if raw[:4] == b"RIFF" and raw[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _shard(digest: str) -> str:
+    return f"{digest[:2]}/{digest[2:4]}"
+
+
+def original_name(digest: str, ext: str) -> str:
+    return f"o/{_shard(digest)}/{digest}.{ext}"
+
+
+def thumb_name(digest: str, width: int, fmt: str) -> str:
+    return f"t/{_shard(digest)}/{digest}_{width}.{fmt}"
+
+
+def media_path(name: str) -> str:
+    return os.path.join(MEDIA_ROOT, *name.split("/"))
+
+
+def media_url(name: str) -> str:
+    return f"{MEDIA_URL_PREFIX}/{name}"
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def render_thumbnails(src: str, digest: str) -> float:
+    """
+    Выполняется в дочернем процессе: все миниатюры для одного оригинала.
+    Возвращает длительность обработки (сек).
+    """
+    import io
+
+    from PIL import Image, ImageOps
+
+    t0 = time.perf_counter()
+    with Image.open(src) as img:
+        # JPEG: декодируем сразу в уменьшенном масштабе — в разы быстрее полного
+        img.draft("RGB", (max(THUMB_WIDTHS) * 2, max(THUMB_WIDTHS) * 2))
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        for width in THUMB_WIDTHS:
+            resized = img.copy()
+            if resized.width > width:
+                resized.thumbnail((width, resized.height), Image.LANCZOS)
+            for fmt, (pil_format, options) in THUMB_FORMATS.items():
+                buf = io.BytesIO()
+                resized.save(buf, pil_format, **options)
+                _atomic_write(media_path(thumb_name(digest, width, fmt)), buf.getvalue())
+    return time.perf_counter() - t0
+
+
+def thumbnails_ready(digest: str) -> bool:
+    return all(
+        os.path.exists(media_path(thumb_name(digest, w, fmt)))
+        for w in THUMB_WIDTHS for fmt in THUMB_FORMATS
+    )
+
+
+def describe(digest: str, ext: str) -> Dict:
+    """Ответ клиенту: ссылки на оригинал и миниатюры."""
+    return {
+        "id": digest,
+        "original": media_url(original_name(digest, ext)),
+        "thumbnails": {
+            str(w): {fmt: media_url(thumb_name(digest, w, fmt)) for fmt in THUMB_FORMATS}
+            for w in THUMB_WIDTHS
+        },
+        "ready": thumbnails_ready(digest),
+    }
+
+
+def thumbnail_url(url, width: int = THUMB_WIDTHS[0], fmt: str = "webp") -> Optional[str]:
+    """Миниатюра для image_url новости, если это наш загруженный файл и она уже готова."""
+    if isinstance(url, list):
+        url = url[0] if url else None
+    if not isinstance(url, str):
+        return None
+    m = _LOCAL_ORIGINAL_RE.search(url)
+    if not m:
+        return None
+    name = thumb_name(m.group(1), width, fmt)
+    return media_url(name) if os.path.exists(media_path(name)) else None
+
+
+class ImagePipeline:
+    """Сохранение оригиналов и фоновая нарезка миниатюр с замером задержки."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending: Dict[str, float] = {}  # digest -> момент загрузки
+        self._latencies = deque(maxlen=200)   # загрузка -> готовые миниатюры, сек
+        self._render_total = 0.0
+        self.processed = 0
+        self.failed = 0
+        self.deduplicated = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.size)
+        return self._executor
+
+    def store(self, raw: bytes) -> Dict:
+        """Сохранить оригинал и поставить миниатюры в очередь. ValueError — не картинка."""
+        received = time.perf_counter()
+        ext = detect_image_type(raw)
+        if ext is None:
+            raise ValueError("Поддерживаются только JPEG, PNG, GIF и WebP")
+        digest = hashlib.sha256(raw).hexdigest()
+        path = media_path(original_name(digest, ext))
+
+        if os.path.exists(path):
+            self.deduplicated += 1
+        else:
+            _atomic_write(path, raw)
+
+        future = None
+        if not thumbnails_ready(digest):
+            with self._lock:
+                if digest not in self._pending:
+                    self._pending[digest] = received
+                    future = self._get_executor().submit(render_thumbnails, path, digest)
+        if future is not None:
+            # вне блокировки: готовая future вызывает колбэк сразу в этом потоке
+            future.add_done_callback(lambda f, d=digest: self._on_done(d, f))
+        return describe(digest, ext)
+
+    def _on_done(self, digest: str, future):
+        with self._lock:
+            received = self._pending.pop(digest, None)
+            try:
+                render = future.result()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ошибка создания миниатюр {digest[:12]}: {e}")
+                return
+            self.processed += 1
+            self._render_total += render
+            if received is not None:
+                self._latencies.append(time.perf_counter() - received)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            done = self.processed or 1
+
+            def pct(p: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+            return {
+                "pool_size": self.size,
+                "pending": len(self._pending),
+                "processed": self.processed,
+                "failed": self.failed,
+                "deduplicated": self.deduplicated,
+                "render_ms_avg": round(self._render_total / done * 1000, 1),
+                "upload_to_thumbnail_ms_p50": pct(0.5),
+                "upload_to_thumbnail_ms_p95": pct(0.95),
+                "upload_to_thumbnail_ms_max": pct(1.0),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+image_pipeline = ImagePipeline(IMAGE_POOL_SIZE)
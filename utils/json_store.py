@@ -0,0 +1,142 @@
+# utils/json_store.py
+"""
+JSON-документ в файле, общий для нескольких воркеров.
+
+Запись атомарная (временный файл + fsync + os.replace): читатель видит либо
+старый, либо новый файл целиком. Кэш в памяти перепроверяется через os.stat
+не чаще раза в revalidate_ms, поэтому изменение с другого воркера становится
+видно не позже чем через этот интервал. Для выдачи держим уже закодированные
+байты и ETag.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from utils.fast_json import dumps
+from utils.file_lock import file_lock
+from utils.logger import logger
+from utils.metrics import cache_hit, cache_miss
+
+
+class JsonSnapshot(NamedTuple):
+    doc: Any
+    body: bytes  # компактный JSON для ответа
+    etag: str
+
+
+_EMPTY = JsonSnapshot(None, b"null", '"empty"')
+
+
+def _encode(doc: Any) -> JsonSnapshot:
+    if doc is None:
+        return _EMPTY
+    body = dumps(doc)
+    return JsonSnapshot(doc, body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"')
+
+
+class JsonFileStore:
+    def __init__(self, path: str, revalidate_ms: int = 500):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.revalidate = revalidate_ms / 1000
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._snapshot = _EMPTY
+        self._stat_key: Optional[Tuple[int, int, int]] = None
+        self._checked_at = 0.0
+        self.reloads = 0
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # os.replace меняет inode — ловим даже запись с тем же mtime и размером
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _reload(self, stat_key):
+        if stat_key is None:
+            self._snapshot = _EMPTY
+        else:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._snapshot = _encode(json.load(f))
+            except (OSError, ValueError) as e:
+                # битый файл — оставляем прежнее значение, попробуем при следующей проверке
+                logger.error(f"Не удалось прочитать {self.path}: {e}")
+                return
+        self._stat_key = stat_key
+        self.reloads += 1
+
+    def snapshot(self) -> JsonSnapshot:
+        """Текущее значение; не чаще раза в revalidate секунд сверяемся с файлом."""
+        now = time.monotonic()
+        if now - self._checked_at < self.revalidate:
+            cache_hit(self.name)
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at >= self.revalidate:
+                stat_key = self._stat()
+                if stat_key != self._stat_key:
+                    cache_miss(self.name)
+                    self._reload(stat_key)
+                else:
+                    cache_hit(self.name)
+                self._checked_at = now
+            else:
+                cache_hit(self.name)
+            return self._snapshot
+
+    def get(self) -> Any:
+        return self.snapshot().doc
+
+    def fresh_snapshot(self) -> JsonSnapshot:
+        """Значение прямо из файла (stat без ожидания revalidate) — для чтения перед записью."""
+        with self._lock:
+            stat_key = self._stat()
+            if stat_key != self._stat_key:
+                self._reload(stat_key)
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def update(self, change: Callable[[Any], Any]) -> JsonSnapshot:
+        """
+        Чтение-изменение-запись под межпроцессной блокировкой (<файл>.lock):
+        запись с другого воркера между чтением и записью не потеряется.
+        change(doc) -> новый doc; исключение из change отменяет запись.
+        """
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._update_lock, file_lock(self.path + ".lock"):
+            return self.set(change(self.fresh_snapshot().doc))
+
+    def set(self, doc: Any) -> JsonSnapshot:
+        """Атомарная запись (None — удалить файл)."""
+        with self._lock:
+            if doc is None:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+            else:
+                directory = os.path.dirname(self.path) or "."
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(doc, f, ensure_ascii=False, indent=2)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp, self.path)
+                except Exception:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    raise
+            self._snapshot = _encode(doc)
+            self._stat_key = self._stat()
+            self._checked_at = time.monotonic()
+            return self._snapshot
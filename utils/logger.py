@@ -1,33 +1,305 @@
+import atexit
+import gzip
+import json
 import logging
+import os
+import queue
+import shutil
+import socketserver
+import struct
 import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, SocketHandler
+
+from config import SERVER_CONFIG
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Воркеры (--workers N) не пишут файлы сами: записи уходят родителю по локальному
+# TCP-сокету, файлы открывает и ротирует только родительский процесс
+LOG_FORWARD_ENV = "DECANAT_LOG_FORWARD"
+
+_listeners = []
+_queues = {}            # "server" | "access" -> очередь QueueListener родителя
+_receiver = None
+# Поля записи, которые воркер пересылает родителю (JSON, не pickle — сокет не должен исполнять код)
+_FORWARD_FIELDS = ("name", "levelno", "levelname", "pathname", "filename", "module",
+                   "lineno", "funcName", "created", "msecs", "process", "thread", "threadName", "exc_text")
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    Кладёт запись в очередь как есть: очередь внутри процесса, поэтому
+    форматирование (и всё остальное) делает фоновый поток QueueListener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    Уровни по модулям: {'students': WARNING, 'schedule': DEBUG}.
+    Все модули пишут в один логгер utils.logger, поэтому смотрим на record.module (имя файла).
+    """
+
+    def __init__(self, default_level: int, module_levels: dict):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels
+
+    def filter(self, record):
+        return record.levelno >= self.module_levels.get(record.module, self.default_level)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживание частых сообщений: запись с extra=sampled("ключ") проходит
+    один раз из every; к прошедшей дописывается, сколько похожих пропущено.
+    Предупреждения и ошибки не прореживаются.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample_key", None)
+        if key is None or self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            n = self._counts.get(key, 0)
+            self._counts[key] = n + 1
+        if n % self.every:
+            return False
+        if n:
+            record.msg = f"{record.msg} (и ещё {self.every - 1} похожих пропущено)"
+        return True
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Запись-словарь -> одна JSON-строка (структурированные логи, напр. access-лог)."""
+
+    def format(self, record):
+        if isinstance(record.msg, dict):
+            return json.dumps(record.msg, ensure_ascii=False, separators=(",", ":"), default=str)
+        return super().format(record)
+
+
+def sampled(key: str) -> dict:
+    """extra для logger.info(...): сообщение попадёт в лог с прореживанием."""
+    return {"sample_key": key}
+
+
+class CompressedRotatingFileHandler(RotatingFileHandler):
+    """
+    Ротация по размеру (max_bytes) и по времени (when: 'midnight' | 'hourly' | '');
+    старые файлы сжимаются в server.log.1.gz, server.log.2.gz, ...
+    Работает в потоке QueueListener, поэтому сжатие не задерживает запросы.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, when="", encoding="utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.when = when
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._gzip_rotator
+        self._next_rollover = self._compute_next_rollover()
+
+    def _compute_next_rollover(self):
+        now = datetime.now()
+        if self.when == "midnight":
+            return (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        if self.when == "hourly":
+            return (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0).timestamp()
+        return None
+
+    @staticmethod
+    def _gzip_rotator(source, dest):
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if self._next_rollover is not None and time.time() >= self._next_rollover:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._next_rollover = self._compute_next_rollover()
+
+
+class _ForwardHandler(SocketHandler):
+    """Отправка записи родителю: 4 байта длины + JSON. Работает в потоке QueueListener воркера."""
+
+    def makePickle(self, record):
+        data = {field: getattr(record, field, None) for field in _FORWARD_FIELDS}
+        if isinstance(record.msg, dict):
+            data["msg"] = JsonLineFormatter().format(record)
+        else:
+            data["msg"] = record.getMessage()
+        if record.exc_info and not data["exc_text"]:
+            data["exc_text"] = logging.Formatter().formatException(record.exc_info)
+        payload = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        return struct.pack(">L", len(payload)) + payload
+
+
+class _ForwardedRecords(socketserver.StreamRequestHandler):
+    """Одно соединение — один воркер; записи кладутся прямо в очереди файловых хендлеров."""
+
+    def handle(self):
+        while True:
+            header = self.rfile.read(4)
+            if len(header) < 4:
+                return
+            payload = self.rfile.read(struct.unpack(">L", header)[0])
+            try:
+                record = logging.makeLogRecord(json.loads(payload))
+            except ValueError:
+                return
+            target = _queues.get("access" if record.name == "access" else "server")
+            if target is not None:
+                # Фильтры уровня и прореживания уже отработали в воркере
+                target.put(record)
+
+
+class _LogReceiver(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_log_receiver() -> str:
+    """
+    В родителе перед запуском воркеров: принимать их записи и писать в свои файлы.
+    Адрес попадает в окружение, воркеры (дочерние процессы) его унаследуют.
+    """
+    global _receiver
+    if _receiver is None:
+        _receiver = _LogReceiver(("127.0.0.1", 0), _ForwardedRecords)
+        threading.Thread(target=_receiver.serve_forever, name="log-receiver", daemon=True).start()
+    host, port = _receiver.server_address[:2]
+    os.environ[LOG_FORWARD_ENV] = f"{host}:{port}"
+    return os.environ[LOG_FORWARD_ENV]
+
+
+def _forward_target():
+    raw = os.getenv(LOG_FORWARD_ENV, "")
+    host, _, port = raw.rpartition(":")
+    if not host or not port.isdigit():
+        return None
+    return host, int(port)
+
+
+def _parse_module_levels(raw: str) -> dict:
+    """'students=WARNING,schedule=DEBUG' -> {'students': 30, 'schedule': 10}"""
+    levels = {}
+    for item in (raw or "").split(","):
+        module, sep, level = item.strip().partition("=")
+        if sep and module and isinstance(logging.getLevelName(level.strip().upper()), int):
+            levels[module] = logging.getLevelName(level.strip().upper())
+    return levels
+
 
 def setup_logging():
-    """Настройка логирования с поддержкой UTF-8"""
+    """
+    Настройка логирования с поддержкой UTF-8.
+    Потоки запросов только кладут запись в очередь; форматирование, запись в файл
+    и консоль, ротация и сжатие — в фоновом потоке QueueListener.
+    В воркере (задан DECANAT_LOG_FORWARD) вместо файлов и консоли — пересылка
+    записей родителю, который пишет их в свои файлы.
+    """
     # Удаляем старые хендлеры (если логгер настраивается повторно)
+    stop_logging()
     root_logger = logging.getLogger()
-    if root_logger.handlers:
-        for handler in root_logger.handlers[:]:
-            root_logger.removeHandler(handler)
-
-    # Хендлер для консоли
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-
-    # Хендлер для файла с явной кодировкой UTF-8
-    file_handler = logging.FileHandler('server.log', encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-
-    # Базовая настройка
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[console_handler, file_handler]
-    )
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    level = logging.getLevelName(SERVER_CONFIG["log_level"].upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    forward_to = _forward_target()
+    if forward_to is not None:
+        handlers = [_ForwardHandler(*forward_to)]
+    else:
+        # Хендлер для консоли
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+
+        # Хендлер для файла с явной кодировкой UTF-8, ротацией и сжатием
+        file_handler = CompressedRotatingFileHandler(
+            SERVER_CONFIG["log_file"],
+            max_bytes=SERVER_CONFIG["log_max_bytes"],
+            backup_count=SERVER_CONFIG["log_backup_count"],
+            when=SERVER_CONFIG["log_rotate_when"],
+        )
+        file_handler.setFormatter(formatter)
+        handlers = [console_handler, file_handler]
+
+    log_queue = queue.SimpleQueue()
+    _queues["server"] = log_queue
+    queue_handler = _InProcessQueueHandler(log_queue)
+    module_levels = _parse_module_levels(SERVER_CONFIG["log_module_levels"])
+    queue_handler.addFilter(ModuleLevelFilter(level, module_levels))
+    queue_handler.addFilter(SamplingFilter(SERVER_CONFIG["log_sample_every"]))
+
+    root_logger.addHandler(queue_handler)
+    # Уровень root — самый подробный из заданных, точный отбор делает ModuleLevelFilter
+    root_logger.setLevel(min([level, *module_levels.values()]))
+
+    _listeners.append(QueueListener(log_queue, *handlers, respect_handler_level=True))
+    _setup_access_log(forward_to)
+    for listener in _listeners:
+        listener.start()
+
+
+def _setup_access_log(forward_to=None):
+    """Access-лог (JSON-строки) — отдельный файл и своя очередь; не попадает в общий лог."""
+    access_logger = logging.getLogger("access")
+    for handler in access_logger.handlers[:]:
+        access_logger.removeHandler(handler)
+    access_logger.propagate = False
+    if not SERVER_CONFIG["access_log_file"]:
+        access_logger.setLevel(logging.WARNING)  # отключён: isEnabledFor(INFO) == False
+        return
+
+    if forward_to is not None:
+        access_handler = _ForwardHandler(*forward_to)
+    else:
+        access_handler = CompressedRotatingFileHandler(
+            SERVER_CONFIG["access_log_file"],
+            max_bytes=SERVER_CONFIG["log_max_bytes"],
+            backup_count=SERVER_CONFIG["log_backup_count"],
+            when=SERVER_CONFIG["log_rotate_when"],
+        )
+        access_handler.setFormatter(JsonLineFormatter())
+    access_queue = queue.SimpleQueue()
+    _queues["access"] = access_queue
+    access_logger.addHandler(_InProcessQueueHandler(access_queue))
+    access_logger.setLevel(logging.INFO)
+    _listeners.append(QueueListener(access_queue, access_handler))
+
+
+def stop_logging():
+    """Дописать очереди и остановить фоновые потоки (при завершении процесса)."""
+    global _receiver
+    if _receiver is not None:
+        _receiver.shutdown()
+        _receiver.server_close()
+        _receiver = None
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(stop_logging)
 
 # Экспорт логгера
 logger = logging.getLogger(__name__)
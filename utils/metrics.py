@@ -0,0 +1,237 @@
+# utils/metrics.py
+"""
+Метрики в текстовом формате Prometheus (GET /metrics).
+
+Запись без общих блокировок: у каждого потока свой набор счётчиков
+(threading.local), поток пишет только в свой. Блокировка берётся один раз
+при первом обращении потока и при сборке (раз в scrape): значения всех
+потоков складываются, счётчики завершившихся потоков переносятся
+в общий «архив», чтобы значения не убывали.
+
+Гауги (размер WAL, очередь пушей, онлайн) не хранятся, а считаются
+функцией в момент сборки.
+"""
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+from utils.logger import logger
+
+# Границы (секунды) для задержек HTTP и запросов к SQLite
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+class _Shard:
+    __slots__ = ("thread", "counters", "histograms")
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters: Dict[tuple, float] = {}
+        self.histograms: Dict[tuple, list] = {}  # ключ -> [по корзинам..., +Inf, sum]
+
+
+class _Registry:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+        self.metrics: List["_Metric"] = []
+
+    def shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    @staticmethod
+    def _merge_into(target: _Shard, counters: dict, histograms: dict):
+        for key, value in counters.items():
+            target.counters[key] = target.counters.get(key, 0) + value
+        for key, values in histograms.items():
+            acc = target.histograms.get(key)
+            if acc is None:
+                target.histograms[key] = list(values)
+            else:
+                for i, v in enumerate(values):
+                    acc[i] += v
+
+    def collect(self) -> Tuple[dict, dict]:
+        """Сумма по всем потокам: (counters, histograms)."""
+        with self._lock:
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    self._merge_into(self._retired, shard.counters, shard.histograms)
+            self._shards = alive
+            total = _Shard(None)
+            self._merge_into(total, self._retired.counters, self._retired.histograms)
+            for shard in alive:
+                # dict.copy() атомарен под GIL; поток-владелец мог дописать значение
+                # в середине — это сдвиг на одно наблюдение, не порча данных
+                self._merge_into(total, shard.counters.copy(),
+                                 {k: list(v) for k, v in shard.histograms.copy().items()})
+        return total.counters, total.histograms
+
+
+REGISTRY = _Registry()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.metrics.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        counters = REGISTRY.shard().counters
+        key = (self.name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def render(self, counters: dict, histograms: dict) -> List[str]:
+        lines = self.header()
+        for (name, labels), value in sorted(counters.items()):
+            if name == self.name:
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        histograms = REGISTRY.shard().histograms
+        key = (self.name, labels)
+        counts = histograms.get(key)
+        if counts is None:
+            counts = histograms[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def render(self, counters: dict, histograms: dict) -> List[str]:
+        lines = self.header()
+        for (name, labels), counts in sorted(histograms.items()):
+            if name != self.name:
+                continue
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Значение считается при сборке: fn() -> число или {кортеж значений меток: число}.
+    kind='counter' — для накопленных где-то ещё счётчиков (например, отправлено пушей).
+    """
+
+    def __init__(self, name: str, documentation: str, fn: Callable, labelnames: tuple = (), kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self, counters: dict, histograms: dict) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception as e:
+            # ошибка одного гауга не должна ломать весь /metrics
+            logger.error(f"Метрика {self.name} недоступна: {e}")
+            return []
+        if value is None:
+            return []
+        lines = self.header()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, v in sorted(items):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}")
+        return lines
+
+
+def render_metrics() -> str:
+    counters, histograms = REGISTRY.collect()
+    lines: List[str] = []
+    for metric in REGISTRY.metrics:
+        lines.extend(metric.render(counters, histograms))
+    return "\n".join(lines) + "\n"
+
+
+# --- Метрики, которые пишутся из горячих путей ---
+
+http_requests = Counter(
+    "http_requests_total", "HTTP-запросы по маршруту и статусу", ("method", "route", "status"))
+http_latency = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route"))
+http_db_time = Histogram(
+    "http_request_db_seconds", "Суммарное время SQLite за HTTP-запрос", ("route",))
+db_connect_time = Histogram(
+    "db_connect_seconds", "Открытие соединения SQLite (connect + PRAGMA)", buckets=DB_BUCKETS)
+db_query_time = Histogram(
+    "db_query_seconds", "Время execute/executemany в SQLite", buckets=DB_BUCKETS)
+cache_lookups = Counter(
+    "cache_lookups_total", "Обращения к кэшам в памяти: hit — без чтения файла/БД", ("cache", "result"))
+
+
+def cache_hit(cache: str):
+    cache_lookups.inc(cache, "hit")
+
+
+def cache_miss(cache: str):
+    cache_lookups.inc(cache, "miss")
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, db_seconds: float):
+    http_requests.inc(method, route, str(status))
+    http_latency.observe(seconds, method, route)
+    http_db_time.observe(db_seconds, route)
+
+
+def gauge(name: str, documentation: str, labelnames: tuple = (), kind: str = "gauge"):
+    """Декоратор: @gauge("sqlite_wal_bytes", "...") над функцией, возвращающей значение."""
+    def register(fn: Callable) -> Callable:
+        Gauge(name, documentation, fn, labelnames, kind)
+        return fn
+    return register
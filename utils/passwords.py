@@ -0,0 +1,185 @@
+# utils/passwords.py
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List
+
+from fastapi import HTTPException
+
+from utils.access_log import add_bcrypt_time
+
+# Отдельный ограниченный пул процессов под bcrypt для входа/регистрации
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", max(1, (os.cpu_count() or 2) // 2)))
+# Сколько операций может одновременно ждать/выполняться в пуле; сверх этого — 503
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", PASSWORD_POOL_SIZE * 4))
+PASSWORD_RETRY_AFTER = int(os.getenv("PASSWORD_RETRY_AFTER", 2))
+
+
+def hash_password(password: str) -> str:
+    """Хэширование пароля"""
+    # bcrypt нужен только воркерам пула (и массовой регистрации) — не грузим его при старте сервера
+    import bcrypt
+    salt = bcrypt.gensalt()
+    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    return hashed.decode('utf-8')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля"""
+    import bcrypt
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+class PasswordPoolBusy(HTTPException):
+    """Очередь пула паролей заполнена — отвечаем 503 с Retry-After."""
+
+    def __init__(self, retry_after: int = PASSWORD_RETRY_AFTER):
+        super().__init__(
+            status_code=503,
+            detail="Сервер перегружен, повторите попытку позже",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def _timed_call(fn, args):
+    """Выполняется в дочернем процессе: результат + момент старта и длительность."""
+    started = time.time()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter() - t0
+
+
+class PasswordPool:
+    """
+    Ограниченный пул процессов для bcrypt с контролем допуска:
+    не больше queue_limit операций одновременно, остальные сразу получают 503.
+    Поток запроса ждёт результат, но CPU-работа идёт вне GIL основного процесса.
+    """
+
+    def __init__(self, size: int, queue_limit: int):
+        self.size = size
+        self.queue_limit = queue_limit
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_total = 0.0
+        self._hash_max = 0.0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.size)
+        return self._executor
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.queue_limit:
+                self._rejected += 1
+                raise PasswordPoolBusy()
+            self._in_flight += 1
+            executor = self._get_executor()
+
+        submitted = time.time()
+        t0 = time.perf_counter()
+        try:
+            result, started, duration = executor.submit(_timed_call, fn, args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            # в access-лог — полное время ожидания запроса, включая очередь пула
+            add_bcrypt_time(time.perf_counter() - t0)
+
+        self._record(submitted, started, duration)
+        return result
+
+    def map(self, fn, args_list: List[tuple]) -> list:
+        """
+        Пачка операций (массовая регистрация) через тот же пул и тот же учёт допуска.
+        В пуле одновременно не больше size операций пачки, поэтому вход и регистрация,
+        пришедшие во время пачки, ждут не дольше одной «волны». Порядок результата —
+        как у args_list. Если очередь уже заполнена — PasswordPoolBusy.
+        """
+        results = [None] * len(args_list)
+        with self._lock:
+            if args_list and self._in_flight >= self.queue_limit:
+                self._rejected += 1
+                raise PasswordPoolBusy()
+            executor = self._get_executor()
+
+        t0 = time.perf_counter()
+        pending = {}
+        position = 0
+        try:
+            while position < len(args_list) or pending:
+                while position < len(args_list) and len(pending) < self.size:
+                    with self._lock:
+                        self._in_flight += 1
+                    future = executor.submit(_timed_call, fn, args_list[position])
+                    pending[future] = (position, time.time())
+                    position += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, submitted = pending.pop(future)
+                    with self._lock:
+                        self._in_flight -= 1
+                    results[index], started, duration = future.result()
+                    self._record(submitted, started, duration)
+        finally:
+            for future in pending:
+                future.cancel()
+            with self._lock:
+                self._in_flight -= len(pending)
+            add_bcrypt_time(time.perf_counter() - t0)
+        return results
+
+    def _record(self, submitted: float, started: float, duration: float):
+        wait_seconds = max(0.0, started - submitted)
+        with self._lock:
+            self._completed += 1
+            self._hash_total += duration
+            self._hash_max = max(self._hash_max, duration)
+            self._wait_total += wait_seconds
+            self._wait_max = max(self._wait_max, wait_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._completed or 1
+            return {
+                "pool_size": self.size,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "hash_ms_avg": round(self._hash_total / done * 1000, 2),
+                "hash_ms_max": round(self._hash_max * 1000, 2),
+                "queue_wait_ms_avg": round(self._wait_total / done * 1000, 2),
+                "queue_wait_ms_max": round(self._wait_max * 1000, 2),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordPool(PASSWORD_POOL_SIZE, PASSWORD_QUEUE_LIMIT)
+
+
+def hash_password_pooled(password: str) -> str:
+    """Хэширование пароля в пуле процессов (может выбросить PasswordPoolBusy)"""
+    return password_pool.run(hash_password, password)
+
+
+def hash_passwords_parallel(passwords: List[str]) -> List[str]:
+    """Хэширование пачки паролей (массовая регистрация) в общем пуле; порядок — как на входе."""
+    return password_pool.map(hash_password, [(p,) for p in passwords])
+
+
+def verify_password_pooled(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля в пуле процессов (может выбросить PasswordPoolBusy)"""
+    return password_pool.run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,227 @@
+# utils/profiling.py
+"""
+Профилирование работающего процесса (эндпоинты /api/debug/*, только developer).
+
+- sample_stacks: сэмплирующий профилировщик по всем потокам через
+  sys._current_frames(). Результат — collapsed stacks
+  ("поток;кадр;кадр;... N"), формат flamegraph.pl / speedscope / inferno.
+- RouteProfiler: cProfile для следующих N вызовов одного маршрута.
+  Подменяет route.dependant.call обёрткой и возвращает оригинал,
+  когда запросы собраны или захват отменён.
+- tracemalloc: снимок крупнейших мест выделения памяти относительно
+  момента запуска.
+
+Одновременно идёт не больше одного сэмплирования и одного захвата маршрута.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Optional
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+PROFILE_MAX_DEPTH = 128
+
+# Листовые кадры простаивающих потоков (ожидание задачи/события) — по умолчанию пропускаем
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("handlers.py", "dequeue"),       # QueueListener логгера
+    ("selectors.py", "select"),
+    ("connection.py", "wait"),
+    ("connection.py", "_poll"),
+}
+
+_sampling_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> dict:
+    """Сэмплирование стеков всех потоков; возвращает collapsed-текст и счётчики."""
+    if not _sampling_lock.acquire(blocking=False):
+        raise ProfilerBusy("Профилирование уже идёт")
+    try:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if not include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                # collapsed: от корня к листу, без ';' и пробелов внутри имени кадра
+                stacks[";".join(l.replace(";", ":").replace(" ", "_") for l in reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+    finally:
+        _sampling_lock.release()
+
+    collapsed = "\n".join(f"{stack} {n}" for stack, n in stacks.most_common())
+    return {"samples": samples, "stacks": len(stacks), "collapsed": collapsed + "\n" if collapsed else ""}
+
+
+class RouteProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._route = None
+        self._original = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._remaining = 0
+        self._capturing = False  # профиль включён в каком-то потоке прямо сейчас
+        self.captured = 0
+        self.target: Optional[str] = None
+
+    def arm(self, route, requests: int):
+        """Профилировать следующие `requests` вызовов обработчика маршрута."""
+        with self._lock:
+            if self._route is not None:
+                raise ProfilerBusy(f"Уже идёт захват {self.target}")
+            original = route.dependant.call
+            profile = cProfile.Profile()
+
+            # FastAPI один раз решает, sync это обработчик или async, — обёртка должна совпадать
+            if iscoroutinefunction(original):
+                @wraps(original)
+                async def wrapper(*args, **kwargs):
+                    if not self._take():
+                        return await original(*args, **kwargs)
+                    # между await работают и другие корутины этого потока — они тоже попадут в профиль
+                    profile.enable()
+                    try:
+                        return await original(*args, **kwargs)
+                    finally:
+                        profile.disable()
+                        self._done()
+            else:
+                @wraps(original)
+                def wrapper(*args, **kwargs):
+                    if not self._take():
+                        return original(*args, **kwargs)
+                    profile.enable()
+                    try:
+                        return original(*args, **kwargs)
+                    finally:
+                        profile.disable()
+                        self._done()
+
+            self._route, self._original, self._profile = route, original, profile
+            self._remaining = requests
+            self._capturing = False
+            self.captured = 0
+            self.target = f"{','.join(sorted(route.methods))} {route.path}"
+            route.dependant.call = wrapper
+
+    def _take(self) -> bool:
+        # Один объект Profile нельзя включать из двух потоков сразу (а в потоке — только один
+        # профиль): пока идёт захват, параллельные запросы выполняются без профилирования
+        with self._lock:
+            if self._remaining <= 0 or self._capturing or sys.getprofile() is not None:
+                return False
+            self._remaining -= 1
+            self._capturing = True
+            return True
+
+    def _done(self):
+        with self._lock:
+            self._capturing = False
+            self.captured += 1
+            if self._remaining <= 0 and self._route is not None:
+                self._route.dependant.call = self._original
+                self._route = None
+
+    def disarm(self):
+        with self._lock:
+            if self._route is not None:
+                self._route.dependant.call = self._original
+                self._route = None
+            self._remaining = 0
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "target": self.target,
+                "active": self._route is not None,
+                "captured": self.captured,
+                "remaining": self._remaining,
+            }
+
+    def report(self, sort: str = "cumulative", limit: int = 50) -> str:
+        """Текстовый отчёт pstats по собранным вызовам."""
+        with self._lock:
+            profile = self._profile
+        if profile is None or not self.captured:
+            return ""
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+route_profiler = RouteProfiler()
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+def tracemalloc_start(frames: int = 10):
+    """Запуск трассировки выделений (заметно замедляет процесс, пока включена)."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _baseline = tracemalloc.take_snapshot()
+
+
+def tracemalloc_stop():
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+
+
+def tracemalloc_top(limit: int = 25, key: str = "lineno") -> dict:
+    """Крупнейшие места выделения и рост относительно запуска трассировки."""
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "top": []}
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+    current, peak = tracemalloc.get_traced_memory()
+    top = [
+        {"where": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        for stat in snapshot.statistics(key)[:limit]
+    ]
+    growth = []
+    if _baseline is not None:
+        growth = [
+            {"where": str(stat.traceback), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(_baseline.filter_traces(ignore), key)[:limit]
+        ]
+    return {
+        "tracing": True,
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "top": top,
+        "growth": growth,
+    }
@@ -0,0 +1,229 @@
+# utils/provisioning.py
+"""
+Массовая регистрация студентов и преподавателей по списку (CSV или JSON).
+
+Запуск из консоли:
+    python -m utils.provisioning students roster.csv
+    python -m utils.provisioning teachers roster.json
+"""
+import csv
+import io
+import json
+import sqlite3
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from data.group_catalog import bump_version, group_catalog
+from database.connection import get_db_connection
+from models.student_models import StudentRosterItem
+from models.teacher_models import TeacherRosterItem
+from utils.logger import logger
+from utils.passwords import hash_passwords_parallel
+
+ROSTER_MODELS = {
+    "students": StudentRosterItem,
+    "teachers": TeacherRosterItem,
+}
+
+# Ограничение на число параметров в одном IN (...) — с запасом под старые SQLite
+_IN_CHUNK = 500
+
+
+def parse_roster(raw: bytes, filename: str = "") -> List[dict]:
+    """
+    Разбор списка. JSON — массив объектов (или {"items": [...]}),
+    CSV — первая строка с заголовками, разделитель «,» или «;».
+    """
+    text = raw.decode("utf-8-sig")
+    stripped = text.lstrip()
+    if filename.lower().endswith(".json") or stripped.startswith(("[", "{")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("items", [])
+        if not isinstance(data, list):
+            raise ValueError("JSON должен содержать массив записей")
+        return data
+
+    first_line = text.split("\n", 1)[0]
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    return [
+        {(k or "").strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+        for row in reader
+    ]
+
+
+def _select_existing(conn: sqlite3.Connection, table: str, column: str, values: Iterable[str]) -> Set[str]:
+    """Какие из значений уже есть в таблице — пачками через IN (...)"""
+    values = list(values)
+    found: Set[str] = set()
+    for i in range(0, len(values), _IN_CHUNK):
+        chunk = values[i:i + _IN_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        cur = conn.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})", chunk)
+        found.update(row[0] for row in cur.fetchall())
+    return found
+
+
+def _generate_user_ids(conn: sqlite3.Connection, count: int) -> List[str]:
+    """Уникальные 6-значные user_id (как в create_user), проверка занятости — пачкой."""
+    result: List[str] = []
+    taken: Set[str] = set()
+    for _ in range(10):
+        need = count - len(result)
+        if need <= 0:
+            break
+        candidates = {str(uuid.uuid4().int)[:6] for _ in range(need * 2)} - taken
+        taken |= candidates
+        free = candidates - _select_existing(conn, "users", "user_id", candidates)
+        result.extend(list(free)[:need])
+    if len(result) < count:
+        raise RuntimeError("Не удалось сгенерировать уникальные ID пользователей")
+    return result
+
+
+def _validate(kind: str, rows: List[dict]) -> Tuple[list, List[Tuple[int, str]]]:
+    model = ROSTER_MODELS[kind]
+    items, errors = [], []
+    for n, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append((n, f"Строка {n}: ожидался объект с полями"))
+            continue
+        try:
+            items.append((n, model(**row)))
+        except ValidationError as e:
+            fields = ", ".join(str(err["loc"][0]) for err in e.errors() if err.get("loc"))
+            errors.append((n, f"Строка {n}: некорректные поля ({fields})"))
+    return items, errors
+
+
+def _result(success: int, errors: List[Tuple[int, str]], failed: Optional[int] = None) -> Dict:
+    """Ответ под BulkOperationResponse; ошибки — в порядке строк списка."""
+    return {
+        "success_count": success,
+        "failed_count": len(errors) if failed is None else failed,
+        "errors": [msg for _, msg in sorted(errors)] or None,
+    }
+
+
+def provision(kind: str, rows: List[dict]) -> Dict:
+    """
+    Регистрирует всех корректных людей из списка одной транзакцией.
+    Возвращает словарь под BulkOperationResponse.
+    """
+    if kind not in ROSTER_MODELS:
+        raise ValueError(f"Неизвестный тип списка: {kind}")
+
+    items, errors = _validate(kind, rows)
+
+    # Дубликаты внутри самого списка
+    seen_logins: Set[str] = set()
+    unique = []
+    for n, item in items:
+        if item.login in seen_logins:
+            errors.append((n, f"Строка {n}: логин '{item.login}' повторяется в списке"))
+            continue
+        seen_logins.add(item.login)
+        unique.append((n, item))
+    items = unique
+
+    if kind == "students":
+        valid = []
+        for n, item in items:
+            if not group_catalog.is_valid(item.group_name):
+                errors.append((n, f"Строка {n}: группа '{item.group_name}' не существует"))
+            else:
+                valid.append((n, item))
+        items = valid
+
+    with get_db_connection() as conn:
+        table = "students" if kind == "students" else "teachers"
+        busy_logins = _select_existing(conn, table, "login", (i.login for _, i in items))
+        busy_names: Set[str] = set()
+        if kind == "teachers":
+            busy_names = _select_existing(conn, "teachers", "full_name", (i.full_name for _, i in items))
+
+        seen_names: Set[str] = set()
+        valid = []
+        for n, item in items:
+            if item.login in busy_logins:
+                errors.append((n, f"Строка {n}: логин '{item.login}' уже занят"))
+            elif item.full_name in busy_names:
+                errors.append((n, f"Строка {n}: преподаватель '{item.full_name}' уже зарегистрирован"))
+            elif item.full_name in seen_names:
+                errors.append((n, f"Строка {n}: преподаватель '{item.full_name}' повторяется в списке"))
+            else:
+                valid.append(item)
+                if kind == "teachers":
+                    # teachers.full_name UNIQUE: повтор ФИО внутри списка отменил бы всю транзакцию
+                    seen_names.add(item.full_name)
+
+        if not valid:
+            return _result(0, errors)
+
+        hashes = hash_passwords_parallel([i.password for i in valid])
+        user_ids = _generate_user_ids(conn, len(valid))
+        role = "student" if kind == "students" else "teacher"
+
+        try:
+            conn.executemany(
+                "INSERT INTO users (user_id, role, device_info) VALUES (?, ?, 'bulk')",
+                [(uid, role) for uid in user_ids]
+            )
+            conn.executemany(
+                "INSERT INTO user_settings (user_id) VALUES (?)",
+                [(uid,) for uid in user_ids]
+            )
+            if kind == "students":
+                groups = {i.group_name for i in valid}
+                missing = groups - _select_existing(conn, "schedule_groups", "group_name", groups)
+                if missing:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO schedule_groups (group_name) VALUES (?)",
+                        [(g,) for g in missing]
+                    )
+                    bump_version(conn)
+                conn.executemany(
+                    """INSERT INTO students (user_id, full_name, login, password, group_name)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    [(uid, i.full_name, i.login, h, i.group_name) for uid, i, h in zip(user_ids, valid, hashes)]
+                )
+            else:
+                conn.executemany(
+                    """INSERT INTO teachers (user_id, full_name, login, password, department, position)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    [(uid, i.full_name, i.login, h, i.department, i.position)
+                     for uid, i, h in zip(user_ids, valid, hashes)]
+                )
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            logger.error(f"Ошибка целостности при массовой регистрации: {e}")
+            failed = len(errors) + len(valid)
+            errors.append((0, f"Транзакция отменена: {e}"))
+            return _result(0, errors, failed)
+
+    if kind == "students" and missing:
+        group_catalog.load()
+    logger.info(f"Массовая регистрация ({kind}): добавлено {len(valid)}, ошибок {len(errors)}")
+    return _result(len(valid), errors)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database.connection import init_database
+    from utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="Массовая регистрация студентов/преподавателей")
+    parser.add_argument("kind", choices=sorted(ROSTER_MODELS))
+    parser.add_argument("path", help="CSV или JSON файл со списком")
+    args = parser.parse_args()
+
+    setup_logging()
+    init_database()
+    with open(args.path, "rb") as f:
+        roster = parse_roster(f.read(), args.path)
+    print(json.dumps(provision(args.kind, roster), ensure_ascii=False, indent=2))
@@ -0,0 +1,147 @@
+# utils/push_fanout.py
+"""
+Персональные пуши: выбор получателей из device_tokens и рассылка по токенам
+параллельными пачками с ограниченным числом одновременных запросов.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from database.connection import get_db_connection
+from utils.fcm import FCM_POOL_SIZE, FcmError, send_to_token
+from utils.logger import logger
+from utils.push_outbox import PUSH_MAX_ATTEMPTS, backoff_delay, enqueue_push, register_handler
+
+# Сколько запросов к FCM одновременно «в полёте»: по одному keep-alive соединению
+# из пула сессии на запрос, иначе лишние соединения закрываются после каждой отправки
+FANOUT_WINDOW = FCM_POOL_SIZE
+# Токены отправляются пачками, чтобы не держать в памяти future на каждого получателя
+FANOUT_BATCH = 500
+# Срок аренды записи рассылки в очереди (см. push_outbox): с запасом на десятки тысяч токенов
+FANOUT_LEASE_SECONDS = int(os.getenv("FANOUT_LEASE_SECONDS", 1800))
+_PRUNE_CHUNK = 500
+
+_reports = deque(maxlen=20)
+_reports_lock = threading.Lock()
+
+
+def select_recipient_tokens(conn: sqlite3.Connection, group: Optional[str] = None,
+                            role: Optional[str] = None) -> List[str]:
+    """
+    Токены устройств получателей с включёнными уведомлениями.
+    group — студенты группы (idx_students_group), role — users.role (idx_users_role).
+    """
+    sql = """
+        SELECT DISTINCT d.token
+        FROM device_tokens d
+        JOIN users u ON u.user_id = d.user_id
+        LEFT JOIN user_settings us ON us.user_id = d.user_id
+    """
+    where = ["COALESCE(us.notifications_enabled, 1) = 1"]
+    params: list = []
+    if group:
+        sql += " JOIN students s ON s.user_id = d.user_id"
+        where.append("s.group_name = ?")
+        params.append(group)
+    if role:
+        where.append("u.role = ?")
+        params.append(role)
+    sql += " WHERE " + " AND ".join(where)
+    return [row["token"] for row in conn.execute(sql, params).fetchall()]
+
+
+def prune_tokens(tokens: List[str]):
+    """Удаляем токены, которые FCM признал недействительными."""
+    if not tokens:
+        return
+    with get_db_connection() as conn:
+        for i in range(0, len(tokens), _PRUNE_CHUNK):
+            chunk = tokens[i:i + _PRUNE_CHUNK]
+            conn.execute(f"DELETE FROM device_tokens WHERE token IN ({','.join('?' * len(chunk))})", chunk)
+        conn.commit()
+    logger.info(f"Удалено недействительных токенов устройств: {len(tokens)}")
+
+
+def fan_out(tokens: List[str], title: str, body: str, data: Optional[dict] = None) -> Dict:
+    """
+    Рассылка по токенам. Не больше FANOUT_WINDOW запросов одновременно.
+    Возвращает отчёт: отправлено, удалено токенов, временные ошибки, скорость.
+    """
+    sent: List[str] = []
+    invalid: List[str] = []
+    failed: List[str] = []
+
+    def send_one(token: str):
+        try:
+            send_to_token(token, title, body, data)
+            return token, None
+        except Exception as e:
+            return token, e
+
+    started = time.perf_counter()
+    if tokens:
+        with ThreadPoolExecutor(max_workers=min(FANOUT_WINDOW, len(tokens)), thread_name_prefix="fanout") as pool:
+            for i in range(0, len(tokens), FANOUT_BATCH):
+                for token, error in pool.map(send_one, tokens[i:i + FANOUT_BATCH]):
+                    if error is None:
+                        sent.append(token)
+                    elif isinstance(error, FcmError) and error.unregistered:
+                        invalid.append(token)
+                    else:
+                        failed.append(token)
+    elapsed = time.perf_counter() - started
+
+    prune_tokens(invalid)
+    return {
+        "recipients": len(tokens),
+        "sent": len(sent),
+        "pruned": len(invalid),
+        "failed": len(failed),
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(tokens) / elapsed, 1) if elapsed > 0 else None,
+        "failed_tokens": failed,
+    }
+
+
+def fanout_reports() -> List[Dict]:
+    """Последние отчёты о рассылках."""
+    with _reports_lock:
+        return list(_reports)
+
+
+def _send_fanout(payload: dict):
+    """
+    Обработчик очереди для kind='fanout'. Получатели выбираются в момент отправки,
+    временные ошибки по отдельным токенам уходят новой записью только на эти токены.
+    """
+    tokens = payload.get("tokens")
+    if tokens is None:
+        with get_db_connection() as conn:
+            tokens = select_recipient_tokens(conn, payload.get("group"), payload.get("role"))
+
+    report = fan_out(tokens, payload["title"], payload.get("body", ""), payload.get("data"))
+    with _reports_lock:
+        _reports.append({k: v for k, v in report.items() if k != "failed_tokens"}
+                        | {"group": payload.get("group"), "role": payload.get("role")})
+    logger.info(
+        f"Рассылка: {report['sent']}/{report['recipients']} за {report['seconds']} с "
+        f"({report['per_second']}/с), удалено токенов {report['pruned']}, ошибок {report['failed']}"
+    )
+
+    retry = payload.get("retry", 0) + 1
+    if report["failed_tokens"] and retry < PUSH_MAX_ATTEMPTS:
+        with get_db_connection() as conn:
+            enqueue_push(conn, "fanout", {**payload, "tokens": report["failed_tokens"], "retry": retry},
+                         delay=backoff_delay(retry))
+            conn.commit()
+    elif report["failed_tokens"]:
+        logger.error(f"Рассылка: {len(report['failed_tokens'])} токенов так и не получили пуш")
+
+
+# Отдельная полоса: длинная рассылка не задерживает пуши новостей и расписания.
+# Аренда — на всю рассылку: FANOUT_WINDOW отправок одновременно, до 10 с каждая
+register_handler("fanout", _send_fanout, lane="bulk", lease_seconds=FANOUT_LEASE_SECONDS)
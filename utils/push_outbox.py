@@ -0,0 +1,272 @@
+# utils/push_outbox.py
+"""
+Transactional outbox для пушей.
+
+Запись в push_outbox делается в той же транзакции, что и изменение данных
+(например, вставка новости). Фоновый поток PushDispatcher забирает созревшие
+записи (status 'pending' -> 'sending'), отправляет их и при ошибке откладывает
+с экспоненциальной задержкой; после PUSH_MAX_ATTEMPTS попыток запись помечается как 'dead'.
+
+Виды пушей разложены по полосам (lane): у каждой полосы свой поток, поэтому
+долгая персональная рассылка (lane='bulk') не задерживает пуши новостей
+и расписания в полосе по умолчанию.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database.connection import get_db_connection
+from utils.logger import logger
+
+PUSH_MAX_ATTEMPTS = int(os.getenv("PUSH_MAX_ATTEMPTS", 8))
+PUSH_BACKOFF_BASE = float(os.getenv("PUSH_BACKOFF_BASE", 5))      # сек, первая задержка
+PUSH_BACKOFF_MAX = float(os.getenv("PUSH_BACKOFF_MAX", 3600))     # сек, потолок задержки
+PUSH_POLL_INTERVAL = float(os.getenv("PUSH_POLL_INTERVAL", 5))    # сек, опрос без уведомлений
+# На сколько «арендуем» запись на время отправки; если процесс упал — запись снова созреет.
+# Записи берутся по одной, так что аренда покрывает одну отправку (таймаут FCM — 10 с)
+PUSH_LEASE_SECONDS = int(os.getenv("PUSH_LEASE_SECONDS", 120))
+_BATCH = 20
+
+DEFAULT_LANE = "default"
+
+# kind -> функция отправки (payload: dict) -> None, исключение = неуспех
+_handlers: Dict[str, Callable[[dict], None]] = {}
+# kind -> полоса; виды без записи (и без обработчика) разбирает полоса по умолчанию
+_lanes: Dict[str, str] = {}
+# kind -> срок аренды, если отправка дольше обычной (рассылка по тысячам токенов)
+_leases: Dict[str, float] = {}
+
+
+def register_handler(kind: str, handler: Callable[[dict], None], lane: str = DEFAULT_LANE,
+                     lease_seconds: float = PUSH_LEASE_SECONDS):
+    _handlers[kind] = handler
+    _lanes[kind] = lane
+    _leases[kind] = lease_seconds
+
+
+def _lane_filter(lane: str) -> Tuple[str, list]:
+    """Условие на kind для выборки полосы: (SQL, параметры)."""
+    if lane == DEFAULT_LANE:
+        other = [kind for kind, kind_lane in _lanes.items() if kind_lane != DEFAULT_LANE]
+        if not other:
+            return "", []
+        return f" AND kind NOT IN ({','.join('?' * len(other))})", other
+    own = [kind for kind, kind_lane in _lanes.items() if kind_lane == lane]
+    return f" AND kind IN ({','.join('?' * len(own))})", own
+
+
+def enqueue_push(conn: sqlite3.Connection, kind: str, payload: dict, delay: float = 0,
+                 dedupe_key: Optional[str] = None,
+                 merge: Optional[Callable[[dict, dict], dict]] = None):
+    """
+    Поставить пуш в очередь. Коммит — на стороне вызывающего (та же транзакция).
+    dedupe_key — debounce: если запись с таким ключом ещё ждёт отправки, она обновляется
+    (payload = merge(старый, новый) или новый) и откладывается ещё на delay секунд.
+    """
+    if dedupe_key is not None:
+        row = conn.execute(
+            "SELECT id, payload FROM push_outbox WHERE dedupe_key = ? AND status = 'pending' ORDER BY id LIMIT 1",
+            (dedupe_key,)
+        ).fetchone()
+        if row:
+            if merge is not None:
+                payload = merge(json.loads(row["payload"]), payload)
+            conn.execute(
+                "UPDATE push_outbox SET payload = ?, next_attempt_at = ? WHERE id = ?",
+                (json.dumps(payload, ensure_ascii=False), time.time() + delay, row["id"])
+            )
+            return
+
+    conn.execute(
+        "INSERT INTO push_outbox (kind, payload, next_attempt_at, dedupe_key) VALUES (?, ?, ?, ?)",
+        (kind, json.dumps(payload, ensure_ascii=False), time.time() + delay, dedupe_key)
+    )
+
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(PUSH_BACKOFF_MAX, PUSH_BACKOFF_BASE * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class PushDispatcher:
+    """Фоновый поток, разбирающий push_outbox."""
+
+    def __init__(self):
+        self._wake: Dict[str, threading.Event] = {}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+
+    def notify(self):
+        """Разбудить потоки сразу после коммита новой записи."""
+        for wake in list(self._wake.values()):
+            wake.set()
+
+    def start(self):
+        if self.is_alive():
+            return
+        self._stop.clear()
+        lanes = sorted({DEFAULT_LANE, *_lanes.values()})
+        self._wake = {lane: threading.Event() for lane in lanes}
+        self._threads = []
+        for lane in lanes:
+            name = "push-dispatcher" if lane == DEFAULT_LANE else f"push-dispatcher-{lane}"
+            thread = threading.Thread(target=self._run, args=(lane,), name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self.notify()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def is_alive(self) -> bool:
+        return bool(self._threads) and all(thread.is_alive() for thread in self._threads)
+
+    def _run(self, lane: str):
+        wake = self._wake[lane]
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once(lane)
+            except Exception as e:
+                logger.error(f"Ошибка разбора очереди пушей ({lane}): {e}")
+                processed = 0
+            if processed < _BATCH:
+                wake.wait(self._seconds_until_due(lane))
+                wake.clear()
+
+    def _seconds_until_due(self, lane: str = DEFAULT_LANE) -> float:
+        """Сколько спать до ближайшей созревающей записи (не дольше интервала опроса)."""
+        kind_sql, kind_params = _lane_filter(lane)
+        try:
+            with get_db_connection() as conn:
+                row = conn.execute(
+                    "SELECT MIN(next_attempt_at) AS due FROM push_outbox WHERE status IN ('pending', 'sending')"
+                    + kind_sql,
+                    kind_params
+                ).fetchone()
+        except Exception:
+            return PUSH_POLL_INTERVAL
+        if row["due"] is None:
+            return PUSH_POLL_INTERVAL
+        return min(PUSH_POLL_INTERVAL, max(0.05, row["due"] - time.time()))
+
+    def _claim_one(self, conn: sqlite3.Connection, now: float, lane: str = DEFAULT_LANE):
+        """
+        Забираем одну созревшую запись полосы: (row, срок аренды) или None.
+        Условный UPDATE не даст двум воркерам взять одну запись; по одной —
+        чтобы аренда отсчитывалась от начала именно этой отправки.
+        """
+        kind_sql, kind_params = _lane_filter(lane)
+        while True:
+            # 'sending' с истёкшей арендой — процесс упал посреди отправки, забираем заново
+            row = conn.execute(
+                f"""SELECT id, kind, payload, attempts, next_attempt_at FROM push_outbox
+                   WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?{kind_sql}
+                   ORDER BY next_attempt_at LIMIT 1""",
+                (now, *kind_params)
+            ).fetchone()
+            if row is None:
+                return None
+            lease_until = now + _leases.get(row["kind"], PUSH_LEASE_SECONDS)
+            cur = conn.execute(
+                """UPDATE push_outbox SET status = 'sending', next_attempt_at = ?
+                   WHERE id = ? AND status IN ('pending', 'sending') AND next_attempt_at = ?""",
+                (lease_until, row["id"], row["next_attempt_at"])
+            )
+            conn.commit()
+            if cur.rowcount == 1:
+                return row, lease_until
+            # запись перехватил другой воркер — берём следующую
+
+    def drain_once(self, lane: str = DEFAULT_LANE) -> int:
+        """Один проход (до _BATCH записей) по созревшим записям полосы. Возвращает число обработанных."""
+        processed = 0
+        while processed < _BATCH and not self._stop.is_set():
+            with get_db_connection() as conn:
+                claimed = self._claim_one(conn, time.time(), lane)
+            if claimed is None:
+                break
+            row, lease_until = claimed
+            processed += 1
+            attempts = row["attempts"] + 1
+            try:
+                handler = _handlers[row["kind"]]
+                handler(json.loads(row["payload"]))
+            except Exception as e:
+                self._on_failure(row["id"], lease_until, attempts, e)
+            else:
+                self.sent += 1
+                with get_db_connection() as conn:
+                    cur = conn.execute(
+                        """UPDATE push_outbox SET status = 'sent', attempts = ?, last_error = NULL,
+                               sent_at = CURRENT_TIMESTAMP
+                           WHERE id = ? AND status = 'sending' AND next_attempt_at = ?""",
+                        (attempts, row["id"], lease_until)
+                    )
+                    conn.commit()
+                if cur.rowcount != 1:
+                    self._lease_lost(row["id"])
+        return processed
+
+    @staticmethod
+    def _lease_lost(outbox_id: int):
+        # Отправка длилась дольше аренды и запись забрал другой воркер: не затираем его статус
+        logger.warning(f"Пуш #{outbox_id}: аренда истекла во время отправки, статус не обновлён")
+
+    def _on_failure(self, outbox_id: int, lease_until: float, attempts: int, error: Exception):
+        self.failed += 1
+        with get_db_connection() as conn:
+            if attempts >= PUSH_MAX_ATTEMPTS:
+                cur = conn.execute(
+                    """UPDATE push_outbox SET status = 'dead', attempts = ?, last_error = ?
+                       WHERE id = ? AND status = 'sending' AND next_attempt_at = ?""",
+                    (attempts, str(error)[:500], outbox_id, lease_until)
+                )
+                if cur.rowcount == 1:
+                    self.dead += 1
+                    logger.error(f"Пуш #{outbox_id} отправить не удалось ({attempts} попыток): {error}")
+            else:
+                delay = backoff_delay(attempts)
+                cur = conn.execute(
+                    """UPDATE push_outbox SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ?
+                       WHERE id = ? AND status = 'sending' AND next_attempt_at = ?""",
+                    (attempts, str(error)[:500], time.time() + delay, outbox_id, lease_until)
+                )
+                if cur.rowcount == 1:
+                    logger.warning(f"Пуш #{outbox_id} не отправлен (попытка {attempts}), повтор через {delay:.0f} с: {error}")
+            conn.commit()
+        if cur.rowcount != 1:
+            self._lease_lost(outbox_id)
+
+    def stats(self) -> dict:
+        with get_db_connection() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM push_outbox GROUP BY status").fetchall()
+        return {
+            "alive": self.is_alive(),
+            "sent": self.sent,
+            "failed_attempts": self.failed,
+            "dead": self.dead,
+            "queue": {row["status"]: row["n"] for row in rows},
+        }
+
+
+push_dispatcher = PushDispatcher()
+
+
+def _send_topic(payload: dict):
+    from utils.fcm import send_news_to_topic
+    # В payload могут быть служебные поля (например, список изменённых дней) — их не передаём
+    send_news_to_topic(payload["title"], payload.get("body", ""), payload.get("data"), payload.get("topic", "news"))
+
+
+register_handler("topic", _send_topic)
@@ -0,0 +1,212 @@
+# utils/ratelimit.py
+"""
+Token bucket для входа и регистрации.
+
+Для каждого маршрута два набора корзин: по IP клиента и по логину.
+Лимиты задаются строкой "ёмкость/период_сек" в SERVER_CONFIG["rate_limits"]
+и переопределяются переменной окружения RATE_LIMITS
+(SERVER_CONFIG["rate_limits_override"]), например:
+    RATE_LIMITS="students_login.login=5/60,students_login.ip=60/60"
+
+С одним воркером корзины в памяти (TokenBucketLimiter). С несколькими
+(SERVER_CONFIG["rate_limits_shared"]) — в таблице rate_limit_buckets
+(SharedTokenBucketLimiter): иначе каждый воркер пропускал бы полный лимит
+и подбор пароля получал бы в N раз больше попыток.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request
+
+from config import SERVER_CONFIG
+from database.connection import get_db_connection
+
+# Как часто (сек) вычищаем корзины, которые успели наполниться до краёв
+SWEEP_INTERVAL = 60
+
+
+def _parse_limit(spec: str) -> Tuple[float, float]:
+    capacity, _, period = spec.partition("/")
+    return float(capacity), float(period or 60)
+
+
+class TokenBucketLimiter:
+    """
+    Корзины хранятся как key -> [tokens, last_ts]; полная корзина эквивалентна
+    отсутствию записи, поэтому при очистке такие ключи просто удаляются.
+    """
+
+    __slots__ = ("capacity", "rate", "_buckets", "_lock", "_next_sweep", "allowed", "limited")
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period  # токенов в секунду
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+        self.allowed = 0
+        self.limited = 0
+
+    def hit(self, key: str) -> float:
+        """Списывает токен. Возвращает 0, если можно, иначе — через сколько секунд повторить."""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.capacity
+            else:
+                tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            if tokens < 1:
+                self.limited += 1
+                self._buckets[key] = [tokens, now]
+                return (1 - tokens) / self.rate
+            self.allowed += 1
+            self._buckets[key] = [tokens - 1, now]
+            return 0.0
+
+    def _sweep(self, now: float):
+        stale = [k for k, (tokens, ts) in self._buckets.items()
+                 if tokens + (now - ts) * self.rate >= self.capacity]
+        for k in stale:
+            del self._buckets[k]
+        self._next_sweep = now + SWEEP_INTERVAL
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "per_second": round(self.rate, 4),
+                "buckets": len(self._buckets),
+                "allowed": self.allowed,
+                "limited": self.limited,
+            }
+
+
+# Токены корзины на момент :now (с пополнением с updated_at, не больше ёмкости)
+_REFILLED = "MIN(:capacity, tokens + (:now - updated_at) * :rate)"
+
+
+class SharedTokenBucketLimiter:
+    """
+    Та же корзина, но в БД — общая для всех воркеров. Время — unix time
+    (monotonic у каждого процесса своё). Пропуск — одно атомарное UPSERT
+    с условием «есть целый токен», отказ — только чтение, без записи.
+    Счётчики allowed/limited — по этому воркеру.
+    """
+
+    __slots__ = ("name", "capacity", "rate", "_next_sweep", "allowed", "limited")
+
+    def __init__(self, name: str, capacity: float, period: float):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._next_sweep = time.time() + SWEEP_INTERVAL
+        self.allowed = 0
+        self.limited = 0
+
+    def hit(self, key: str) -> float:
+        """Списывает токен. Возвращает 0, если можно, иначе — через сколько секунд повторить."""
+        now = time.time()
+        params = {"name": self.name, "key": key, "capacity": self.capacity, "rate": self.rate, "now": now}
+        with get_db_connection() as conn:
+            if now >= self._next_sweep:
+                self._sweep(conn, params)
+            row = conn.execute(
+                f"SELECT {_REFILLED} AS tokens FROM rate_limit_buckets WHERE name = :name AND key = :key", params
+            ).fetchone()
+            if row is not None and row["tokens"] < 1:
+                self.limited += 1
+                return (1 - row["tokens"]) / self.rate
+            cur = conn.execute(
+                f"""INSERT INTO rate_limit_buckets (name, key, tokens, updated_at)
+                    VALUES (:name, :key, :capacity - 1, :now)
+                    ON CONFLICT(name, key) DO UPDATE SET tokens = {_REFILLED} - 1, updated_at = :now
+                    WHERE {_REFILLED} >= 1""",
+                params
+            )
+            conn.commit()
+        if cur.rowcount == 0:
+            # Последний токен между чтением и записью забрал другой воркер
+            self.limited += 1
+            return 1 / self.rate
+        self.allowed += 1
+        return 0.0
+
+    def _sweep(self, conn, params: dict):
+        conn.execute(
+            f"DELETE FROM rate_limit_buckets WHERE name = :name AND {_REFILLED} >= :capacity", params
+        )
+        self._next_sweep = params["now"] + SWEEP_INTERVAL
+
+    def stats(self) -> dict:
+        with get_db_connection() as conn:
+            buckets = conn.execute(
+                "SELECT COUNT(*) FROM rate_limit_buckets WHERE name = ?", (self.name,)
+            ).fetchone()[0]
+        return {
+            "capacity": self.capacity,
+            "per_second": round(self.rate, 4),
+            "buckets": buckets,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "shared": True,
+        }
+
+
+Limiter = Union[TokenBucketLimiter, SharedTokenBucketLimiter]
+
+
+def _make_limiter(name: str, spec: str) -> Limiter:
+    if SERVER_CONFIG["rate_limits_shared"]:
+        return SharedTokenBucketLimiter(name, *_parse_limit(spec))
+    return TokenBucketLimiter(*_parse_limit(spec))
+
+
+def _load_limits() -> Dict[str, Dict[str, Limiter]]:
+    specs: Dict[str, Dict[str, str]] = {
+        route: dict(kinds) for route, kinds in SERVER_CONFIG["rate_limits"].items()
+    }
+    for item in SERVER_CONFIG.get("rate_limits_override", "").split(","):
+        name, sep, spec = item.strip().partition("=")
+        route, _, kind = name.partition(".")
+        if sep and route and kind in ("ip", "login"):
+            specs.setdefault(route, {})[kind] = spec
+    return {
+        route: {kind: _make_limiter(f"{route}.{kind}", spec) for kind, spec in kinds.items()}
+        for route, kinds in specs.items()
+    }
+
+
+_limiters = _load_limits()
+
+
+def enforce_rate_limit(request: Request, route: str, login: Optional[str] = None):
+    """Проверка лимитов маршрута по IP и логину; при превышении — 429 с Retry-After."""
+    limits = _limiters.get(route)
+    if not limits:
+        return
+    checks = [("ip", request.client.host if request.client else "unknown")]
+    if login:
+        checks.append(("login", login.strip().lower()))
+
+    for kind, key in checks:
+        limiter = limits.get(kind)
+        if limiter is None:
+            continue
+        retry_after = limiter.hit(key)
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много попыток, повторите позже",
+                headers={"Retry-After": str(int(retry_after) + 1)},
+            )
+
+
+def rate_limit_stats() -> dict:
+    return {
+        route: {kind: limiter.stats() for kind, limiter in kinds.items()}
+        for route, kinds in _limiters.items()
+    }
@@ -0,0 +1,103 @@
+# utils/startup.py
+"""
+Замеры холодного старта: фазы инициализации (lifespan) и импорт модулей.
+
+Фазы пишутся всегда (одна строка в лог при старте). Полный отчёт —
+python main.py --startup-report: импорт main замеряется в отдельном чистом
+процессе (общее время и разбивка по прямым импортам через -X importtime),
+затем в этом процессе прогоняется lifespan без запуска HTTP-сервера.
+Если старт дольше бюджета (STARTUP_BUDGET_MS или --budget-ms), код выхода 1 —
+так проверку можно поставить в CI.
+"""
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+from utils.logger import logger
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", 2000))
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_phases: List[Tuple[str, float]] = []
+
+
+@contextmanager
+def startup_phase(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - t0))
+
+
+def startup_phases() -> List[Tuple[str, float]]:
+    return list(_phases)
+
+
+def log_startup_phases():
+    total = sum(seconds for _, seconds in _phases)
+    parts = ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in _phases)
+    logger.info(f"Инициализация за {total * 1000:.0f} мс ({parts})")
+
+
+def _run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    # Отчёт не должен зависеть от флага, с которым запущен сам отчёт
+    env = {**os.environ, "DEBUG_ROUTES": "0"}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=_PROJECT_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+
+def measure_import(module: str = "main") -> float:
+    """Время импорта модуля в свежем процессе, секунды."""
+    result = _run_python(
+        f"import time; t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0)"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}: {result.stderr.strip()[-500:]}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(module: str = "main", limit: int = 15) -> List[Tuple[str, float]]:
+    """Самые дорогие прямые импорты модуля (-X importtime), секунды."""
+    result = _run_python(f"import {module}", "-X", "importtime")
+    children: List[Tuple[str, float]] = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"; вложенность — по 2 пробела,
+        # вложенные модули печатаются раньше своего родителя
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # строка заголовка
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 0:
+            if name.strip() == module:
+                children.sort(key=lambda item: item[1], reverse=True)
+                return children[:limit]
+            children = []
+        elif level == 1:
+            children.append((name.strip(), int(cumulative) / 1e6))
+    return []
+
+
+def print_startup_report(budget_ms: float = STARTUP_BUDGET_MS) -> bool:
+    """Печатает отчёт (фазы lifespan уже должны быть пройдены). True — в бюджете."""
+    import_seconds = measure_import()
+    phases = startup_phases()
+    init_seconds = sum(seconds for _, seconds in phases)
+    total_ms = (import_seconds + init_seconds) * 1000
+
+    print("Импорт main (чистый процесс):".ljust(44), f"{import_seconds * 1000:8.1f} мс")
+    for name, seconds in import_breakdown():
+        print(f"  {name}".ljust(44), f"{seconds * 1000:8.1f} мс")
+    print("Инициализация (lifespan):".ljust(44), f"{init_seconds * 1000:8.1f} мс")
+    for name, seconds in phases:
+        print(f"  {name}".ljust(44), f"{seconds * 1000:8.1f} мс")
+    ok = total_ms <= budget_ms
+    print("Итого:".ljust(44), f"{total_ms:8.1f} мс (бюджет {budget_ms:.0f} мс) — {'OK' if ok else 'ПРЕВЫШЕН'}")
+    return ok